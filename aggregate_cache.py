@@ -0,0 +1,179 @@
+"""LRU cache for per-chart aggregates.
+
+Streamlit reruns the whole script on every interaction, including ones that do
+not change the effective filter (expanding an insights panel, a checkbox that
+is toggled back). Entries are keyed by chart name and the canonical
+FilterState hash, so those reruns reuse the aggregate instead of grouping the
+rows again. The loaded dataset itself is a separate ``st.cache_resource``
+(``load_data`` in app.py), one read-only frame shared by every session.
+
+One AggregateCache (an ``st.cache_resource``) serves every session of the
+server process, and the background prefetcher writes into it from a worker
+thread, so lookups and inserts take a lock (the aggregate itself is computed
+outside it). Computations are single-flight: while one thread computes a key,
+other sessions asking for it wait for that result instead of computing it
+again, so identical requests from concurrent users are computed once.
+Prefetched entries are inserted at the least-recently-used end: they only fill
+spare room and are the first to go when the budget is full.
+
+Cached values are shared between sessions: callers must not modify them.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_size(value):
+    """Approximate memory footprint of a cached aggregate in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if hasattr(value, 'to_plotly_json'):
+        # Plotly figures: the arrays and strings of their traces and layout
+        return estimate_size(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+
+class _Flight:
+    """A computation in progress, which other lookups of its key wait for.
+
+    failed stays True when it leaves no value (it raised, or was a prefetch
+    with nothing to cache): the waiters then compute the key themselves.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = True
+
+
+class AggregateCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetch_hits = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, chart, state_key, default=None):
+        """Cached aggregate for (chart, state_key), or default without computing it."""
+        key = (chart, state_key)
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value, size, prefetched = self._entries[key]
+            if prefetched:
+                # First use of a prefetched entry: from now on it ages like any other
+                self._entries[key] = (value, size, False)
+                self.prefetch_hits += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_or_compute(self, chart, state_key, compute):
+        """Return the cached aggregate for (chart, state_key), computing it on a miss.
+
+        If another thread is already computing it, wait for its result.
+        """
+        key = (chart, state_key)
+        missing = object()
+        while True:
+            value = self.get(chart, state_key, missing)
+            if value is not missing:
+                return value
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is None and key in self._entries:
+                    # Inserted since the lookup above
+                    continue
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+            if leader:
+                return self._compute(key, flight, compute)
+            flight.done.wait()
+            if not flight.failed:
+                return flight.value
+
+    def warm(self, key, compute):
+        """Insert compute() as a prefetched entry, unless key is cached or being
+        computed. A None result is not cached. Returns whether it ran."""
+        with self._lock:
+            if key in self._entries or key in self._flights:
+                return False
+            flight = self._flights[key] = _Flight()
+        self._compute(key, flight, compute, prefetched=True)
+        return True
+
+    def _compute(self, key, flight, compute, prefetched=False):
+        value = None
+        try:
+            value = compute()
+            if not (prefetched and value is None):
+                self.put(key, value, prefetched)
+                flight.value, flight.failed = value, False
+        finally:
+            # Inserted before the flight ends, so no lookup in between misses it
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return value
+
+    def put(self, key, value, prefetched=False):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            # Larger than the whole budget: hand it back without caching
+            return
+        with self._lock:
+            if key in self._entries:
+                if prefetched:
+                    return
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, prefetched)
+            if prefetched:
+                self._entries.move_to_end(key, last=False)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'prefetch_hits': self.prefetch_hits,
+            'coalesced': self.coalesced,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
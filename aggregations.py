@@ -0,0 +1,76 @@
+"""Data preparation for each dashboard chart.
+
+Sum/count/mean charts roll their numbers up from the pre-aggregated DataCube
+for the current FilterState (the correlation matrix comes from the cube's
+moment cells, see correlation.py). Results may be shared between reruns
+and sessions through the aggregate cache, so callers must not modify them in
+place.
+"""
+import numpy as np
+import pandas as pd
+
+from derived import AGE_LABELS
+from flows import build_flow
+
+NUMERIC_COLS = ['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases']
+AMOUNT = 'Purchase Amount (USD)'
+
+
+def _amount_by(cube, state, by, scope='final'):
+    totals = cube.rollup(state, by, scope)
+    return totals[by + ['amount_sum']].rename(columns={'amount_sum': AMOUNT})
+
+
+def category_sales(cube, state):
+    return _amount_by(cube, state, ['Category'])
+
+
+def hierarchy_nodes(cube, state, path, node=(), levels=3, top_n=12, rows=None):
+    """Treemap / sunburst nodes of path below node, levels deep and top_n
+    children per node (see hierarchy_index.py). rows is only needed for
+    columns outside the cube."""
+    return cube.hierarchy_slice(state, path, node, levels, top_n, rows)
+
+
+def age_spending(cube, state):
+    totals = cube.rollup(state, ['Age Group'])
+    age_spending = pd.DataFrame({
+        'Age Group': pd.Categorical(totals['Age Group'], categories=AGE_LABELS, ordered=True),
+        AMOUNT: totals['amount_sum'] / totals['count'],
+    })
+    return age_spending.sort_values('Age Group')
+
+
+def _ranked_items(totals):
+    top_items = totals[totals['count'] > 0][['Item Purchased', 'count']]
+    top_items.columns = ['Item', 'Count']
+    # Ties by name, so the rank-10 boundary does not depend on the category order of the cells
+    order = np.lexsort((top_items['Item'].astype(str).to_numpy(), -top_items['Count'].to_numpy()))
+    return top_items.iloc[order].reset_index(drop=True)
+
+
+def item_counts(cube, state, scope='final'):
+    """Purchase count per item, most purchased first (top_items gives the Top-10 list)."""
+    return _ranked_items(cube.rollup(state, ['Item Purchased'], scope))
+
+
+def top_items(cube, state, k=10):
+    """The k most purchased items, ignoring the item selection (the Top-10 list).
+
+    Same result as item_counts(cube, state, scope='base').head(k); a DataCube
+    answers from its item sketch where it can (see item_sketch.py).
+    """
+    return _ranked_items(cube.top_item_totals(state, k)).head(k)
+
+
+def sankey_flow(cube, state, stages, rows=None):
+    """Flow through the given stage columns for the Sankey diagram.
+
+    Without rows the flow is rolled up from cube, which works for stages that
+    are all cube dimensions, or for any stage when cube is a SqlBackend. A
+    DataCube with any other stage (e.g. Frequency of Purchases) needs the
+    filtered rows.
+    """
+    if rows is None:
+        return build_flow(cube.rollup(state, list(stages)), stages, weight='count')
+    return build_flow(rows, stages)
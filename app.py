@@ -1,9 +1,29 @@
+import functools
+import uuid
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+import aggregations
+import chart_pool
+import charts
+import config
+import correlation
+import data_store
+import density
+import derived
+import live_feed
+import prefetch
+import profiling
+import sql_backend
+import streaming_ingest
+from aggregate_cache import AggregateCache
+from charts import figures
+from cube import DIMENSIONS as cube_dimensions, DataCube
+from derived import AGE_LABELS
+from figure_cache import FigureCache
+from filter_engine import FilterEngine, FilterState, gather
+from incremental_filter import IncrementalFilter, switches_selection
 
 # Page Configuration
 st.set_page_config(
@@ -52,29 +72,179 @@ if 'selected_categories' not in st.session_state:
     st.session_state.selected_categories = []
 if 'checkbox_reset_counter' not in st.session_state:
     st.session_state.checkbox_reset_counter = 0
+if 'profiling_panel' not in st.session_state:
+    st.session_state.profiling_panel = config.PROFILING
+if 'profile_history' not in st.session_state:
+    st.session_state.profile_history = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Rerun profiling (payload sizes are only measured when someone looks at them)
+st.session_state.profile_run = st.session_state.get('profile_run', 0) + 1
+profile = profiling.RerunProfile(
+    st.session_state.profile_run,
+    measure_payload=st.session_state.profiling_panel or bool(config.PROFILE_LOG)
+)
 
-# Load Data
-@st.cache_data
+# Load Data (one shared, read-only frame: st.cache_data would hand every
+# rerun of every session its own unpickled copy)
+@st.cache_resource
 def load_data():
     try:
-        df = pd.read_csv('Shopping_behavior_updated.csv')
+        df = derived.add_derived_columns(data_store.load_table(config.DATA_FILE))
     except FileNotFoundError:
-        st.error("Error: 'Shopping_behavior_updated.csv' not found. Please ensure the file is in the correct path.")
+        st.error(f"Error: '{config.DATA_FILE}' not found. Please ensure the file is in the correct path.")
         return pd.DataFrame() 
-        
-    # Clean data
-    df = df.dropna()
-    df = df.drop_duplicates()
-    df['Review Rating'] = pd.to_numeric(df['Review Rating'], errors='coerce')
-    df['Purchase Amount (USD)'] = pd.to_numeric(df['Purchase Amount (USD)'], errors='coerce')
-    df['Age'] = pd.to_numeric(df['Age'], errors='coerce')
     return df
 
-df = load_data()
-
-# Handle empty data case
-if df.empty:
-    st.stop()
+# Filter index built once per dataset and shared by every session
+@st.cache_resource
+def load_filter_engine():
+    return FilterEngine(load_data())
+
+# Pre-aggregated cube the sum/count/mean charts roll up from
+@st.cache_resource
+def load_cube():
+    df = load_data()
+    cube = DataCube(df, age_bucket=config.CUBE_AGE_BUCKET, amount_bucket=config.CUBE_AMOUNT_BUCKET,
+                    item_capacity=config.TOP_ITEMS_CAPACITY)
+    # Index the drill-down hierarchies now rather than on the first chart
+    for path in config.HIERARCHIES:
+        if set(path) <= set(df.columns):
+            cube.hierarchy(path, df)
+    return cube
+
+# Chunked ingest for extracts larger than memory: only the cube and running
+# statistics are kept, the rows themselves are never materialized
+@st.cache_resource
+def load_streaming_summary():
+    try:
+        return streaming_ingest.ingest(
+            config.DATA_FILE, config.INGEST_CHUNK_ROWS,
+            age_bucket=config.CUBE_AGE_BUCKET, amount_bucket=config.CUBE_AMOUNT_BUCKET
+        )
+    except FileNotFoundError:
+        st.error(f"Error: '{config.DATA_FILE}' not found. Please ensure the file is in the correct path.")
+        return None
+
+# Per-chart aggregates shared by every session
+@st.cache_resource
+def load_aggregate_cache():
+    return AggregateCache(max_bytes=int(config.AGG_CACHE_MB * 1024 * 1024))
+
+# Finished chart figures (in the same cache) and the skeletons they are patched from
+@st.cache_resource
+def load_figure_cache():
+    return FigureCache(load_aggregate_cache(), figures.FIGURES)
+
+# Background workers warming that cache for the next checkbox click
+@st.cache_resource
+def load_prefetcher():
+    return prefetch.Prefetcher(load_aggregate_cache(), config.PREFETCH_WORKERS, config.PREFETCH_MAX_STATES)
+
+# Threads preparing the visible charts of a rerun in parallel
+@st.cache_resource
+def load_chart_pool():
+    return chart_pool.ChartPool(config.CHART_WORKERS)
+
+# Live mode: a background thread tails the feed and publishes snapshots with
+# the new rows appended to the table, filter index, cube and statistics
+@st.cache_resource
+def load_live_feed():
+    feed = live_feed.LiveFeed(config.LIVE_SOURCE, age_bucket=config.CUBE_AGE_BUCKET, amount_bucket=config.CUBE_AMOUNT_BUCKET,
+                              item_capacity=config.TOP_ITEMS_CAPACITY)
+    feed.poll()
+    feed.start(config.LIVE_POLL_SECONDS)
+    return feed
+
+# SQL mode: filters and aggregates run in an embedded DuckDB over Parquet
+# files; only query results enter the process
+@st.cache_resource
+def load_sql_backend():
+    try:
+        source = config.SQL_SOURCE
+        if not source:
+            if not data_store.is_store_current(config.DATA_FILE):
+                data_store.build_store(config.DATA_FILE)
+            source = data_store.store_paths(config.DATA_FILE)[0]
+        return sql_backend.SqlBackend(source)
+    except FileNotFoundError:
+        st.error(f"Error: '{config.SQL_SOURCE or config.DATA_FILE}' not found. Please ensure the file is in the correct path.")
+    except ImportError:
+        st.error("SQL mode needs the duckdb package: pip install duckdb")
+    return None
+
+streaming_mode = config.INGEST_MODE == 'streaming'
+live_mode = config.INGEST_MODE == 'live'
+sql_mode = config.INGEST_MODE == 'sql'
+
+# Reruns open sessions when the feed has published rows this rerun has not seen
+@st.fragment(run_every=config.LIVE_POLL_SECONDS)
+def live_status():
+    feed = load_live_feed()
+    current = feed.snapshot
+    if current is not None and current.version != data_version:
+        st.rerun(scope='app')
+    if current is None:
+        st.caption(f"Live feed: waiting for rows in '{config.LIVE_SOURCE}' ...")
+    else:
+        st.caption(
+            f"Live feed: {len(current.df):,} records from '{config.LIVE_SOURCE}' "
+            f"({current.rows_read:,} read, {current.rows_duplicate:,} duplicates skipped), "
+            f"refreshed every {config.LIVE_POLL_SECONDS:g}s"
+        )
+    if feed.last_error is not None:
+        st.warning(f"Live feed: last poll failed ({feed.last_error})")
+
+timer = profile.start("Load data")
+
+if streaming_mode:
+    summary = load_streaming_summary()
+    if summary is None:
+        st.stop()
+    df = None
+    cube = summary.cube
+    total_records = summary.rows_kept
+    dimension_values = cube.cells
+    age_bounds = summary.stats.bounds('Age')
+    purchase_bounds = summary.stats.bounds('Purchase Amount (USD)')
+elif sql_mode:
+    # The backend answers the cube's rollup/count calls with SQL aggregates
+    cube = load_sql_backend()
+    if cube is None:
+        st.stop()
+    df = None
+    total_records = cube.n_rows
+    dimension_values = cube.dimension_values
+    age_bounds = cube.bounds('Age')
+    purchase_bounds = cube.bounds('Purchase Amount (USD)')
+elif live_mode:
+    # One snapshot for the whole rerun, however many rows arrive meanwhile
+    snapshot = load_live_feed().snapshot
+    data_version = 0 if snapshot is None else snapshot.version
+    if snapshot is None:
+        live_status()
+        st.stop()
+    df = snapshot.df
+    cube = snapshot.cube
+    engine = snapshot.engine
+    total_records = len(df)
+    dimension_values = df
+    age_bounds = snapshot.stats.bounds('Age')
+    purchase_bounds = snapshot.stats.bounds('Purchase Amount (USD)')
+else:
+    df = load_data()
+
+    # Handle empty data case
+    if df.empty:
+        st.stop()
+    cube = load_cube()
+    engine = load_filter_engine()
+    total_records = len(df)
+    dimension_values = df
+    age_bounds = (df['Age'].min(), df['Age'].max())
+    purchase_bounds = (df['Purchase Amount (USD)'].min(), df['Purchase Amount (USD)'].max())
+timer.stop()
 
 # SIDEBAR 
 st.sidebar.title("Dashboard Filters")
@@ -93,38 +263,47 @@ st.sidebar.markdown("### Manual Filters")
 # Gender filter
 selected_gender = st.sidebar.multiselect(
     "Gender",
-    options=df['Gender'].unique(),
-    default=df['Gender'].unique()
+    options=dimension_values['Gender'].unique().tolist(),
+    default=dimension_values['Gender'].unique().tolist()
 )
 
 # Season filter
 selected_season = st.sidebar.multiselect(
     "Season",
-    options=df['Season'].unique(),
-    default=df['Season'].unique()
+    options=dimension_values['Season'].unique().tolist(),
+    default=dimension_values['Season'].unique().tolist()
 )
 
 # Category filter
 selected_category = st.sidebar.multiselect(
     "Category",
-    options=df['Category'].unique(),
-    default=df['Category'].unique()
+    options=dimension_values['Category'].unique().tolist(),
+    default=dimension_values['Category'].unique().tolist()
 )
 
 # Age range slider
 age_range = st.sidebar.slider(
     "Age Range",
-    int(df['Age'].min()),
-    int(df['Age'].max()),
-    (int(df['Age'].min()), int(df['Age'].max()))
+    int(age_bounds[0]),
+    int(age_bounds[1]),
+    (int(age_bounds[0]), int(age_bounds[1]))
 )
 
 # Purchase amount range slider
 purchase_range = st.sidebar.slider(
     "Purchase Amount Range (USD)",
-    int(df['Purchase Amount (USD)'].min()),
-    int(df['Purchase Amount (USD)'].max()),
-    (int(df['Purchase Amount (USD)'].min()), int(df['Purchase Amount (USD)'].max()))
+    int(purchase_bounds[0]),
+    int(purchase_bounds[1]),
+    (int(purchase_bounds[0]), int(purchase_bounds[1]))
+)
+
+# Point charts draw a stable sample, or density glyphs when many rows match
+point_mode_options = ['Auto', 'Sample', 'Density']
+point_mode = st.sidebar.selectbox(
+    "Point Charts (Parallel / 3D)",
+    options=point_mode_options,
+    index=point_mode_options.index(config.POINT_CHART_MODE),
+    help=f"Auto switches to density glyphs above {config.DENSITY_THRESHOLD:,} matching records."
 )
 
 # Show active interactive filters
@@ -140,34 +319,70 @@ if st.session_state.selected_age_group:
 if st.session_state.selected_categories:
     st.sidebar.info(f"Categories: {', '.join(st.session_state.selected_categories)}")
 
-# Apply manual filters only (no interactive filters yet)
-filtered_df = df[
-    (df['Gender'].isin(selected_gender)) &
-    (df['Season'].isin(selected_season)) &
-    (df['Category'].isin(selected_category)) &
-    (df['Age'].between(age_range[0], age_range[1])) &
-    (df['Purchase Amount (USD)'].between(purchase_range[0], purchase_range[1]))
-]
-
-# Apply interactive filters for other visualizations
-final_filtered_df = filtered_df.copy()
-
-if st.session_state.selected_items:
-    final_filtered_df = final_filtered_df[final_filtered_df['Item Purchased'].isin(st.session_state.selected_items)]
-
-if st.session_state.selected_age_group:
-    age_groups_temp = pd.cut(final_filtered_df['Age'], bins=[0, 25, 35, 45, 55, 65, 100], 
-                        labels=['18-25', '26-35', '36-45', '46-55', '56-65', '65+'])
-    final_filtered_df = final_filtered_df[age_groups_temp.isin(st.session_state.selected_age_group)]
-
-if st.session_state.selected_categories:
-    final_filtered_df = final_filtered_df[final_filtered_df['Category'].isin(st.session_state.selected_categories)]
+# Evaluate all filters once through the bitmap index, reusing the previous
+# rerun's row sets when only part of the filter state changed
+timer = profile.start("Filter")
+filter_state = FilterState.create(
+    selected_gender, selected_season, selected_category, age_range, purchase_range,
+    items=st.session_state.selected_items,
+    age_groups=st.session_state.selected_age_group,
+    categories=st.session_state.selected_categories,
+    data_version=data_version if live_mode else 0
+)
+agg_cache = load_aggregate_cache()
+fig_cache = load_figure_cache()
+final_key = filter_state.key()
+base_key = filter_state.without_items().key()
+
+if streaming_mode or sql_mode:
+    # Row-level charts are skipped (streaming) or sampled by SQL; counts come from the cube
+    final_rows = None
+    final_records = cube.count(filter_state)
+else:
+    inc = st.session_state.get('incremental_filter')
+    # Appended rows (live mode) extend the previous masks instead of resetting them
+    if inc is None or (inc.engine is not engine and not inc.rebase(engine)):
+        st.session_state.incremental_filter = IncrementalFilter(engine, agg_cache)
+    row_sets = st.session_state.incremental_filter.select(filter_state)
+
+    # Row positions after the interactive filters; each chart gathers only
+    # the columns it needs for these rows
+    final_rows = row_sets['final']
+    final_records = len(final_rows)
+timer.stop()
+
+use_density = point_mode == 'Density' or (point_mode == 'Auto' and final_records > config.DENSITY_THRESHOLD)
+numeric_cols = aggregations.NUMERIC_COLS
+
+# Numeric columns and Category of the filtered rows, shared by the row-level
+# charts and gathered at most once per rerun (not at all when all are cached)
+@functools.cache
+def final_point_columns():
+    if sql_mode:
+        # A bounded sample of the matching rows, with every column the point charts draw
+        return cube.sample(filter_state, numeric_cols + ['Category', 'Payment Method', 'Gender', 'Season'],
+                           config.SQL_SAMPLE_ROWS, seed=density.state_seed(final_key))
+    return gather(df, final_rows, numeric_cols + ['Category'])
 
 st.sidebar.markdown("---")
-st.sidebar.metric("Filtered Records", f"{len(final_filtered_df):,} / {len(df):,}")
+st.sidebar.metric("Filtered Records", f"{final_records:,} / {total_records:,}")
+cache_stats = agg_cache.stats()
+st.sidebar.caption(
+    f"Aggregate cache: {cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses, "
+    f"{cache_stats['bytes'] / 1024:,.0f} KB of {cache_stats['max_bytes'] / 1024 / 1024:,.0f} MB, "
+    f"{cache_stats['prefetch_hits']:,} prefetched hits, {cache_stats['coalesced']:,} joined in flight"
+)
+figure_stats = fig_cache.stats()
+st.sidebar.caption(
+    f"Figure cache: {figure_stats['reused']:,} reused / {figure_stats['patched']:,} patched / "
+    f"{figure_stats['built']:,} built"
+)
+
+if live_mode:
+    live_status()
 
 # Handle empty data after filtering
-if final_filtered_df.empty:
+if final_records == 0:
     st.warning("No data matches the current filters. Please adjust your selections.")
     st.stop()
 
@@ -180,438 +395,711 @@ Welcome to the Interactive Shopping Dashboard. Click on any visualization to fil
 - Business insights for strategic decision-making
 """)
 
-# VISUALIZATION 1: PIE CHART - Sales Distribution by Category
-st.header("1. Pie Chart - Sales Distribution by Category")
-col1, col2 = st.columns([3, 1])
-
-with col1:
-    category_sales = final_filtered_df.groupby('Category')['Purchase Amount (USD)'].sum().reset_index()
-    
-    fig3 = px.pie(
-        category_sales,
-        values='Purchase Amount (USD)',
-        names='Category',
-        title='Sales Distribution by Category',
-        hole=0.4,
-        color_discrete_sequence=px.colors.qualitative.Set3
+# Chart sections: section name (as in the rerun profile) -> full title
+SECTIONS = {
+    "1. Pie Chart": "1. Pie Chart - Sales Distribution by Category",
+    "2. Treemap": "2. Treemap - Sales Hierarchy",
+    "3. Correlation Heatmap": "3. Correlation Heatmap - Numerical Variables",
+    "4. Line Chart": "4. Line Chart - Average Purchase by Age Group",
+    "5. Parallel Coordinates Plot": "5. Parallel Coordinates Plot - Customer Segmentation",
+    "6. Sunburst Chart": "6. Sunburst Chart - Seasonal Category Breakdown",
+    "7. Bar Chart": "7. Bar Chart - Top 10 Most Purchased Items",
+    "8. Sankey Diagram": "8. Sankey Diagram - Customer Journey Flow",
+    "9. 3D Scatter Plot": "9. 3D Scatter Plot - Multi-dimensional Analysis with Glyphs",
+}
+shown_sections = []
+
+if config.SECTION_MODE == 'tabs':
+    # Only the active tab is drawn; switching tabs reruns the script
+    section_tabs = dict(zip(SECTIONS, st.tabs(list(SECTIONS), on_change='rerun', key='section_tabs')))
+
+def chart_section(name):
+    """Container to draw a section into, or None when the section is hidden.
+
+    Hidden sections (inactive tabs, collapsed expanders) skip aggregation and
+    figure construction; their results stay in the aggregate cache for when
+    they are shown again.
+    """
+    if config.SECTION_MODE == 'tabs':
+        section = section_tabs[name]
+        if not section.open:
+            return None
+        section.header(SECTIONS[name])
+    elif config.SECTION_MODE == 'expanders':
+        section = st.expander(
+            SECTIONS[name], expanded=name.split('.')[0] in config.OPEN_SECTIONS,
+            key=f'section_{name}', on_change='rerun'
+        )
+        if not section.open:
+            return None
+    else:
+        if shown_sections:
+            st.markdown("---")
+        st.header(SECTIONS[name])
+        section = st.container()
+    shown_sections.append(name)
+    return section
+
+# Options of the checkbox panels, also used to prefetch neighbouring states;
+# the item panel's options are only known once the Bar Chart is drawn
+category_list = dimension_values['Category'].unique().tolist()
+top_10_items = []
+
+def section_visible(name):
+    """Whether chart_section(name) will draw the section, known before it is created."""
+    if config.SECTION_MODE == 'tabs':
+        return section_tabs[name].open
+    if config.SECTION_MODE == 'expanders':
+        return st.session_state.get(f'section_{name}', name.split('.')[0] in config.OPEN_SECTIONS)
+    return True
+
+def correlation_chart_name(method, partial):
+    return 'correlation:' + method + (':partial' if partial else '')
+
+def correlation_title(method, partial):
+    return ('Partial ' if partial else '') + method.title() + ' Correlation Matrix of Numerical Variables'
+
+# Sankey stages on offer; only stages outside the cube need the rows themselves
+if streaming_mode:
+    stage_options = cube_dimensions
+elif sql_mode:
+    stage_options = [col for col in data_store.CATEGORICAL_COLUMNS + derived.names() if col in cube.columns]
+else:
+    stage_options = data_store.CATEGORICAL_COLUMNS + derived.names()
+default_stages = [stage for stage in config.SANKEY_STAGES if stage in stage_options]
+
+def needs_rows(stages):
+    return not (streaming_mode or sql_mode) and not set(stages) <= set(cube_dimensions)
+
+# Treemap / sunburst hierarchies on offer; like the Sankey stages, levels
+# outside the cube are indexed from the rows
+hierarchy_options = [path for path in config.HIERARCHIES if set(path) <= set(stage_options)]
+TREEMAP_HIERARCHY = ('Category', 'Item Purchased')
+SUNBURST_HIERARCHY = ('Season', 'Category', 'Item Purchased')
+
+def hierarchy_path(chart, default):
+    """Hierarchy of a drill-down chart, as its selectbox was last left."""
+    return st.session_state.get(f'{chart}_hierarchy', default if default in hierarchy_options else hierarchy_options[0])
+
+def drilled_node(chart, path):
+    drilled = st.session_state.get(f'{chart}_node')
+    return drilled[1] if drilled is not None and drilled[0] == path else ()
+
+def hierarchy_chart_name(path, node):
+    return 'hierarchy:' + '>'.join(path) + ':' + '/'.join(node)
+
+def hierarchy_slice(path, node, state):
+    return aggregations.hierarchy_nodes(cube, state, path, node, config.HIERARCHY_LEVELS, config.HIERARCHY_TOP_N,
+                                        df if needs_rows(path) else None)
+
+def hierarchy_data(path, node):
+    """Node drawn and its slice; the top of the hierarchy when the filters left nothing below node."""
+    nodes = agg_cache.get_or_compute(hierarchy_chart_name(path, node), final_key, lambda: hierarchy_slice(path, node, filter_state))
+    if node and nodes.empty:
+        return hierarchy_data(path, ())
+    return node, nodes
+
+def drill_select(chart, path, node, nodes):
+    """Selectbox moving chart up to an ancestor of node or down into one of its children drawn."""
+    children = nodes.loc[(nodes['depth'] == len(node) + 1) & nodes['expandable'], 'label'].tolist()
+    options = [node[:depth] for depth in range(len(node) + 1)] + [node + (label,) for label in children]
+    # One widget per node, so its options never change under it
+    widget_key = f"{chart}_drill:{'>'.join(path)}:{'/'.join(node)}"
+
+    def drill():
+        st.session_state[f'{chart}_node'] = (path, st.session_state[widget_key])
+
+    st.selectbox(
+        "Drill into", options, index=len(node), format_func=lambda n: ' / '.join(n) if n else 'All',
+        key=widget_key, on_change=drill,
+        help=f"Each level shows the {config.HIERARCHY_TOP_N} largest children of a node; the rest are summed into Other."
+    )
+
+# Aggregate and figure of each chart, shared by its section and the chart
+# pool. The section passes its timer to split the aggregate from the figure;
+# widget values come in as arguments, as pool threads cannot read the session
+# state. None means there is nothing to draw.
+def lap(timer, phase):
+    if timer is not None:
+        timer.lap(phase)
+
+def pie_figure(timer=None):
+    category_sales = agg_cache.get_or_compute('pie', final_key, lambda: aggregations.category_sales(cube, filter_state))
+    lap(timer, 'aggregate')
+    return fig_cache.figure('pie', final_key, category_sales)
+
+HIERARCHY_HINTS = {'treemap': 'Hover for details', 'sunburst': 'Click to zoom in'}
+
+def hierarchy_chart(chart, path, node, timer=None):
+    """Node drawn, its slice and figure; a sunburst needs more than one sector at the top."""
+    node, nodes = hierarchy_data(path, node)
+    lap(timer, 'aggregate')
+    if chart == 'sunburst' and not node and (nodes['depth'] == 1).sum() < 2:
+        return node, nodes, None
+    title = ' → '.join(path) + (': ' + ' / '.join(node) if node else '') + f' ({HIERARCHY_HINTS[chart]})'
+    return node, nodes, fig_cache.figure(chart, final_key + ':' + hierarchy_chart_name(path, node), nodes, title=title)
+
+def heatmap_figure(method, partial, timer=None):
+    # Summed from the cube's moment cells (or one SQL query), whatever the row count
+    correlation_data = agg_cache.get_or_compute(
+        correlation_chart_name(method, partial), final_key, lambda: cube.correlation(filter_state, method, partial)
+    )
+    if correlation_data is None:
+        return None
+    lap(timer, 'aggregate')
+    # Imports its plotting library on first use (seaborn/matplotlib or plotly)
+    heatmap = charts.load('heatmap', config.HEATMAP_RENDERER)
+    return fig_cache.figure('heatmap:' + config.HEATMAP_RENDERER, final_key, correlation_data,
+                            build=heatmap.figure, title=correlation_title(method, partial))
+
+def line_figure(timer=None):
+    age_spending = agg_cache.get_or_compute('line', final_key, lambda: aggregations.age_spending(cube, filter_state))
+    lap(timer, 'aggregate')
+    return fig_cache.figure('line', final_key, age_spending)
+
+def parallel_figure(timer=None):
+    sample_size = min(500, final_records)
+    if use_density:
+        parallel_df = agg_cache.get_or_compute('parallel_density', final_key, lambda: density.density_glyphs(
+            final_point_columns(), numeric_cols, bins=config.PARALLEL_DENSITY_BINS, max_glyphs=500
+        ))
+        lap(timer, 'aggregate')
+        return fig_cache.figure(
+            'parallel_density', final_key, parallel_df, dimensions=numeric_cols, color='Count',
+            title=f'Customer Profile Density: {len(parallel_df):,} binned profiles covering {int(parallel_df["Count"].sum()):,} customers'
+        )
+    if sample_size < 2:
+        return None
+    parallel_df = agg_cache.get_or_compute('parallel_sample', final_key, lambda: density.stratified_sample(
+        final_point_columns(), sample_size, 'Category',
+        seed=density.state_seed(final_key), keep_extremes=numeric_cols
+    ))
+    lap(timer, 'aggregate')
+    return fig_cache.figure(
+        'parallel_sample', final_key, parallel_df, dimensions=numeric_cols, color='Purchase Amount (USD)',
+        title='Multi-dimensional Customer Profile (Drag axes to reorder)'
     )
-    fig3.update_traces(textposition='inside', textinfo='percent+label')
-    fig3.update_layout(height=450)
-    st.plotly_chart(fig3, use_container_width=True)
 
-with col2:
-    st.markdown("**Select Categories:**")
-    category_list = df['Category'].unique().tolist()
+def bar_figure(selected_items, timer=None):
+    # Show selected items or top 10 (the top 10 ignores the item filter)
+    if selected_items:
+        top_items = agg_cache.get_or_compute('selected_items', final_key, lambda: aggregations.item_counts(cube, filter_state))
+        chart_title = f'Selected Items ({len(selected_items)} items)'
+        top_items_key = final_key
+    else:
+        top_items = agg_cache.get_or_compute('top_items', base_key, lambda: aggregations.top_items(cube, filter_state))
+        chart_title = 'Top 10 Most Purchased Items'
+        top_items_key = base_key
+    lap(timer, 'aggregate')
+    return fig_cache.figure('bar', top_items_key, top_items, title=chart_title)
+
+def sankey_figure(stages, timer=None):
+    sankey_flow = agg_cache.get_or_compute(
+        'sankey:' + '|'.join(stages), final_key,
+        lambda: aggregations.sankey_flow(cube, filter_state, stages,
+                                          gather(df, final_rows, stages) if needs_rows(stages) else None)
+    )
+    if not len(sankey_flow.source):
+        return None
+    lap(timer, 'aggregate')
+    return fig_cache.figure('sankey', final_key + ':' + '|'.join(stages), sankey_flow, title=" → ".join(stages) + " Flow")
+
+def scatter_figure(timer=None):
+    sample_size_3d = min(1000, final_records)
+    if use_density:
+        scatter_axes = ['Age', 'Purchase Amount (USD)', 'Review Rating']
+        scatter_3d = agg_cache.get_or_compute('scatter_density', final_key, lambda: density.density_glyphs(
+            final_point_columns(), scatter_axes, bins=config.SCATTER_DENSITY_BINS
+        ))
+        lap(timer, 'aggregate')
+        return fig_cache.figure(
+            'scatter_density', final_key, scatter_3d,
+            title=f'Age × Purchase × Rating Density: {len(scatter_3d):,} bins covering {int(scatter_3d["Count"].sum()):,} customers'
+        )
+    if sample_size_3d < 2:
+        return None
+    if sql_mode:
+        # The SQL sample already carries the plotted columns
+        scatter_3d = agg_cache.get_or_compute('scatter_sample', final_key, lambda: density.stratified_sample(
+            final_point_columns(), sample_size_3d, 'Category',
+            seed=density.state_seed(final_key), keep_extremes=numeric_cols
+        ))
+    else:
+        # Sample positions on the columns the sampler needs, then gather the
+        # plotted columns for the chosen rows only
+        scatter_3d = agg_cache.get_or_compute('scatter_sample', final_key, lambda: df.iloc[final_rows[density.stratified_positions(
+            final_point_columns(), sample_size_3d, 'Category',
+            seed=density.state_seed(final_key), keep_extremes=numeric_cols
+        )]])
+    lap(timer, 'aggregate')
+    return fig_cache.figure('scatter_sample', final_key, scatter_3d)
+
+# PARALLEL PREPARATION: start the charts of every visible section on the chart
+# pool, with the widget values their last rerun left in the session state.
+if config.CHART_WORKERS > 0:
+    timer = profile.start("Prepare charts")
+    chart_tasks = {}
+    if section_visible("1. Pie Chart"):
+        chart_tasks['pie'] = pie_figure
+    if section_visible("2. Treemap") and hierarchy_options:
+        treemap_path = hierarchy_path('treemap', TREEMAP_HIERARCHY)
+        chart_tasks['treemap'] = functools.partial(hierarchy_chart, 'treemap', treemap_path, drilled_node('treemap', treemap_path))
+    if section_visible("3. Correlation Heatmap") and final_records > 1:
+        chart_tasks['heatmap'] = functools.partial(
+            heatmap_figure, st.session_state.get('correlation_method', config.CORRELATION_METHOD),
+            st.session_state.get('correlation_partial', config.CORRELATION_PARTIAL)
+        )
+    if section_visible("4. Line Chart"):
+        chart_tasks['line'] = line_figure
+    if section_visible("5. Parallel Coordinates Plot") and not streaming_mode:
+        chart_tasks['parallel'] = parallel_figure
+    if section_visible("6. Sunburst Chart") and hierarchy_options:
+        sunburst_path = hierarchy_path('sunburst', SUNBURST_HIERARCHY)
+        chart_tasks['sunburst'] = functools.partial(hierarchy_chart, 'sunburst', sunburst_path, drilled_node('sunburst', sunburst_path))
+    if section_visible("7. Bar Chart"):
+        chart_tasks['bar'] = functools.partial(bar_figure, tuple(st.session_state.selected_items))
+    flow_stages = st.session_state.get('sankey_stages', default_stages)
+    if section_visible("8. Sankey Diagram") and final_records > 1 and len(flow_stages) >= 2:
+        chart_tasks['sankey'] = functools.partial(sankey_figure, flow_stages)
+    if section_visible("9. 3D Scatter Plot") and not streaming_mode:
+        chart_tasks['scatter'] = scatter_figure
+
+    load_chart_pool().prepare(st.session_state.session_id, chart_tasks)
+    timer.stop()
+
+# VISUALIZATION 1: PIE CHART - Sales Distribution by Category
+section = chart_section("1. Pie Chart")
+if section is not None:
+    with section:
+        timer = profile.start("1. Pie Chart")
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            fig3 = pie_figure(timer)
+            timer.lap('figure')
+            st.plotly_chart(fig3, use_container_width=True)
+            timer.lap('render')
+            timer.record_payload(fig3)
+
+        with col2:
+            st.markdown("**Select Categories:**")
     
-    new_cat_selection = []
+            new_cat_selection = []
     
-    for cat in category_list:
-        if st.checkbox(cat, value=cat in st.session_state.selected_categories, 
-                      key=f'cat_checkbox_{cat}_{st.session_state.checkbox_reset_counter}'):
-            new_cat_selection.append(cat)
+            for cat in category_list:
+                if st.checkbox(cat, value=cat in st.session_state.selected_categories, 
+                              key=f'cat_checkbox_{cat}_{st.session_state.checkbox_reset_counter}'):
+                    new_cat_selection.append(cat)
     
-    if set(new_cat_selection) != set(st.session_state.selected_categories):
-        st.session_state.selected_categories = new_cat_selection
-        st.rerun()
+            if set(new_cat_selection) != set(st.session_state.selected_categories):
+                st.session_state.selected_categories = new_cat_selection
+                st.rerun()
     
-    if st.button("Clear Categories", key='clear_cat', use_container_width=True):
-        st.session_state.selected_categories = []
-        st.session_state.checkbox_reset_counter += 1
-        st.rerun()
+            if st.button("Clear Categories", key='clear_cat', use_container_width=True):
+                st.session_state.selected_categories = []
+                st.session_state.checkbox_reset_counter += 1
+                st.rerun()
+
+        timer.stop()
 
-with st.expander("View Insights - Pie Chart"):
-    st.write("""
-    **Purpose:** Shows the proportion of total sales contributed by each product category
+        with st.expander("View Insights - Pie Chart"):
+            st.write("""
+            **Purpose:** Shows the proportion of total sales contributed by each product category
     
-    **Insight:** Reveals which categories dominate the revenue stream
+            **Insight:** Reveals which categories dominate the revenue stream
     
-    **Business Value:** Guides resource allocation and category-specific strategies
-    """)
-
-st.markdown("---")
+            **Business Value:** Guides resource allocation and category-specific strategies
+            """)
 
 # VISUALIZATION 2: TREEMAP - Sales Hierarchy
-st.header("2. Treemap - Sales Hierarchy")
-if len(final_filtered_df) > 0:
-    treemap_data = final_filtered_df.groupby(['Category', 'Item Purchased'])['Purchase Amount (USD)'].sum().reset_index()
-    
-    fig4 = px.treemap(
-        treemap_data,
-        path=['Category', 'Item Purchased'],
-        values='Purchase Amount (USD)',
-        color='Purchase Amount (USD)',
-        color_continuous_scale='Blues',
-        title='Category to Item Hierarchy (Hover for details)'
-    )
-    fig4.update_layout(height=500)
-    st.plotly_chart(fig4, use_container_width=True)
-else:
-    st.info("Insufficient data for Treemap.")
-
-with st.expander("View Insights - Treemap"):
-    st.write("""
-    **Purpose:** Hierarchical view of sales by category and individual items
+section = chart_section("2. Treemap")
+if section is not None:
+    with section:
+        timer = profile.start("2. Treemap")
+        if final_records > 0 and hierarchy_options:
+            hierarchy_col, drill_col = st.columns(2)
+            treemap_path = hierarchy_col.selectbox(
+                "Hierarchy", hierarchy_options, index=hierarchy_options.index(hierarchy_path('treemap', TREEMAP_HIERARCHY)),
+                format_func=' → '.join, key='treemap_hierarchy'
+            )
+            treemap_node, treemap_nodes, fig4 = hierarchy_chart(
+                'treemap', treemap_path, drilled_node('treemap', treemap_path), timer
+            )
+            timer.lap('figure')
+            st.plotly_chart(fig4, use_container_width=True)
+            timer.lap('render')
+            timer.record_payload(fig4)
+            with drill_col:
+                drill_select('treemap', treemap_path, treemap_node, treemap_nodes)
+        else:
+            st.info("Insufficient data for Treemap.")
+
+        timer.stop()
+
+        with st.expander("View Insights - Treemap"):
+            st.write("""
+            **Purpose:** Hierarchical view of sales by category and individual items
     
-    **Insight:** Larger rectangles indicate higher sales volume, allowing quick visual comparison
+            **Insight:** Larger rectangles indicate higher sales volume, allowing quick visual comparison
     
-    **Business Value:** Identifies top-performing products within each category for strategic stocking
-    """)
-
-st.markdown("---")
+            **Business Value:** Identifies top-performing products within each category for strategic stocking
+            """)
 
 # VISUALIZATION 3: CORRELATION HEATMAP - Numerical Variables
-st.header("3. Correlation Heatmap - Numerical Variables")
-
-numeric_cols = ['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases']
-
-if len(final_filtered_df) > 1:
-    correlation_data = final_filtered_df[numeric_cols].corr()
-    
-    fig9, ax = plt.subplots(figsize=(10, 8))
-    sns.heatmap(
-        correlation_data, 
-        annot=True, 
-        fmt='.2f',
-        cmap='RdBu_r', 
-        center=0, 
-        square=True, 
-        linewidths=1,
-        vmin=-1, 
-        vmax=1,
-        cbar_kws={'label': 'Correlation Coefficient'}
-    )
-    plt.title('Correlation Matrix of Numerical Variables', fontsize=16, fontweight='bold')
-    plt.tight_layout()
-    st.pyplot(fig9)
-    plt.close()
-else:
-    st.info("Insufficient data for Correlation Heatmap.")
-
-with st.expander("View Insights - Correlation Heatmap"):
-    st.write("""
-    **Purpose:** Shows statistical correlations between all numerical variables in the dataset
+section = chart_section("3. Correlation Heatmap")
+if section is not None:
+    with section:
+        timer = profile.start("3. Correlation Heatmap")
+
+        correlation_col1, correlation_col2 = st.columns(2)
+        with correlation_col1:
+            correlation_method = st.radio(
+                "Correlation",
+                options=correlation.METHODS,
+                index=correlation.METHODS.index(config.CORRELATION_METHOD),
+                format_func=str.title,
+                horizontal=True,
+                key='correlation_method'
+            )
+        with correlation_col2:
+            correlation_partial = st.checkbox(
+                "Partial (each pair controlling for the other variables)",
+                value=config.CORRELATION_PARTIAL,
+                key='correlation_partial'
+            )
+        correlation_chart = correlation_chart_name(correlation_method, correlation_partial)
+
+        fig9 = heatmap_figure(correlation_method, correlation_partial, timer) if final_records > 1 else None
+
+        if fig9 is not None:
+            timer.lap('figure')
+            charts.load('heatmap', config.HEATMAP_RENDERER).show(fig9)
+            timer.lap('render')
+            timer.record_payload(fig9)
+        else:
+            st.info("Insufficient data for Correlation Heatmap.")
+
+        timer.stop()
+
+        with st.expander("View Insights - Correlation Heatmap"):
+            st.write("""
+            **Purpose:** Shows statistical correlations between all numerical variables in the dataset
     
-    **Insight:** Values close to 1 or -1 indicate strong positive or negative relationships
+            **Insight:** Values close to 1 or -1 indicate strong positive or negative relationships
     
-    **Business Value:** Helps understand which factors most strongly influence purchase behavior
-    """)
-
-st.markdown("---")
+            **Business Value:** Helps understand which factors most strongly influence purchase behavior
+            """)
 
 # VISUALIZATION 4: LINE CHART - Average Purchase by Age Group
-st.header("4. Line Chart - Average Purchase by Age Group")
-col1, col2 = st.columns([3, 1])
-
-with col1:
-    filtered_df_temp = final_filtered_df.copy()
-    filtered_df_temp['Age Group'] = pd.cut(
-        filtered_df_temp['Age'], 
-        bins=[0, 25, 35, 45, 55, 65, 100], 
-        labels=['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
-    )
-    age_spending = filtered_df_temp.groupby('Age Group', observed=True)['Purchase Amount (USD)'].mean().reset_index()
-    
-    age_order = ['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
-    age_spending['Age Group'] = pd.Categorical(age_spending['Age Group'], categories=age_order, ordered=True)
-    age_spending = age_spending.sort_values('Age Group')
-    
-    fig2 = px.line(
-        age_spending,
-        x='Age Group',
-        y='Purchase Amount (USD)',
-        title='Average Purchase Amount by Age Group',
-        markers=True,
-        line_shape='linear'
-    )
-    fig2.update_traces(line=dict(color='#059669', width=3), marker=dict(size=12))
-    fig2.update_layout(height=450)
-    st.plotly_chart(fig2, use_container_width=True)
-
-with col2:
-    st.markdown("**Select Age Groups:**")
-    age_group_list = ['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
+section = chart_section("4. Line Chart")
+if section is not None:
+    with section:
+        timer = profile.start("4. Line Chart")
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            fig2 = line_figure(timer)
+            timer.lap('figure')
+            st.plotly_chart(fig2, use_container_width=True)
+            timer.lap('render')
+            timer.record_payload(fig2)
+
+        with col2:
+            st.markdown("**Select Age Groups:**")
+            age_group_list = AGE_LABELS
     
-    new_age_selection = []
+            new_age_selection = []
     
-    for age_grp in age_group_list:
-        if st.checkbox(age_grp, value=age_grp in st.session_state.selected_age_group, 
-                      key=f'age_checkbox_{age_grp}_{st.session_state.checkbox_reset_counter}'):
-            new_age_selection.append(age_grp)
+            for age_grp in age_group_list:
+                if st.checkbox(age_grp, value=age_grp in st.session_state.selected_age_group, 
+                              key=f'age_checkbox_{age_grp}_{st.session_state.checkbox_reset_counter}'):
+                    new_age_selection.append(age_grp)
     
-    if set(new_age_selection) != set(st.session_state.selected_age_group):
-        st.session_state.selected_age_group = new_age_selection
-        st.rerun()
+            if set(new_age_selection) != set(st.session_state.selected_age_group):
+                st.session_state.selected_age_group = new_age_selection
+                st.rerun()
     
-    if st.button("Clear Age Groups", key='clear_age', use_container_width=True):
-        st.session_state.selected_age_group = []
-        st.session_state.checkbox_reset_counter += 1
-        st.rerun()
+            if st.button("Clear Age Groups", key='clear_age', use_container_width=True):
+                st.session_state.selected_age_group = []
+                st.session_state.checkbox_reset_counter += 1
+                st.rerun()
+
+        timer.stop()
 
-with st.expander("View Insights - Line Chart"):
-    st.write("""
-    **Purpose:** Displays average spending patterns across different age groups
+        with st.expander("View Insights - Line Chart"):
+            st.write("""
+            **Purpose:** Displays average spending patterns across different age groups
     
-    **Insight:** Shows which age demographic spends the most on average
+            **Insight:** Shows which age demographic spends the most on average
     
-    **Business Value:** Enables targeted marketing campaigns for high-value age segments
-    """)
-
-st.markdown("---")
+            **Business Value:** Enables targeted marketing campaigns for high-value age segments
+            """)
 
 # VISUALIZATION 5: PARALLEL COORDINATES - Customer Segmentation
-st.header("5. Parallel Coordinates Plot - Customer Segmentation")
-
-sample_size = min(500, len(final_filtered_df))
-if sample_size >= 2:
-    parallel_df = final_filtered_df[['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases']].sample(sample_size)
-    
-    fig6 = px.parallel_coordinates(
-        parallel_df,
-        dimensions=['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases'],
-        color='Purchase Amount (USD)',
-        color_continuous_scale='Viridis',
-        title='Multi-dimensional Customer Profile (Drag axes to reorder)'
-    )
-    fig6.update_layout(height=500)
-    st.plotly_chart(fig6, use_container_width=True)
-else:
-    st.info("Insufficient data for Parallel Coordinates Plot.")
-
-with st.expander("View Insights - Parallel Coordinates"):
-    st.write("""
-    **Purpose:** Shows relationships between multiple numerical variables simultaneously
+section = chart_section("5. Parallel Coordinates Plot")
+if section is not None:
+    with section:
+        timer = profile.start("5. Parallel Coordinates Plot")
+
+        fig6 = None if streaming_mode else parallel_figure(timer)
+        if streaming_mode:
+            st.info("Parallel Coordinates needs row-level data and is not available in streaming ingest mode.")
+        elif fig6 is not None:
+            timer.lap('figure')
+            st.plotly_chart(fig6, use_container_width=True)
+            timer.lap('render')
+            timer.record_payload(fig6)
+        else:
+            st.info("Insufficient data for Parallel Coordinates Plot.")
+
+        timer.stop()
+
+        with st.expander("View Insights - Parallel Coordinates"):
+            st.write("""
+            **Purpose:** Shows relationships between multiple numerical variables simultaneously
     
-    **Insight:** Each line represents an individual customer across different dimensions
+            **Insight:** Each line represents an individual customer across different dimensions
     
-    **Business Value:** Identifies patterns and segments of high-value customers for targeted engagement
-    """)
-
-st.markdown("---")
+            **Business Value:** Identifies patterns and segments of high-value customers for targeted engagement
+            """)
 
 # VISUALIZATION 6: SUNBURST - Seasonal Category Breakdown
-st.header("6. Sunburst Chart - Seasonal Category Breakdown")
-
-if len(final_filtered_df) > 0 and len(final_filtered_df['Season'].unique()) > 1:
-    sunburst_data = final_filtered_df.groupby(['Season', 'Category', 'Item Purchased'])['Purchase Amount (USD)'].sum().reset_index()
-    
-    fig7 = px.sunburst(
-        sunburst_data,
-        path=['Season', 'Category', 'Item Purchased'],
-        values='Purchase Amount (USD)',
-        color='Purchase Amount (USD)',
-        color_continuous_scale='RdBu_r', 
-        title='Season → Category → Item (Click to zoom in)'
-    )
-    fig7.update_layout(height=600)
-    st.plotly_chart(fig7, use_container_width=True)
-else:
-    st.info("Insufficient data or variety for Sunburst Chart. Need more than one Season.")
-
-with st.expander("View Insights - Sunburst Chart"):
-    st.write("""
-    **Purpose:** Hierarchical breakdown of sales by season, category, and specific items
+section = chart_section("6. Sunburst Chart")
+if section is not None:
+    with section:
+        timer = profile.start("6. Sunburst Chart")
+
+        if final_records > 0 and hierarchy_options:
+            hierarchy_col, drill_col = st.columns(2)
+            sunburst_path = hierarchy_col.selectbox(
+                "Hierarchy", hierarchy_options, index=hierarchy_options.index(hierarchy_path('sunburst', SUNBURST_HIERARCHY)),
+                format_func=' → '.join, key='sunburst_hierarchy'
+            )
+            sunburst_node, sunburst_nodes, fig7 = hierarchy_chart(
+                'sunburst', sunburst_path, drilled_node('sunburst', sunburst_path), timer
+            )
+
+            if fig7 is not None:
+                timer.lap('figure')
+                st.plotly_chart(fig7, use_container_width=True)
+                timer.lap('render')
+                timer.record_payload(fig7)
+                with drill_col:
+                    drill_select('sunburst', sunburst_path, sunburst_node, sunburst_nodes)
+            else:
+                st.info(f"Insufficient data or variety for Sunburst Chart. Need more than one {sunburst_path[0]}.")
+        else:
+            st.info("Insufficient data or variety for Sunburst Chart.")
+
+        timer.stop()
+
+        with st.expander("View Insights - Sunburst Chart"):
+            st.write("""
+            **Purpose:** Hierarchical breakdown of sales by season, category, and specific items
     
-    **Insight:** Inner rings represent seasons, outer rings show categories and individual products
+            **Insight:** Inner rings represent seasons, outer rings show categories and individual products
     
-    **Business Value:** Enables seasonal inventory planning and promotional campaign scheduling
-    """)
-
-st.markdown("---")
+            **Business Value:** Enables seasonal inventory planning and promotional campaign scheduling
+            """)
 
 # VISUALIZATION 7: BAR CHART - Top 10 Most Purchased Items
-st.header("7. Bar Chart - Top 10 Most Purchased Items")
-col1, col2 = st.columns([3, 1])
-
-with col1:
-    # Prepare data for bar chart (excluding item filter)
-    bar_chart_df = df[
-        (df['Gender'].isin(selected_gender)) &
-        (df['Season'].isin(selected_season)) &
-        (df['Category'].isin(selected_category)) &
-        (df['Age'].between(age_range[0], age_range[1])) &
-        (df['Purchase Amount (USD)'].between(purchase_range[0], purchase_range[1]))
-    ]
-    
-    # Apply age group filter if exists
-    if st.session_state.selected_age_group:
-        age_groups_bar = pd.cut(bar_chart_df['Age'], bins=[0, 25, 35, 45, 55, 65, 100], 
-                            labels=['18-25', '26-35', '36-45', '46-55', '56-65', '65+'])
-        bar_chart_df = bar_chart_df[age_groups_bar.isin(st.session_state.selected_age_group)]
-    
-    # Apply category filter if exists
-    if st.session_state.selected_categories:
-        bar_chart_df = bar_chart_df[bar_chart_df['Category'].isin(st.session_state.selected_categories)]
-    
-    # Show selected items or top 10
-    if st.session_state.selected_items:
-        display_df = bar_chart_df[bar_chart_df['Item Purchased'].isin(st.session_state.selected_items)]
-        top_items = display_df['Item Purchased'].value_counts().reset_index()
-        top_items.columns = ['Item', 'Count']
-        chart_title = f'Selected Items ({len(st.session_state.selected_items)} items)'
-    else:
-        top_items = bar_chart_df['Item Purchased'].value_counts().head(10).reset_index()
-        top_items.columns = ['Item', 'Count']
-        chart_title = 'Top 10 Most Purchased Items'
+section = chart_section("7. Bar Chart")
+if section is not None:
+    with section:
+        timer = profile.start("7. Bar Chart")
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            fig1 = bar_figure(tuple(st.session_state.selected_items), timer)
+            timer.lap('figure')
+            st.plotly_chart(fig1, use_container_width=True)
+            timer.lap('render')
+            timer.record_payload(fig1)
+
+        with col2:
+            st.markdown("**Select Items:**")
     
-    fig1 = px.bar(
-        top_items,
-        x='Item',
-        y='Count',
-        title=chart_title,
-        color='Count',
-        color_continuous_scale='Blues',
-    )
-    fig1.update_layout(height=450, xaxis_tickangle=-45)
-    st.plotly_chart(fig1, use_container_width=True)
-
-with col2:
-    st.markdown("**Select Items:**")
+            # Get top 10 items for checkboxes (same row set and cache entry as the bar chart)
+            top_items_for_cb = agg_cache.get_or_compute('top_items', base_key, lambda: aggregations.top_items(cube, filter_state))
+            top_10_items = top_items_for_cb['Item'].tolist()
     
-    # Prepare checkbox base data
-    checkbox_base_df = filtered_df.copy()
+            # Track new selection
+            new_selection = []
     
-    if st.session_state.selected_age_group:
-        age_groups_cb = pd.cut(checkbox_base_df['Age'], bins=[0, 25, 35, 45, 55, 65, 100], 
-                            labels=['18-25', '26-35', '36-45', '46-55', '56-65', '65+'])
-        checkbox_base_df = checkbox_base_df[age_groups_cb.isin(st.session_state.selected_age_group)]
-    
-    if st.session_state.selected_categories:
-        checkbox_base_df = checkbox_base_df[checkbox_base_df['Category'].isin(st.session_state.selected_categories)]
-    
-    # Get top 10 items for checkboxes
-    if len(checkbox_base_df) > 0:
-        top_items_for_cb = checkbox_base_df['Item Purchased'].value_counts().head(10).reset_index()
-        top_items_for_cb.columns = ['Item', 'Count']
-        top_10_items = top_items_for_cb['Item'].tolist()
-    else:
-        top_10_items = []
-    
-    # Track new selection
-    new_selection = []
-    
-    # Checkbox for each item
-    for item in top_10_items:
-        is_checked = st.checkbox(
-            item, 
-            value=item in st.session_state.selected_items,
-            key=f'item_checkbox_{item}_{st.session_state.checkbox_reset_counter}'
-        )
+            # Checkbox for each item
+            for item in top_10_items:
+                is_checked = st.checkbox(
+                    item, 
+                    value=item in st.session_state.selected_items,
+                    key=f'item_checkbox_{item}_{st.session_state.checkbox_reset_counter}'
+                )
         
-        if is_checked:
-            new_selection.append(item)
+                if is_checked:
+                    new_selection.append(item)
     
-    # Update if selection changed
-    if set(new_selection) != set(st.session_state.selected_items):
-        st.session_state.selected_items = new_selection
-        st.rerun()
+            # Update if selection changed
+            if set(new_selection) != set(st.session_state.selected_items):
+                st.session_state.selected_items = new_selection
+                st.rerun()
     
-    # Clear button
-    if st.button("Clear Items", key='clear_items', use_container_width=True):
-        st.session_state.selected_items = []
-        st.session_state.checkbox_reset_counter += 1
-        st.rerun()
+            # Clear button
+            if st.button("Clear Items", key='clear_items', use_container_width=True):
+                st.session_state.selected_items = []
+                st.session_state.checkbox_reset_counter += 1
+                st.rerun()
+
+        timer.stop()
 
-with st.expander("View Insights - Bar Chart"):
-    st.write("""
-    **Purpose:** Shows the top 10 most purchased items in the dataset
+        with st.expander("View Insights - Bar Chart"):
+            st.write("""
+            **Purpose:** Shows the top 10 most purchased items in the dataset
     
-    **Insight:** Identifies best-selling products that drive revenue
+            **Insight:** Identifies best-selling products that drive revenue
     
-    **Business Value:** Helps with inventory management and stock planning for high-demand items
-    """)
-
-st.markdown("---")
+            **Business Value:** Helps with inventory management and stock planning for high-demand items
+            """)
 
 # VISUALIZATION 8: SANKEY DIAGRAM - Customer Journey Flow
-st.header("8. Sankey Diagram - Customer Journey Flow")
-
-if len(final_filtered_df) > 1 and len(final_filtered_df['Payment Method'].unique()) > 1:
-    sankey_df = final_filtered_df.groupby(['Category', 'Payment Method', 'Shipping Type']).size().reset_index(name='count')
-    all_labels = list(pd.concat([sankey_df['Category'], sankey_df['Payment Method'], sankey_df['Shipping Type']]).unique())
-    label_dict = {label: idx for idx, label in enumerate(all_labels)}
-    
-    source, target, values = [], [], []
-    for _, row in sankey_df.iterrows():
-        source.append(label_dict[row['Category']])
-        target.append(label_dict[row['Payment Method']])
-        values.append(row['count'])
-    
-    payment_shipping = final_filtered_df.groupby(['Payment Method', 'Shipping Type']).size().reset_index(name='count')
-    for _, row in payment_shipping.iterrows():
-        source.append(label_dict[row['Payment Method']])
-        target.append(label_dict[row['Shipping Type']])
-        values.append(row['count'])
-    
-    if source:
-        fig5 = go.Figure(data=[go.Sankey(
-            node=dict(pad=15, thickness=20, label=all_labels, color="lightblue"),
-            link=dict(source=source, target=target, value=values)
-        )])
-        fig5.update_layout(title_text="Category → Payment → Shipping Flow", height=600)
-        st.plotly_chart(fig5, use_container_width=True)
-    else:
-        st.info("Insufficient linked data for Sankey Diagram.")
-else:
-    st.info("Insufficient data for Sankey Diagram. Need more varied Payment/Shipping types.")
+section = chart_section("8. Sankey Diagram")
+if section is not None:
+    with section:
+        timer = profile.start("8. Sankey Diagram")
+
+        # Stages are configurable; the default follows the customer journey
+        sankey_stages = st.multiselect(
+            "Flow stages (in order)",
+            options=stage_options,
+            default=default_stages,
+            key='sankey_stages'
+        )
+        sankey_needs_rows = needs_rows(sankey_stages)
 
-with st.expander("View Insights - Sankey Diagram"):
-    st.write("""
-    **Purpose:** Visualizes the customer journey from category selection to payment and shipping preferences
+        if final_records > 1 and len(sankey_stages) >= 2:
+            fig5 = sankey_figure(sankey_stages, timer)
     
-    **Insight:** Flow thickness represents transaction volume through each path
+            if fig5 is not None:
+                timer.lap('figure')
+                st.plotly_chart(fig5, use_container_width=True)
+                timer.lap('render')
+                timer.record_payload(fig5)
+            else:
+                st.info("Insufficient linked data for Sankey Diagram.")
+        else:
+            st.info("Insufficient data for Sankey Diagram. Select at least two stages.")
+
+        timer.stop()
+
+        with st.expander("View Insights - Sankey Diagram"):
+            st.write("""
+            **Purpose:** Visualizes the customer journey from category selection to payment and shipping preferences
     
-    **Business Value:** Understands payment and shipping preferences by category to optimize checkout experience
-    """)
-
-st.markdown("---")
+            **Insight:** Flow thickness represents transaction volume through each path
+    
+            **Business Value:** Understands payment and shipping preferences by category to optimize checkout experience
+            """)
 
 # VISUALIZATION 9: 3D SCATTER PLOT - Multi-dimensional Analysis with Glyphs
-st.header("9. 3D Scatter Plot - Multi-dimensional Analysis with Glyphs")
-
-sample_size_3d = min(1000, len(final_filtered_df))
-
-if sample_size_3d >= 2:
-    scatter_3d = final_filtered_df.sample(sample_size_3d)
+section = chart_section("9. 3D Scatter Plot")
+if section is not None:
+    with section:
+        timer = profile.start("9. 3D Scatter Plot")
+
+        fig8 = None if streaming_mode else scatter_figure(timer)
+        if streaming_mode:
+            st.info("The 3D Scatter Plot needs row-level data and is not available in streaming ingest mode.")
+        elif fig8 is not None:
+            timer.lap('figure')
+            st.plotly_chart(fig8, use_container_width=True)
+            timer.lap('render')
+            timer.record_payload(fig8)
+        else:
+            st.info("Insufficient data for 3D Scatter Plot.")
+
+        timer.stop()
+
+        with st.expander("View Insights - 3D Scatter Plot"):
+            st.write("""
+            **Purpose:** Three-dimensional relationship between age, spending, and customer satisfaction
     
-    # Create symbol mapping for payment methods
-    symbol_map = {
-        'Cash': 'circle',
-        'Credit Card': 'diamond',
-        'Debit Card': 'cross',
-        'PayPal': 'square',
-        'Venmo': 'x',
-        'Bank Transfer': 'diamond-open'
-    }
+            **Insight:** Point shape (glyph) indicates the Payment Method used. This helps identify if certain payment methods correlate with high review scores or high spending
     
-    fig8 = px.scatter_3d(
-        scatter_3d,
-        x='Age',
-        y='Purchase Amount (USD)',
-        z='Review Rating',
-        color='Category',
-        size='Previous Purchases',
-        symbol='Payment Method',
-        symbol_map=symbol_map,
-        hover_data=['Gender', 'Season'],
-        title='Age × Purchase × Rating by Payment Method (Rotate to explore)',
-        color_discrete_sequence=['#3b82f6', '#ef4444', '#fbbf24', '#10b981'] 
+            **Business Value:** Identifies loyal, high-value customer segments based on their preferred payment channels
+            """)
+
+if config.SECTION_MODE == 'all':
+    st.markdown("---")
+
+# PREFETCH: once everything has rendered, warm the cache for the states one
+# category / age group / item checkbox away, which is the most likely next
+# click; only the sections on screen are warmed, for the panels on screen
+if config.PREFETCH_WORKERS > 0:
+    prefetch_tasks = {}
+    if "1. Pie Chart" in shown_sections:
+        prefetch_tasks['pie'] = ('final', lambda state: aggregations.category_sales(cube, state))
+    if "2. Treemap" in shown_sections and hierarchy_options:
+        prefetch_tasks[hierarchy_chart_name(treemap_path, treemap_node)] = (
+            'final', lambda state: hierarchy_slice(treemap_path, treemap_node, state)
+        )
+    if "3. Correlation Heatmap" in shown_sections:
+        prefetch_tasks[correlation_chart] = ('final', lambda state: cube.correlation(state, correlation_method, correlation_partial))
+    if "4. Line Chart" in shown_sections:
+        prefetch_tasks['line'] = ('final', lambda state: aggregations.age_spending(cube, state))
+    if "6. Sunburst Chart" in shown_sections and hierarchy_options:
+        prefetch_tasks[hierarchy_chart_name(sunburst_path, sunburst_node)] = (
+            'final', lambda state: hierarchy_slice(sunburst_path, sunburst_node, state)
+        )
+    if "7. Bar Chart" in shown_sections:
+        prefetch_tasks['selected_items'] = ('final', lambda state: aggregations.item_counts(cube, state) if state.items else None)
+        prefetch_tasks['top_items'] = ('base', lambda state: aggregations.top_items(cube, state))
+    if "8. Sankey Diagram" in shown_sections and len(sankey_stages) >= 2:
+        prefetch_tasks['sankey:' + '|'.join(sankey_stages)] = ('final', lambda state: aggregations.sankey_flow(
+            cube, state, sankey_stages,
+            gather(df, engine.select(state)['final'], sankey_stages) if sankey_needs_rows else None
+        ))
+    if not (streaming_mode or sql_mode):
+        # Row masks only for the toggles the incremental filter cannot patch
+        prefetch_tasks['masks'] = ('final', lambda state: engine.select_masks(state) if switches_selection(filter_state, state) else None)
+
+    load_prefetcher().schedule(
+        st.session_state.session_id, filter_state,
+        {
+            'categories': category_list if "1. Pie Chart" in shown_sections else [],
+            'age_groups': AGE_LABELS if "4. Line Chart" in shown_sections else [],
+            'items': top_10_items,
+        },
+        prefetch_tasks
     )
-    fig8.update_layout(height=600)
-    st.plotly_chart(fig8, use_container_width=True)
-else:
-    st.info("Insufficient data for 3D Scatter Plot.")
-
-with st.expander("View Insights - 3D Scatter Plot"):
-    st.write("""
-    **Purpose:** Three-dimensional relationship between age, spending, and customer satisfaction
-    
-    **Insight:** Point shape (glyph) indicates the Payment Method used. This helps identify if certain payment methods correlate with high review scores or high spending
-    
-    **Business Value:** Identifies loyal, high-value customer segments based on their preferred payment channels
-    """)
-
-st.markdown("---")
 
+# PROFILING PANEL
+st.sidebar.markdown("---")
+st.sidebar.checkbox("Show profiling panel", key='profiling_panel')
+
+profile_records = profile.records + [profile.total_record()]
+st.session_state.profile_history = (st.session_state.profile_history + profile_records)[-500:]
+if config.PROFILE_LOG:
+    profiling.append_log(config.PROFILE_LOG, profile_records)
+
+if st.session_state.profiling_panel:
+    with st.sidebar.expander("Rerun Profile", expanded=True):
+        st.dataframe(
+            pd.DataFrame(profile_records, columns=profiling.FIELDS).drop(columns=['run_id', 'timestamp']),
+            hide_index=True, use_container_width=True
+        )
+        # Background work across every session since the server started
+        for label, workers, pool in (("Chart pool", config.CHART_WORKERS, load_chart_pool),
+                                     ("Prefetch", config.PREFETCH_WORKERS, load_prefetcher)):
+            if workers > 0:
+                pool_stats = pool().stats()
+                st.caption(f"{label}: {pool_stats['completed']:,} completed, "
+                           f"{pool_stats['superseded']:,} superseded, {pool_stats['failed']:,} failed")
+        st.download_button(
+            "Export history (JSON lines)", profiling.to_json_lines(st.session_state.profile_history),
+            file_name='dashboard_profile.jsonl', mime='application/json', use_container_width=True
+        )
+        st.download_button(
+            "Export history (CSV)", profiling.to_csv(st.session_state.profile_history),
+            file_name='dashboard_profile.csv', mime='text/csv', use_container_width=True
+        )
 
 # FOOTER
 st.markdown("---")
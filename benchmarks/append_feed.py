@@ -0,0 +1,67 @@
+"""Append synthetic transactions to a CSV file, to try the live feed mode locally.
+
+Usage (from the repository root), in one terminal:
+
+    python benchmarks/append_feed.py live_feed.csv --rows 200 --interval 2
+
+and in another:
+
+    DASHBOARD_INGEST=live DASHBOARD_LIVE_SOURCE=live_feed.csv streamlit run app.py
+
+Every interval seconds a batch of rows resampled from the real dataset (see
+synthetic_data.py) is appended, written in two parts so the reader also sees
+half-written lines. With a directory instead of a file, each batch goes into
+a new CSV file in it, like a drop folder.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import synthetic_data  # noqa: E402
+
+
+def existing_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def append_batch(path, batch):
+    text = batch.to_csv(header=not os.path.exists(path) or os.path.getsize(path) == 0, index=False)
+    middle = len(text) // 2
+    with open(path, 'a', newline='') as f:
+        f.write(text[:middle])
+        f.flush()
+        time.sleep(0.05)
+        f.write(text[middle:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('target', help='CSV file to append to, or a drop directory')
+    parser.add_argument('--rows', type=int, default=200, help='rows per batch')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between batches')
+    parser.add_argument('--batches', type=int, default=0, help='stop after this many batches (0: run until interrupted)')
+    parser.add_argument('--source', default=config.DATA_FILE)
+    args = parser.parse_args()
+
+    drop_dir = os.path.isdir(args.target)
+    next_id = 1 if drop_dir else existing_rows(args.target) + 1
+    batches = itertools.count() if args.batches == 0 else range(args.batches)
+    for i in batches:
+        batch = next(synthetic_data.generate(args.rows, args.source, seed=next_id, first_id=next_id))
+        path = os.path.join(args.target, f'batch_{time.time_ns()}.csv') if drop_dir else args.target
+        append_batch(path, batch)
+        next_id += len(batch)
+        print(f'batch {i + 1}: {len(batch):,} rows -> {path}', flush=True)
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
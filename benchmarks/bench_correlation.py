@@ -0,0 +1,77 @@
+"""Latency of the correlation heatmap's matrix: row scan vs the cube's moment cells.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_correlation.py --scale 1 10 100 250
+
+--scale replicates the sample dataset to approximate larger extracts. For an
+age slider drag, each method is timed as the row scan (select the rows, then
+DataFrame.corr) and as DataCube.correlation, and every matrix from the cube
+is checked against the row scan.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+from aggregations import NUMERIC_COLS  # noqa: E402
+from correlation import partial_correlation  # noqa: E402
+from cube import DataCube  # noqa: E402
+from filter_engine import FilterEngine, FilterState, gather  # noqa: E402
+
+
+def slider_states(df):
+    genders = df['Gender'].unique().tolist()
+    seasons = df['Season'].unique().tolist()
+    categories = df['Category'].unique().tolist()
+    age_min, age_max = int(df['Age'].min()), int(df['Age'].max())
+    amount = (int(df['Purchase Amount (USD)'].min()), int(df['Purchase Amount (USD)'].max()))
+    return [
+        FilterState.create(genders, seasons, categories, (low, age_max), amount)
+        for low in range(age_min, age_min + 30)
+    ]
+
+
+def median_ms(timings):
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100], help='times to replicate the sample dataset')
+    args = parser.parse_args()
+
+    base = data_store.load_table()
+    print(f"{'rows':>11} {'cells':>7} {'method':>18} {'row scan p50':>13} {'cube p50':>9}")
+    for scale in args.scale:
+        df = pd.concat([base] * scale, ignore_index=True)
+        engine = FilterEngine(df)
+        cube = DataCube(df)
+        for method, partial in (('pearson', False), ('spearman', False), ('pearson', True)):
+            scan_times, cube_times = [], []
+            for state in slider_states(df):
+                start = time.perf_counter()
+                expected = gather(df, engine.select(state)['final'], NUMERIC_COLS).corr(method=method)
+                if partial:
+                    expected = partial_correlation(expected)
+                scan_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                result = cube.correlation(state, method, partial)
+                cube_times.append(time.perf_counter() - start)
+
+                if not np.allclose(result.to_numpy(), expected.to_numpy(), atol=1e-9, equal_nan=True):
+                    raise AssertionError(f'{method} (partial={partial}) differs for {state}')
+            label = method + (' partial' if partial else '')
+            print(f'{len(df):>11,} {cube.moments.n_cells:>7,} {label:>18} '
+                  f'{median_ms(scan_times):11.2f}ms {median_ms(cube_times):7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
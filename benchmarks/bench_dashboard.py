@@ -0,0 +1,203 @@
+"""End-to-end rerun latency of app.py on synthetic extracts of growing size.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_dashboard.py --rows 10000 100000 1000000
+
+For every size a synthetic extract is written to --data-dir (once; later runs
+reuse it and its Parquet store) and app.py is driven headlessly through
+Streamlit's AppTest in a fresh process, so caches and peak memory do not carry
+over between sizes. After the cold first run, scripted interactions are
+replayed: slider drags, checkbox toggles in the category / age group / item
+panels and Reset All Filters. The report gives p50/p95 latency per sequence
+(including the extra pass a checkbox's st.rerun() causes), peak RSS, and the
+per-section cost taken from the dashboard's own rerun profile.
+
+--chart-workers runs every size once per value of DASHBOARD_CHART_WORKERS
+(0: sections prepared one after another; more: on that many threads, see
+chart_pool.py), to compare the two modes.
+
+--json appends the results as one JSON line per run, for tracking
+regressions across commits.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic_data  # noqa: E402
+
+APP = os.path.join(ROOT, 'app.py')
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q)) * 1000 if timings else float('nan')
+
+
+def checkbox(at, prefix, label):
+    # Checkbox keys carry the reset counter, so match on the stable part
+    return next(c for c in at.checkbox if c.key.startswith(f'{prefix}_{label}_'))
+
+
+def toggle(prefix, label):
+    def step(at):
+        box = checkbox(at, prefix, label)
+        box.set_value(not box.value)
+    return step
+
+
+def set_slider(index, value):
+    return lambda at: at.sidebar.slider[index].set_value(value)
+
+
+def click(label):
+    return lambda at: next(b for b in at.button if b.label == label).click()
+
+
+def interaction_sequences(at):
+    age_min, age_max = at.sidebar.slider[0].value
+    amount_min, amount_max = at.sidebar.slider[1].value
+    categories = [c.label for c in at.checkbox if c.key.startswith('cat_checkbox_')]
+    age_groups = [c.label for c in at.checkbox if c.key.startswith('age_checkbox_')]
+    items = [c.label for c in at.checkbox if c.key.startswith('item_checkbox_')][:3]
+
+    age_stops = list(range(age_min, age_min + 10))
+    amount_stops = list(range(amount_max, amount_max - 20, -2))
+    return {
+        'age slider drag': [set_slider(0, (low, age_max)) for low in age_stops[1:] + age_stops[::-1]],
+        'purchase slider drag': [set_slider(1, (amount_min, high)) for high in amount_stops[1:] + amount_stops[::-1]],
+        'category toggles': [toggle('cat_checkbox', cat) for cat in categories[:2] * 2],
+        'age group toggles': [toggle('age_checkbox', group) for group in age_groups[:3] * 2],
+        'item toggles': [toggle('item_checkbox', item) for item in items * 2],
+        'reset all filters': [
+            toggle('cat_checkbox', categories[0]), toggle('age_checkbox', age_groups[0]),
+            click('Reset All Filters'),
+        ],
+    }
+
+
+def run_app(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError('; '.join(e.message for e in at.exception))
+    return elapsed
+
+
+def worker(timeout):
+    """Drive app.py for the extract named by DASHBOARD_DATA_FILE; print one JSON line."""
+    import data_store
+    from streamlit.testing.v1 import AppTest
+
+    store_was_current = data_store.is_store_current(os.environ['DASHBOARD_DATA_FILE'])
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    cold = run_app(at)
+    cold_rss = peak_rss_mb()
+    first_record = len(at.session_state['profile_history'])
+
+    sequences = {}
+    for name, steps in interaction_sequences(at).items():
+        timings = []
+        for step in steps:
+            step(at)
+            timings.append(run_app(at))
+        sequences[name] = {'p50_ms': percentile_ms(timings, 50), 'p95_ms': percentile_ms(timings, 95),
+                           'steps': len(timings)}
+
+    sections = {}
+    for record in at.session_state['profile_history'][first_record:]:
+        sections.setdefault(record['section'], []).append(record)
+    section_costs = {
+        name: {
+            'p50_ms': float(np.percentile([r['total_ms'] for r in records], 50)),
+            'p95_ms': float(np.percentile([r['total_ms'] for r in records], 95)),
+            'payload_bytes': max((r.get('payload_bytes') or 0) for r in records),
+        }
+        for name, records in sections.items()
+    }
+    print(json.dumps({
+        'cold_s': cold, 'store_was_current': store_was_current,
+        'cold_peak_rss_mb': cold_rss, 'peak_rss_mb': peak_rss_mb(),
+        'sequences': sequences, 'sections': section_costs,
+    }))
+
+
+def bench_size(rows, chart_workers, args):
+    csv_path = os.path.join(args.data_dir, f'shopping_{rows}.csv')
+    if not os.path.exists(csv_path):
+        print(f'Writing {rows:,} synthetic rows to {csv_path} ...', flush=True)
+        synthetic_data.write_csv(csv_path, rows)
+
+    env = dict(os.environ, DASHBOARD_DATA_FILE=csv_path, DASHBOARD_PROFILING='1',
+               DASHBOARD_PREFETCH_WORKERS=str(args.prefetch_workers), DASHBOARD_CHART_WORKERS=str(chart_workers))
+    done = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', '--timeout', str(args.timeout)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if done.returncode != 0:
+        raise RuntimeError(f'{rows:,} rows: worker failed\n{done.stderr[-2000:]}')
+    result = json.loads(done.stdout.strip().splitlines()[-1])
+    result['rows'] = rows
+    result['chart_workers'] = chart_workers
+    return result
+
+
+def print_report(result):
+    rss = result['peak_rss_mb']
+    print(f"\n{result['rows']:,} rows, {result['chart_workers'] or 'no'} chart workers: cold start {result['cold_s']:.2f}s"
+          f"{'' if result['store_was_current'] else ' (store built)'}, "
+          f"peak RSS {'n/a' if rss is None else f'{rss:,.0f} MB'}")
+    print(f"  {'sequence':28} {'p50':>9} {'p95':>9}")
+    for name, timing in result['sequences'].items():
+        print(f"  {name:28} {timing['p50_ms']:7.0f}ms {timing['p95_ms']:7.0f}ms")
+    print(f"  {'section':28} {'p50':>9} {'p95':>9} {'payload':>10}")
+    for name, cost in sorted(result['sections'].items(), key=lambda item: -item[1]['p95_ms']):
+        print(f"  {name:28} {cost['p50_ms']:7.1f}ms {cost['p95_ms']:7.1f}ms {cost['payload_bytes'] / 1024:8.0f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, '.bench_data'))
+    parser.add_argument('--prefetch-workers', type=int, default=0,
+                        help='background prefetch threads (off by default so timings are repeatable)')
+    parser.add_argument('--chart-workers', type=int, nargs='+', default=[0],
+                        help='threads preparing the charts in parallel, one run per value (0: sequential)')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds allowed per rerun')
+    parser.add_argument('--json', help='append one JSON line per run to this file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.timeout)
+        return
+
+    for rows in args.rows:
+        for chart_workers in args.chart_workers:
+            result = bench_size(rows, chart_workers, args)
+            print_report(result)
+            if args.json:
+                with open(args.json, 'a') as f:
+                    f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
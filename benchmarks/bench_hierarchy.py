@@ -0,0 +1,111 @@
+"""Latency and payload of the sunburst: the whole tree vs drill-down slices.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_hierarchy.py --scale 1 64 --skus 20000
+
+--scale replicates the sample dataset to approximate larger extracts, and
+--skus replaces its 25 items with a Zipf-distributed catalog of that many
+SKUs (0 keeps the sample's items). For random sidebar selections the Season →
+Category → Item sunburst is computed
+
+- as before slices: the cube rollup to every leaf (``rollup``), and the whole
+  tree drawn from the hierarchy index (``full tree``: every node, no Other);
+- as the dashboard draws it: the slice at the top of the hierarchy
+  (``top slice``) and the slice of one category drilled into within a season
+  (``drilled``), --levels deep with the --top-n largest children per node.
+
+The node counts and payload (the JSON of the trace arrays sent to the
+browser) are medians over the states.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+from bench_top_items import median_ms  # noqa: E402
+from cube import DataCube  # noqa: E402
+from filter_engine import FilterState  # noqa: E402
+
+PATH = ['Season', 'Category', 'Item Purchased']
+AMOUNT = 'Purchase Amount (USD)'
+
+
+def broad_states(df, n, seed=0):
+    """Sidebar selections keeping most of the table, as when a user starts drilling."""
+    rng = random.Random(seed)
+    values = {col: df[col].unique().tolist() for col in ('Gender', 'Season', 'Category')}
+    age, amount = (int(df['Age'].min()), int(df['Age'].max())), (int(df[AMOUNT].min()), int(df[AMOUNT].max()))
+    return [
+        FilterState.create(
+            *(rng.sample(options, rng.randint(len(options) - 1, len(options))) for options in values.values()),
+            (age[0] + rng.randint(0, 5), age[1] - rng.randint(0, 5)),
+            (amount[0] + rng.randint(0, 10), amount[1] - rng.randint(0, 10)),
+        )
+        for _ in range(n)
+    ]
+
+
+def payload_kb(nodes):
+    arrays = [nodes[col].tolist() for col in ('id', 'label', 'parent', AMOUNT, 'color')]
+    return len(json.dumps(arrays)) / 1024
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 64], help='times to replicate the sample dataset')
+    parser.add_argument('--skus', type=int, default=20000, help='size of the synthetic item catalog (0: sample items)')
+    parser.add_argument('--levels', type=int, default=3, help='levels drawn below the node drilled into')
+    parser.add_argument('--top-n', type=int, default=12, help='children kept per node')
+    parser.add_argument('--states', type=int, default=20, help='number of random filter states')
+    args = parser.parse_args()
+
+    base = data_store.load_table()
+    print(f"{'rows':>11} {'items':>7} {'index build':>12} {'view':>10} {'p50':>9} {'nodes':>7} {'payload':>10}")
+    for scale in args.scale:
+        df = pd.concat([base] * scale, ignore_index=True)
+        if args.skus:
+            skus = np.minimum(np.random.default_rng(0).zipf(1.3, len(df)), args.skus)
+            df['Item Purchased'] = pd.Categorical([f'SKU-{sku:05d}' for sku in skus])
+        cube = DataCube(df)
+        build_s, _ = timed(lambda: cube.hierarchy(PATH))
+        states = broad_states(df, args.states)
+
+        views = {
+            'rollup': lambda state: cube.rollup(state, PATH),
+            'full tree': lambda state: cube.hierarchy_slice(state, PATH, (), len(PATH), len(df)),
+            'top slice': lambda state: cube.hierarchy_slice(state, PATH, (), args.levels, args.top_n),
+            'drilled': lambda state: cube.hierarchy_slice(
+                state, PATH, (state.season[0], state.category[0]), args.levels, args.top_n
+            ),
+        }
+        for i, (view, compute) in enumerate(views.items()):
+            timings, nodes, payloads = [], [], []
+            for state in states:
+                seconds, result = timed(lambda: compute(state))
+                timings.append(seconds)
+                if view != 'rollup':
+                    nodes.append(len(result))
+                    payloads.append(payload_kb(result))
+            size = f'{np.median(nodes):>7,.0f} {np.median(payloads):8.1f}KB' if nodes else f"{'':>7} {'':>10}"
+            first = f'{len(df):>11,} {df["Item Purchased"].nunique():>7,} {build_s * 1000:10.0f}ms' if i == 0 \
+                else f"{'':>11} {'':>7} {'':>12}"
+            print(f'{first} {view:>10} {median_ms(timings):7.2f}ms {size}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Latency of full vs incremental filter evaluation for slider-drag sequences.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_incremental_filter.py --scale 250
+
+--scale replicates the sample dataset to approximate larger extracts. Every
+step is checked against a full evaluation so the benchmark doubles as a
+correctness check for IncrementalFilter.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+from derived import AGE_LABELS  # noqa: E402
+from filter_engine import FilterEngine, FilterState  # noqa: E402
+from incremental_filter import IncrementalFilter  # noqa: E402
+
+
+def interaction_sequences(df):
+    genders = df['Gender'].unique().tolist()
+    seasons = df['Season'].unique().tolist()
+    categories = df['Category'].unique().tolist()
+    items = df['Item Purchased'].value_counts().index[:6].tolist()
+    age_min, age_max = int(df['Age'].min()), int(df['Age'].max())
+    amount_min, amount_max = int(df['Purchase Amount (USD)'].min()), int(df['Purchase Amount (USD)'].max())
+
+    def state(age=(age_min, age_max), amount=(amount_min, amount_max), **interactive):
+        return FilterState.create(genders, seasons, categories, age, amount, **interactive)
+
+    age_stops = list(range(age_min, age_min + 30))
+    amount_stops = list(range(amount_max, amount_max - 40, -2))
+    return {
+        'age slider drag (narrow, then widen)':
+            [state(age=(low, age_max)) for low in age_stops + age_stops[::-1]],
+        'purchase slider drag (narrow, then widen)':
+            [state(amount=(amount_min, high)) for high in amount_stops + amount_stops[::-1]],
+        'item checkbox toggles':
+            [state(items=items[:k]) for k in list(range(len(items) + 1)) + list(range(len(items), -1, -1))],
+        'age group toggles under a narrowed slider':
+            [state(age=(25, 60), age_groups=AGE_LABELS[:k]) for k in range(len(AGE_LABELS) + 1)],
+    }
+
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=100, help='times to replicate the sample dataset')
+    args = parser.parse_args()
+
+    base = data_store.load_table()
+    df = pd.concat([base] * args.scale, ignore_index=True)
+    engine = FilterEngine(df)
+    print(f'{len(df):,} rows\n')
+    print(f"{'sequence':45} {'full p50':>9} {'full p95':>9} {'incr p50':>9} {'incr p95':>9}  incremental steps")
+
+    for name, states in interaction_sequences(df).items():
+        incremental = IncrementalFilter(engine)
+        full_times, incr_times = [], []
+        for state in states:
+            start = time.perf_counter()
+            expected = engine.select(state)
+            full_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            result = incremental.select(state)
+            incr_times.append(time.perf_counter() - start)
+
+            for scope, rows in expected.items():
+                if not np.array_equal(rows, result[scope]):
+                    raise AssertionError(f'{name}: {scope} rows differ for {state}')
+
+        # The first step has no previous state and is always a full evaluation
+        print(f'{name:45} {percentile_ms(full_times[1:], 50):8.2f}ms {percentile_ms(full_times[1:], 95):8.2f}ms '
+              f'{percentile_ms(incr_times[1:], 50):8.2f}ms {percentile_ms(incr_times[1:], 95):8.2f}ms  '
+              f"{incremental.mode_counts['incremental']}/{len(states) - 1}")
+
+
+if __name__ == '__main__':
+    main()
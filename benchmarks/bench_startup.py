@@ -0,0 +1,112 @@
+"""Cold-start time of the dashboard for each correlation heatmap renderer.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_startup.py --repeat 5
+
+Every repeat starts a fresh Python process, imports Streamlit's AppTest and
+runs app.py once, i.e. the work a new dashboard pod does before it serves its
+first page. The data store is built beforehand, so only imports and the first
+render are timed. The report gives the median time to import the app's
+modules, the median first run and whether matplotlib was imported at all.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import charts  # noqa: E402
+
+APP = os.path.join(ROOT, 'app.py')
+
+
+def app_imports():
+    """The import statements at the top level of app.py, compiled in their order."""
+    with open(APP) as f:
+        tree = ast.parse(f.read(), APP)
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return compile(ast.Module(body=imports, type_ignores=[]), APP, 'exec')
+
+
+def worker(timeout):
+    """Time the imports and the first run of app.py in this fresh process; print one JSON line."""
+    statements = app_imports()
+    start = time.perf_counter()
+    exec(statements, {})
+    imports = time.perf_counter() - start
+
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError('; '.join(e.message for e in at.exception))
+    print(json.dumps({
+        'imports_s': imports, 'first_run_s': first_run,
+        'matplotlib_loaded': 'matplotlib' in sys.modules,
+    }))
+
+
+def measure(renderer, args):
+    env = dict(os.environ, DASHBOARD_HEATMAP=renderer, DASHBOARD_PREFETCH_WORKERS='0')
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        done = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', '--timeout', str(args.timeout)],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        wall = time.perf_counter() - start
+        if done.returncode != 0:
+            raise RuntimeError(f'{renderer}: worker failed\n{done.stderr[-2000:]}')
+        run = json.loads(done.stdout.strip().splitlines()[-1])
+        run['process_s'] = wall
+        runs.append(run)
+    return {
+        'renderer': renderer,
+        'imports_s': float(np.median([r['imports_s'] for r in runs])),
+        'first_run_s': float(np.median([r['first_run_s'] for r in runs])),
+        'process_s': float(np.median([r['process_s'] for r in runs])),
+        'matplotlib_loaded': runs[0]['matplotlib_loaded'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renderers', nargs='+', default=sorted(charts.RENDERERS['heatmap']))
+    parser.add_argument('--repeat', type=int, default=5, help='fresh processes per renderer')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds allowed for the first run')
+    parser.add_argument('--json', help='append one JSON line per renderer to this file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.timeout)
+        return
+
+    import config
+    import data_store
+    if config.INGEST_MODE == 'store' and not data_store.is_store_current(config.DATA_FILE):
+        data_store.build_store(config.DATA_FILE)
+
+    print(f"{'heatmap':12} {'imports':>9} {'first run':>10} {'process':>9}  matplotlib")
+    for renderer in args.renderers:
+        result = measure(renderer, args)
+        print(f"{renderer:12} {result['imports_s']:8.2f}s {result['first_run_s']:9.2f}s "
+              f"{result['process_s']:8.2f}s  {'loaded' if result['matplotlib_loaded'] else 'not loaded'}")
+        if args.json:
+            with open(args.json, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Latency of the Top-10 items list: full item rollup vs the cube's item sketch.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_top_items.py --scale 1 64 256 --skus 20000
+
+--scale replicates the sample dataset to approximate larger extracts, and
+--skus replaces its 25 items with a Zipf-distributed catalog of that many
+SKUs (0 keeps the sample's items). For random filter states, each capacity
+is timed as the full rollup (item_counts(...).head(10)) and as
+aggregations.top_items, whose results are checked against each other.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregations  # noqa: E402
+import data_store  # noqa: E402
+import derived  # noqa: E402
+from cube import DataCube  # noqa: E402
+from filter_engine import FilterState  # noqa: E402
+
+
+def random_states(df, n, seed=0):
+    rng = random.Random(seed)
+    genders = df['Gender'].unique().tolist()
+    seasons = df['Season'].unique().tolist()
+    categories = df['Category'].unique().tolist()
+    return [
+        FilterState.create(
+            rng.sample(genders, rng.randint(1, len(genders))),
+            rng.sample(seasons, rng.randint(1, len(seasons))),
+            rng.sample(categories, rng.randint(1, len(categories))),
+            (rng.randint(18, 40), rng.randint(41, 70)),
+            (rng.randint(20, 50), rng.randint(51, 100)),
+            age_groups=rng.sample(derived.AGE_LABELS, rng.randint(0, 2)),
+            categories=rng.sample(categories, rng.randint(0, 2)),
+        )
+        for _ in range(n)
+    ]
+
+
+def median_ms(timings):
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 64], help='times to replicate the sample dataset')
+    parser.add_argument('--skus', type=int, default=20000, help='size of the synthetic item catalog (0: sample items)')
+    parser.add_argument('--capacity', type=int, nargs='+', default=[16, 64], help='item counters kept per cell')
+    parser.add_argument('--states', type=int, default=40, help='number of random filter states')
+    args = parser.parse_args()
+
+    base = data_store.load_table()
+    print(f"{'rows':>11} {'items':>7} {'capacity':>8} {'counters':>9} {'rollup p50':>11} {'sketch p50':>11}")
+    for scale in args.scale:
+        df = pd.concat([base] * scale, ignore_index=True)
+        if args.skus:
+            skus = np.minimum(np.random.default_rng(0).zipf(1.3, len(df)), args.skus)
+            df['Item Purchased'] = pd.Categorical([f'SKU-{sku:05d}' for sku in skus])
+        states = random_states(df, args.states)
+        for capacity in args.capacity:
+            cube = DataCube(df, item_capacity=capacity)
+            rollup_times, sketch_times = [], []
+            for state in states:
+                start = time.perf_counter()
+                expected = aggregations.item_counts(cube, state, scope='base').head(10)
+                rollup_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                result = aggregations.top_items(cube, state)
+                sketch_times.append(time.perf_counter() - start)
+
+                if result['Item'].tolist() != expected['Item'].tolist() or \
+                        result['Count'].tolist() != expected['Count'].tolist():
+                    raise AssertionError(f'Top-10 differs for {state}')
+            print(f"{len(df):>11,} {df['Item Purchased'].nunique():>7,} {capacity:>8} {cube.items.n_counters:>9,} "
+                  f'{median_ms(rollup_times):9.2f}ms {median_ms(sketch_times):9.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Many concurrent dashboard sessions against one server process.
+
+Usage (from the repository root):
+
+    python benchmarks/load_test.py --sessions 1 4 16
+
+For every session count a fresh process runs app.py like a Streamlit server
+does: each session is a thread with its own Streamlit AppTest (its own
+session state), and all of them share the process's st.cache_resource
+objects (the table, cube and the aggregate and figure caches). Each session
+renders the dashboard once, then replays the interaction scripts of
+bench_dashboard.py (slider drags, checkbox toggles, Reset All Filters; pick
+some with --sequences), with
+--think seconds between steps. With --script identical every session replays
+them in the same order (users acting in lockstep, the worst case for
+duplicated work); with --script staggered each session starts at a different
+script.
+
+The report gives throughput (reruns per second of wall time), p50/p95/p99
+and worst rerun latency, the first render's latency, peak RSS, and how the
+shared aggregate cache served the load: computed (misses), reused (hits) and
+joined in flight (requests that waited for the same computation running for
+another session instead of repeating it). Times include AppTest's own
+handling of the script's messages, but no browser or network.
+
+Set the usual DASHBOARD_* variables to load another extract or layout, and
+--json to append one JSON line per session count.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner  # noqa: E402
+
+from bench_dashboard import APP, interaction_sequences, peak_rss_mb, percentile_ms, run_app  # noqa: E402
+
+CACHE_CAPTION = re.compile(r'Aggregate cache: ([\d,]+) hits / ([\d,]+) misses, ([\d,]+) KB .* ([\d,]+) joined in flight')
+
+
+class _InstallOnly(type):
+    def __setattr__(cls, name, value):
+        if name != '_instance':
+            super().__setattr__(name, value)
+        elif value is not None:
+            Runtime._instance = value
+
+
+def share_server_state():
+    """Let AppTest sessions run concurrently, sharing what a server shares.
+
+    AppTest installs a mock Runtime singleton for each run and clears it when
+    the run ends, which would pull it from under the sessions still running:
+    its runs see a subclass through which runtimes are only installed. Each
+    run also compiles app.py into a ScriptCache of its own, and concurrent
+    compiles can fail on Python 3.11; a server compiles it once into one
+    ScriptCache, and so do the sessions here.
+    """
+    class SharedRuntime(Runtime, metaclass=_InstallOnly):
+        pass
+
+    script_cache = ScriptCache()
+    app_test.Runtime = SharedRuntime
+    local_script_runner.ScriptCache = lambda: script_cache
+
+
+def cache_counts(caption):
+    match = CACHE_CAPTION.match(caption)
+    if match is None:
+        return {'hits': 0, 'misses': 0, 'kb': 0, 'coalesced': 0}
+    hits, misses, kilobytes, coalesced = (int(n.replace(',', '')) for n in match.groups())
+    return {'hits': hits, 'misses': misses, 'kb': kilobytes, 'coalesced': coalesced}
+
+
+def session(index, args, barrier, results):
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    barrier.wait()
+    record = results[index] = {'first_s': run_app(at), 'timings': []}
+    sequences = [(name, steps) for name, steps in interaction_sequences(at).items()
+                 if not args.sequences or name in args.sequences]
+    if args.script == 'staggered':
+        shift = index % len(sequences)
+        sequences = sequences[shift:] + sequences[:shift]
+    for _, steps in sequences:
+        for step in steps:
+            time.sleep(args.think)
+            step(at)
+            record['timings'].append(run_app(at))
+    # The sidebar of the last rerun shows the shared cache's counters
+    record['cache_caption'] = next((c.value for c in at.sidebar.caption if c.value.startswith('Aggregate cache')), '')
+
+
+def worker(args):
+    """Run the given number of concurrent sessions in this process; print one JSON line."""
+    n_sessions = args.sessions[0]
+    share_server_state()
+    barrier = threading.Barrier(n_sessions)
+    results = [None] * n_sessions
+    errors = []
+
+    def run(index):
+        try:
+            session(index, args, barrier, results)
+        except Exception as error:
+            errors.append(f'session {index}: {error!r}')
+            barrier.abort()
+
+    threads = [threading.Thread(target=run, args=(i,), name=f'session-{i}') for i in range(n_sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    if errors:
+        raise RuntimeError('; '.join(errors))
+
+    timings = [t for record in results for t in record['timings']]
+    first = [record['first_s'] for record in results]
+    # The counters only grow, so the largest were read by the session finishing last
+    counts = max((cache_counts(record['cache_caption']) for record in results), key=lambda c: c['hits'] + c['misses'])
+    print(json.dumps({
+        'sessions': n_sessions, 'script': args.script, 'wall_s': wall,
+        'reruns': len(timings) + len(first), 'throughput': (len(timings) + len(first)) / wall,
+        'first_p50_ms': percentile_ms(first, 50), 'first_max_ms': max(first) * 1000,
+        'p50_ms': percentile_ms(timings, 50), 'p95_ms': percentile_ms(timings, 95),
+        'p99_ms': percentile_ms(timings, 99), 'max_ms': max(timings, default=float('nan')) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+        'cache': counts,
+    }))
+
+
+def run_sessions(sessions, args):
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker', '--sessions', str(sessions),
+        '--script', args.script, '--think', str(args.think), '--timeout', str(args.timeout),
+    ] + (['--sequences', *args.sequences] if args.sequences else [])
+    env = dict(os.environ, DASHBOARD_PREFETCH_WORKERS=str(args.prefetch_workers))
+    done = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if done.returncode != 0:
+        raise RuntimeError(f'{sessions} sessions: worker failed\n{done.stderr[-2000:]}')
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def print_report(results):
+    print(f"{'sessions':>8} {'reruns':>7} {'rerun/s':>8} {'first p50':>10} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'max':>8} {'peak RSS':>9} {'computed':>9} {'reused':>8} {'joined':>7}")
+    for r in results:
+        rss = 'n/a' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:,.0f}MB"
+        cache = r['cache']
+        print(f"{r['sessions']:>8} {r['reruns']:>7} {r['throughput']:8.2f} {r['first_p50_ms']:8.0f}ms "
+              f"{r['p50_ms']:6.0f}ms {r['p95_ms']:6.0f}ms {r['p99_ms']:6.0f}ms {r['max_ms']:6.0f}ms {rss:>9} "
+              f"{cache['misses']:>9,} {cache['hits']:>8,} {cache['coalesced']:>7,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16], help='concurrent sessions per run')
+    parser.add_argument('--script', choices=['identical', 'staggered'], default='identical',
+                        help='all sessions replay the scripts in the same order, or each from a different one')
+    parser.add_argument('--sequences', nargs='+', help="interaction scripts to replay, e.g. 'category toggles' (default: all)")
+    parser.add_argument('--think', type=float, default=0.0, help='seconds a session waits before each step')
+    parser.add_argument('--prefetch-workers', type=int, default=0,
+                        help='background prefetch threads (off by default so runs are repeatable)')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds allowed per rerun')
+    parser.add_argument('--json', help='append one JSON line per session count to this file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    results = []
+    for sessions in args.sessions:
+        results.append(run_sessions(sessions, args))
+        if args.json:
+            with open(args.json, 'a') as f:
+                f.write(json.dumps(results[-1]) + '\n')
+    print_report(results)
+
+
+if __name__ == '__main__':
+    main()
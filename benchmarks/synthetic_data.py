@@ -0,0 +1,54 @@
+"""Synthetic shopping extracts with the real schema, at any size.
+
+Rows are drawn with replacement from Shopping_behavior_updated.csv, so every
+column keeps its observed distribution and the joint ones the charts depend
+on (item -> category, age x amount x rating) are preserved. Customer IDs are
+renumbered so the cleaning step does not drop the copies as duplicates.
+
+Usage (from the repository root):
+
+    python benchmarks/synthetic_data.py 1000000 .bench_data/shopping_1000000.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+
+def generate(n_rows, source=None, seed=0, chunk_rows=1_000_000, first_id=1):
+    """Yield frames totalling n_rows rows, chunk_rows at a time."""
+    sample = pd.read_csv(source or config.DATA_FILE)
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, chunk_rows):
+        size = min(chunk_rows, n_rows - start)
+        chunk = sample.iloc[rng.integers(0, len(sample), size)].reset_index(drop=True)
+        chunk['Customer ID'] = np.arange(first_id + start, first_id + start + size)
+        yield chunk
+
+
+def write_csv(path, n_rows, source=None, seed=0):
+    """Write a synthetic extract to path (through a temporary file) and return path."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    for i, chunk in enumerate(generate(n_rows, source, seed)):
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic extract with the real column schema.')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('out')
+    parser.add_argument('--source', default=config.DATA_FILE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_csv(args.out, args.rows, args.source, args.seed)
+    print(f'Wrote {args.rows:,} rows to {args.out}')
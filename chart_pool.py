@@ -0,0 +1,56 @@
+"""Preparation of a rerun's chart sections on a thread pool.
+
+Once the filter state is known no section depends on another, yet the script
+draws them one after another, so a rerun costs the sum of its charts. With
+DASHBOARD_CHART_WORKERS > 0, app.py hands the aggregate and figure of every
+visible section to the ChartPool before the first section draws, through the
+same functions the sections call. The sections then run as before: their
+lookups in the shared caches find the results, or wait for the computation in
+flight (see aggregate_cache.py), so each section waits only for its own chart
+and the rerun for the slowest.
+
+The workers are threads, shared by every session. DuckDB queries (SQL mode),
+NumPy and much of pandas release the GIL, while building plotly and
+matplotlib figures holds it, so how much of a rerun overlaps depends on the
+charts and the cores available. Work still queued for a rerun that the same
+session has since replaced is dropped.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ChartPool:
+    def __init__(self, workers):
+        self.completed = 0
+        self.superseded = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='charts')
+        self._lock = threading.Lock()
+        self._generations = {}
+
+    def prepare(self, owner, tasks):
+        """Start tasks (name -> function) for owner's rerun, dropping its older queued ones."""
+        with self._lock:
+            generation = self._generations.get(owner, 0) + 1
+            self._generations[owner] = generation
+        for task in tasks.values():
+            self._executor.submit(self._run, owner, generation, task)
+        return len(tasks)
+
+    def _run(self, owner, generation, task):
+        if self._generations.get(owner) != generation:
+            with self._lock:
+                self.superseded += 1
+            return
+        try:
+            task()
+        except Exception:
+            # The section computes it again in the script thread and shows the error
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            self.completed += 1
+
+    def stats(self):
+        return {'completed': self.completed, 'superseded': self.superseded, 'failed': self.failed}
@@ -0,0 +1,31 @@
+"""Chart renderers, imported on first use.
+
+A renderer module draws one chart with one plotting library. It provides
+``figure(data)``, which builds the figure, and ``show(figure)``, which sends
+it to the page. RENDERERS maps each chart to its renderers by name, as module
+paths, so a library is imported only when a renderer that needs it is first
+loaded: a process that draws the correlation heatmap with plotly never imports
+matplotlib or seaborn (together about half a second and a font cache scan
+per cold start).
+"""
+import importlib
+
+RENDERERS = {
+    'heatmap': {
+        'matplotlib': 'charts.heatmap_matplotlib',
+        'plotly': 'charts.heatmap_plotly',
+    },
+}
+
+
+def register(chart, name, module):
+    RENDERERS.setdefault(chart, {})[name] = module
+
+
+def load(chart, name):
+    """The renderer module called name for chart, imported on the first call."""
+    try:
+        module = RENDERERS[chart][name]
+    except KeyError:
+        raise ValueError(f"No renderer {name!r} for {chart!r}; choose from {sorted(RENDERERS.get(chart, {}))}") from None
+    return importlib.import_module(module)
@@ -0,0 +1,224 @@
+"""Plotly figures of the chart sections, and how to refill them with new data.
+
+Each entry of FIGURES pairs a ``build(data, **options)`` function, which draws
+the figure with plotly express, with an optional ``patch(figure, data,
+**options)`` function. patch receives a copy of a figure built earlier for the
+same chart and replaces only its data arrays (and the title when it depends
+on the data), keeping the layout, colour scales and trace styling. Charts
+whose trace set depends on the data (the 3D scatter sample draws one trace
+per category and payment method) have no patch function and are always
+built. See figure_cache.py for how the two are used.
+"""
+from dataclasses import dataclass
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+AMOUNT = 'Purchase Amount (USD)'
+
+# Glyph per payment method in the 3D scatter sample
+SYMBOL_MAP = {
+    'Cash': 'circle',
+    'Credit Card': 'diamond',
+    'Debit Card': 'cross',
+    'PayPal': 'square',
+    'Venmo': 'x',
+    'Bank Transfer': 'diamond-open'
+}
+
+# px.scatter_3d's default largest marker size, used again when patching
+SIZE_MAX = 20
+
+
+@dataclass(frozen=True)
+class ChartFigure:
+    build: object
+    patch: object = None
+
+
+# Hover text of the treemap and sunburst, as plotly express writes it for a path
+HIERARCHY_HOVER = ('labels=%{label}<br>Purchase Amount (USD)_sum=%{value}<br>parent=%{parent}<br>id=%{id}'
+                   '<br>Purchase Amount (USD)=%{color}<extra></extra>')
+
+
+def hierarchy(nodes, chart, title, color_continuous_scale):
+    """px.treemap / px.sunburst of the nodes of a slice (see hierarchy_index.py)."""
+    fig = chart(
+        nodes,
+        ids='id',
+        names='label',
+        parents='parent',
+        values=AMOUNT,
+        color='color',
+        color_continuous_scale=color_continuous_scale,
+        branchvalues='total',
+        labels={'color': AMOUNT},
+        title=title
+    )
+    fig.update_traces(hovertemplate=HIERARCHY_HOVER)
+    return fig
+
+
+def patch_hierarchy(fig, nodes, title):
+    fig.update_traces(
+        ids=nodes['id'].to_numpy(dtype=object), labels=nodes['label'].to_numpy(dtype=object),
+        parents=nodes['parent'].to_numpy(dtype=object), values=nodes[AMOUNT].to_numpy(dtype=float),
+        marker_colors=nodes['color'].to_numpy(dtype=float)
+    )
+    fig.update_layout(title_text=title)
+
+
+def pie(category_sales):
+    fig = px.pie(
+        category_sales,
+        values='Purchase Amount (USD)',
+        names='Category',
+        title='Sales Distribution by Category',
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(height=450)
+    return fig
+
+
+def patch_pie(fig, category_sales):
+    fig.update_traces(labels=category_sales['Category'].to_numpy(dtype=object), values=category_sales[AMOUNT].to_numpy())
+
+
+def treemap(treemap_nodes, title):
+    fig = hierarchy(treemap_nodes, px.treemap, title, 'Blues')
+    fig.update_layout(height=500)
+    return fig
+
+
+def line(age_spending):
+    fig = px.line(
+        age_spending,
+        x='Age Group',
+        y='Purchase Amount (USD)',
+        title='Average Purchase Amount by Age Group',
+        markers=True,
+        line_shape='linear'
+    )
+    fig.update_traces(line=dict(color='#059669', width=3), marker=dict(size=12))
+    fig.update_layout(height=450)
+    return fig
+
+
+def patch_line(fig, age_spending):
+    fig.update_traces(x=age_spending['Age Group'].to_numpy(dtype=object), y=age_spending[AMOUNT].to_numpy())
+
+
+def parallel(parallel_df, dimensions, color, title, color_continuous_scale='Viridis'):
+    fig = px.parallel_coordinates(
+        parallel_df,
+        dimensions=list(dimensions),
+        color=color,
+        color_continuous_scale=color_continuous_scale,
+        title=title
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+def patch_parallel(fig, parallel_df, dimensions, color, title, color_continuous_scale='Viridis'):
+    fig.update_traces(
+        dimensions=[dict(label=col, values=parallel_df[col].to_numpy()) for col in dimensions],
+        line_color=parallel_df[color].to_numpy()
+    )
+    fig.update_layout(title_text=title)
+
+
+def sunburst(sunburst_nodes, title):
+    fig = hierarchy(sunburst_nodes, px.sunburst, title, 'RdBu_r')
+    fig.update_layout(height=600)
+    return fig
+
+
+def bar(top_items, title):
+    fig = px.bar(
+        top_items,
+        x='Item',
+        y='Count',
+        title=title,
+        color='Count',
+        color_continuous_scale='Blues',
+    )
+    fig.update_layout(height=450, xaxis_tickangle=-45)
+    return fig
+
+
+def patch_bar(fig, top_items, title):
+    counts = top_items['Count'].to_numpy()
+    fig.update_traces(x=top_items['Item'].to_numpy(dtype=object), y=counts, marker_color=counts)
+    fig.update_layout(title_text=title)
+
+
+def sankey(flow, title):
+    fig = go.Figure(data=[go.Sankey(
+        node=dict(pad=15, thickness=20, label=flow.labels, color="lightblue"),
+        link=dict(source=flow.source, target=flow.target, value=flow.value)
+    )])
+    fig.update_layout(title_text=title, height=600)
+    return fig
+
+
+def scatter_density(scatter_3d, title):
+    fig = px.scatter_3d(
+        scatter_3d,
+        x='Age',
+        y='Purchase Amount (USD)',
+        z='Review Rating',
+        color='Count',
+        size='Count',
+        color_continuous_scale='Viridis',
+        size_max=SIZE_MAX,
+        title=title
+    )
+    fig.update_layout(height=600)
+    return fig
+
+
+def patch_scatter_density(fig, scatter_3d, title):
+    counts = scatter_3d['Count'].to_numpy()
+    fig.update_traces(
+        x=scatter_3d['Age'].to_numpy(), y=scatter_3d[AMOUNT].to_numpy(), z=scatter_3d['Review Rating'].to_numpy(),
+        marker_color=counts, marker_size=counts,
+        # px scales areas so the largest glyph is SIZE_MAX pixels across
+        marker_sizeref=max(counts.max(), 0) / SIZE_MAX ** 2 if len(counts) else 1
+    )
+    fig.update_layout(title_text=title)
+
+
+def scatter_sample(scatter_3d):
+    fig = px.scatter_3d(
+        scatter_3d,
+        x='Age',
+        y='Purchase Amount (USD)',
+        z='Review Rating',
+        color='Category',
+        size='Previous Purchases',
+        symbol='Payment Method',
+        symbol_map=SYMBOL_MAP,
+        hover_data=['Gender', 'Season'],
+        title='Age × Purchase × Rating by Payment Method (Rotate to explore)',
+        color_discrete_sequence=['#3b82f6', '#ef4444', '#fbbf24', '#10b981']
+    )
+    fig.update_layout(height=600)
+    return fig
+
+
+FIGURES = {
+    'pie': ChartFigure(pie, patch_pie),
+    'treemap': ChartFigure(treemap, patch_hierarchy),
+    'line': ChartFigure(line, patch_line),
+    # One skeleton per colouring: glyph counts or purchase amounts
+    'parallel_density': ChartFigure(parallel, patch_parallel),
+    'parallel_sample': ChartFigure(parallel, patch_parallel),
+    'sunburst': ChartFigure(sunburst, patch_hierarchy),
+    'bar': ChartFigure(bar, patch_bar),
+    'sankey': ChartFigure(sankey),
+    'scatter_density': ChartFigure(scatter_density, patch_scatter_density),
+    'scatter_sample': ChartFigure(scatter_sample),
+}
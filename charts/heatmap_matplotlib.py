@@ -0,0 +1,44 @@
+"""Correlation heatmap drawn with seaborn (a PNG rendered on the server).
+
+figure returns the PNG itself rather than the matplotlib figure, so a cached
+heatmap (see figure_cache.py) is sent again without drawing or encoding it.
+"""
+import io
+
+from matplotlib.figure import Figure
+import seaborn as sns
+import streamlit as st
+
+# st.pyplot saves at 200 dpi and Streamlit then scales anything wider than
+# this many pixels down; drawing at the final width skips both steps
+WIDTH_PX = 1460
+PAD_INCHES = 0.1
+
+
+def figure(correlation, title='Correlation Matrix of Numerical Variables'):
+    # Not through pyplot, whose figure registry is shared by every thread
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    sns.heatmap(
+        correlation,
+        annot=True,
+        fmt='.2f',
+        cmap='RdBu_r',
+        center=0,
+        square=True,
+        linewidths=1,
+        vmin=-1,
+        vmax=1,
+        cbar_kws={'label': 'Correlation Coefficient'},
+        ax=ax
+    )
+    ax.set_title(title, fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    width = fig.get_tightbbox().width + 2 * PAD_INCHES
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight', pad_inches=PAD_INCHES, dpi=min(200, int(WIDTH_PX / width)))
+    return buffer.getvalue()
+
+
+def show(png):
+    st.image(png, width='stretch')
@@ -0,0 +1,21 @@
+"""Correlation heatmap drawn with plotly, without matplotlib."""
+import plotly.express as px
+import streamlit as st
+
+
+def figure(correlation, title='Correlation Matrix of Numerical Variables'):
+    fig = px.imshow(
+        correlation,
+        text_auto='.2f',
+        color_continuous_scale='RdBu_r',
+        zmin=-1,
+        zmax=1,
+        aspect='equal',
+        title=title
+    )
+    fig.update_layout(height=600, coloraxis_colorbar=dict(title='Correlation Coefficient'))
+    return fig
+
+
+def show(fig):
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,102 @@
+"""Runtime settings for the dashboard.
+
+Every setting can be overridden through an environment variable so the same
+app.py can run locally, in the benchmark scripts and on the deployed pods.
+"""
+import os
+
+# Raw dataset exported from Kaggle / the transaction system
+DATA_FILE = os.environ.get('DASHBOARD_DATA_FILE', 'Shopping_behavior_updated.csv')
+
+# Folder holding the typed columnar copy of DATA_FILE (see data_store.py)
+STORE_DIR = os.environ.get('DASHBOARD_STORE_DIR', '.data_store')
+
+# Memory budget of the shared per-chart aggregate cache (see aggregate_cache.py)
+AGG_CACHE_MB = float(os.environ.get('DASHBOARD_AGG_CACHE_MB', '64'))
+
+# Bucket widths of the pre-aggregated cube (see cube.py); 1 keeps the sliders exact
+CUBE_AGE_BUCKET = float(os.environ.get('DASHBOARD_CUBE_AGE_BUCKET', '1'))
+CUBE_AMOUNT_BUCKET = float(os.environ.get('DASHBOARD_CUBE_AMOUNT_BUCKET', '1'))
+# Item counters the cube keeps per cell to find the Top-10 items (see
+# item_sketch.py); more counters rule out more items before counting
+TOP_ITEMS_CAPACITY = int(os.environ.get('DASHBOARD_TOP_ITEMS_CAPACITY', '64'))
+
+# How the dataset is loaded: 'store' (typed Parquet store, see data_store.py),
+# 'streaming' (chunked ingest without materializing rows, see streaming_ingest.py),
+# 'live' (tailing an append-only feed, see live_feed.py) or 'sql' (queries
+# pushed down to DuckDB over Parquet files, see sql_backend.py)
+INGEST_MODE = os.environ.get('DASHBOARD_INGEST', 'store')
+INGEST_CHUNK_ROWS = int(os.environ.get('DASHBOARD_INGEST_CHUNK_ROWS', '100000'))
+
+# Show the rerun profiling panel by default, and optionally append every
+# rerun's timings to this JSON lines file (see profiling.py)
+PROFILING = os.environ.get('DASHBOARD_PROFILING', '0') == '1'
+PROFILE_LOG = os.environ.get('DASHBOARD_PROFILE_LOG', '')
+
+# Default stages of the Sankey flow, comma separated (see flows.py)
+SANKEY_STAGES = [stage.strip() for stage in os.environ.get(
+    'DASHBOARD_SANKEY_STAGES', 'Category,Payment Method,Shipping Type'
+).split(',') if stage.strip()]
+
+# Hierarchies the treemap and sunburst can drill through, separated by ';',
+# levels by '>' (see hierarchy_index.py). A chart draws HIERARCHY_LEVELS levels
+# below the node drilled into, with the HIERARCHY_TOP_N largest children of
+# each node and the rest summed into "Other"
+HIERARCHIES = [
+    tuple(level.strip() for level in hierarchy.split('>') if level.strip())
+    for hierarchy in os.environ.get(
+        'DASHBOARD_HIERARCHIES',
+        'Season>Category>Item Purchased;Category>Item Purchased;Location>Category>Item Purchased'
+    ).split(';') if hierarchy.strip()
+]
+HIERARCHY_LEVELS = int(os.environ.get('DASHBOARD_HIERARCHY_LEVELS', '3'))
+HIERARCHY_TOP_N = int(os.environ.get('DASHBOARD_HIERARCHY_TOP_N', '12'))
+
+# Parallel coordinates / 3D scatter: 'Auto', 'Sample' or 'Density' (see density.py).
+# Auto bins the points once more than DENSITY_THRESHOLD records match.
+POINT_CHART_MODE = os.environ.get('DASHBOARD_POINT_CHART_MODE', 'Auto')
+DENSITY_THRESHOLD = int(os.environ.get('DASHBOARD_DENSITY_THRESHOLD', '50000'))
+PARALLEL_DENSITY_BINS = int(os.environ.get('DASHBOARD_PARALLEL_DENSITY_BINS', '8'))
+SCATTER_DENSITY_BINS = int(os.environ.get('DASHBOARD_SCATTER_DENSITY_BINS', '20'))
+
+# Warm the aggregate cache for the states one checkbox toggle away after each
+# rerun (see prefetch.py); 0 workers disables it
+PREFETCH_WORKERS = int(os.environ.get('DASHBOARD_PREFETCH_WORKERS', '1'))
+PREFETCH_MAX_STATES = int(os.environ.get('DASHBOARD_PREFETCH_MAX_STATES', '32'))
+
+# Start every visible chart's aggregate and figure on this many shared threads
+# before the sections draw (see chart_pool.py); 0 prepares them one after
+# another as each section draws
+CHART_WORKERS = int(os.environ.get('DASHBOARD_CHART_WORKERS', '0'))
+
+# Memory-map the store's Arrow copy so every server process shares one copy of
+# the table (see data_store.py); 0 decodes the Parquet file per process instead
+SHARED_TABLE = os.environ.get('DASHBOARD_SHARED_TABLE', '1') == '1'
+
+# Live mode (DASHBOARD_INGEST=live): the append-only CSV file or drop directory
+# to tail, and how often it is polled for new rows (see live_feed.py)
+LIVE_SOURCE = os.environ.get('DASHBOARD_LIVE_SOURCE', DATA_FILE)
+LIVE_POLL_SECONDS = float(os.environ.get('DASHBOARD_LIVE_POLL_SECONDS', '2'))
+
+# SQL mode (DASHBOARD_INGEST=sql): the Parquet file, glob or directory glob the
+# queries read (empty: the typed store of DATA_FILE), and how many matching
+# rows at most are fetched for the point charts
+SQL_SOURCE = os.environ.get('DASHBOARD_SQL_SOURCE', '')
+SQL_SAMPLE_ROWS = int(os.environ.get('DASHBOARD_SQL_SAMPLE_ROWS', '50000'))
+
+# Correlation heatmap renderer (see charts/): 'matplotlib' draws the seaborn
+# PNG, 'plotly' an interactive heatmap and spares the matplotlib import at
+# cold start
+HEATMAP_RENDERER = os.environ.get('DASHBOARD_HEATMAP', 'matplotlib')
+
+# Default correlation shown by the heatmap: 'pearson' or 'spearman', optionally
+# partial (see correlation.py)
+CORRELATION_METHOD = os.environ.get('DASHBOARD_CORRELATION', 'pearson')
+CORRELATION_PARTIAL = os.environ.get('DASHBOARD_CORRELATION_PARTIAL', '0') == '1'
+
+# How the chart sections are laid out: 'all' draws every section on each rerun,
+# 'tabs' one tab at a time, 'expanders' collapsible sections. In the last two
+# modes hidden sections are not computed. OPEN_SECTIONS lists the section
+# numbers expanded at first in 'expanders' mode.
+SECTION_MODE = os.environ.get('DASHBOARD_SECTIONS', 'all')
+OPEN_SECTIONS = [n.strip() for n in os.environ.get('DASHBOARD_OPEN_SECTIONS', '1').split(',') if n.strip()]
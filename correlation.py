@@ -0,0 +1,162 @@
+"""Correlation matrices from pre-aggregated sufficient statistics.
+
+Moment cells group the rows by every column the filters read (Gender, Season,
+Category, Item Purchased and the cube's Age / Purchase Amount buckets) and by
+the other numeric columns rounded to RANK_STEPS. Each cell stores its row
+count, the sum of each numeric column and the sum of the product of every
+pair of them. For any filter state the matching cells give:
+
+- the Pearson correlation, exactly: the summed sums and cross-products are
+  the sufficient statistics of the covariance matrix;
+- the Spearman correlation, from the cells' bucketed values: each bucket gets
+  the mid rank of its filtered rows, so rows in the same bucket count as ties.
+  This is exact when every value sits on its step (true for this dataset:
+  whole years and dollars, ratings to one decimal, whole purchase counts);
+- partial correlations (each pair controlling for the other columns), from
+  the inverse of either matrix.
+
+The cost depends on the number of cells, not rows. Like cube cells, moment
+cells from disjoint sets of rows merge by adding them up (``merge_moments``),
+which is how the streaming and live ingest modes maintain them.
+"""
+import numpy as np
+import pandas as pd
+
+import derived
+from aggregations import NUMERIC_COLS
+from filter_engine import FilterEngine
+
+AGE = 'Age'
+AMOUNT = 'Purchase Amount (USD)'
+FILTER_COLUMNS = ['Gender', 'Season', 'Category', 'Item Purchased']
+
+# Resolution at which the numeric columns the filters do not read are ranked
+RANK_STEPS = {'Review Rating': 0.1, 'Previous Purchases': 1}
+
+METHODS = ('pearson', 'spearman')
+
+PAIRS = [(i, j) for i in range(len(NUMERIC_COLS)) for j in range(i, len(NUMERIC_COLS))]
+SUMS = ['sum:' + col for col in NUMERIC_COLS]
+CROSS = [f'cross:{NUMERIC_COLS[i]}*{NUMERIC_COLS[j]}' for i, j in PAIRS]
+MOMENTS = ['count'] + SUMS + CROSS
+
+
+def aggregate_moments(df, age_bucket=1, amount_bucket=1):
+    """Group raw rows into moment cells (filter keys + rank keys + moments)."""
+    values = df[NUMERIC_COLS].to_numpy(dtype=float)
+    keyed = pd.DataFrame({col: df[col] for col in FILTER_COLUMNS})
+    # Same buckets as the cube, so the sliders select the same rows
+    keyed[AGE] = np.floor(values[:, 0] / age_bucket) * age_bucket
+    keyed[AMOUNT] = np.floor(values[:, 1] / amount_bucket) * amount_bucket
+    for col, step in RANK_STEPS.items():
+        keyed[col] = np.round(df[col].to_numpy(dtype=float) / step) * step
+    moments = {'count': np.ones(len(df))}
+    moments.update({name: values[:, i] for i, name in enumerate(SUMS)})
+    moments.update({name: values[:, i] * values[:, j] for (i, j), name in zip(PAIRS, CROSS)})
+    keyed = keyed.assign(**moments)
+
+    # Rows missing a numeric value have a NaN key and belong to no cell
+    cells = keyed.groupby(FILTER_COLUMNS + NUMERIC_COLS, observed=True)[MOMENTS].sum()
+    return cells.reset_index()
+
+
+def merge_moments(partials):
+    """Combine moment cells built from disjoint sets of rows (chunks, appends)."""
+    cells = pd.concat(partials, ignore_index=True)
+    for col in FILTER_COLUMNS:
+        cells[col] = cells[col].astype(str)
+    cells = cells.groupby(FILTER_COLUMNS + NUMERIC_COLS, observed=True)[MOMENTS].sum().reset_index()
+    for col in FILTER_COLUMNS:
+        cells[col] = cells[col].astype('category')
+    return cells
+
+
+# Variances below this share of the column's mean square are rounding noise
+NOISE = 1e-9
+
+
+def _matrix(comoment, noise=0.0):
+    # Variances at the level of the rounding noise are those of constant columns
+    variance = np.diag(comoment)
+    constant = variance <= noise
+    std = np.sqrt(np.where(constant, 1.0, variance))
+    corr = comoment / np.outer(std, std)
+    # Rounding can push a perfect correlation just past 1
+    corr = np.clip(corr, -1, 1)
+    # Like DataFrame.corr, a constant column correlates with nothing
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    np.fill_diagonal(corr, np.where(constant, np.nan, 1.0))
+    return pd.DataFrame(corr, index=NUMERIC_COLS, columns=NUMERIC_COLS)
+
+
+def partial_correlation(matrix):
+    """Correlation of each pair of columns controlling for all the others.
+
+    Constant columns (a NaN diagonal) are left out: their row and column are
+    NaN and the other pairs are controlled for the remaining columns only.
+    Undefined (NaN) when one column is a linear mix of the others, e.g. when
+    fewer rows than columns are selected.
+    """
+    values = matrix.to_numpy(dtype=float)
+    result = np.full_like(values, np.nan)
+    kept = ~np.isnan(np.diag(values))
+    values = values[np.ix_(kept, kept)]
+    if not len(values) or np.isnan(values).any() or np.linalg.eigvalsh(values).min() < 1e-9:
+        return pd.DataFrame(result, index=matrix.index, columns=matrix.columns)
+    precision = np.linalg.inv(values)
+    scale = np.sqrt(np.diag(precision))
+    partial = -precision / np.outer(scale, scale)
+    np.fill_diagonal(partial, 1.0)
+    result[np.ix_(kept, kept)] = np.clip(partial, -1, 1)
+    return pd.DataFrame(result, index=matrix.index, columns=matrix.columns)
+
+
+class MomentCells:
+    def __init__(self, cells):
+        self.cells = cells
+        self.cells['Age Group'] = derived.column(self.cells, 'Age Group')
+        self.engine = FilterEngine(self.cells)
+        self.moments = cells[MOMENTS].to_numpy(dtype=float)
+        self.rank_keys = cells[NUMERIC_COLS].to_numpy(dtype=float)
+
+    @property
+    def n_cells(self):
+        return len(self.cells)
+
+    def matching_positions(self, state):
+        engine = self.engine
+        bits = engine.sidebar_bits(state)
+        bits = engine.interactive_bits(state, bits, ('age_groups', 'categories', 'items'))
+        return engine.rows(bits)
+
+    def pearson(self, state):
+        totals = self.moments[self.matching_positions(state)].sum(axis=0)
+        n, sums = totals[0], totals[1:1 + len(SUMS)]
+        if n < 2:
+            return pd.DataFrame(np.nan, index=NUMERIC_COLS, columns=NUMERIC_COLS)
+        cross = np.empty((len(NUMERIC_COLS),) * 2)
+        for (i, j), value in zip(PAIRS, totals[1 + len(SUMS):]):
+            cross[i, j] = cross[j, i] = value
+        return _matrix(cross - np.outer(sums, sums) / n, noise=NOISE * np.diag(cross))
+
+    def spearman(self, state):
+        positions = self.matching_positions(state)
+        weights = self.moments[positions, 0]
+        if weights.sum() < 2:
+            return pd.DataFrame(np.nan, index=NUMERIC_COLS, columns=NUMERIC_COLS)
+        keys = self.rank_keys[positions]
+        ranks = np.empty_like(keys)
+        for k in range(len(NUMERIC_COLS)):
+            buckets, inverse = np.unique(keys[:, k], return_inverse=True)
+            counts = np.bincount(inverse, weights=weights, minlength=len(buckets))
+            # Mid rank of the tied rows in each bucket, as DataFrame.rank(method='average')
+            ranks[:, k] = (np.cumsum(counts) - (counts - 1) / 2)[inverse]
+        centered = ranks - weights @ ranks / weights.sum()
+        return _matrix((centered * weights[:, None]).T @ centered, noise=NOISE * (weights @ ranks ** 2))
+
+    def correlation(self, state, method='pearson', partial=False):
+        if method not in METHODS:
+            raise ValueError(f"Unknown correlation method {method!r}; choose from {METHODS}")
+        matrix = self.pearson(state) if method == 'pearson' else self.spearman(state)
+        return partial_correlation(matrix) if partial else matrix
@@ -0,0 +1,208 @@
+"""Pre-aggregated data cube behind the dashboard charts.
+
+The cube groups the dataset once by every dimension the filters and charts use
+(Gender, Season, Category, Item Purchased, Payment Method, Shipping Type) plus
+bucketed Age and Purchase Amount, and stores count / sum / sum of squares of
+the purchase amount per cell. Charts roll the matching cells up instead of
+scanning transactions, so their cost depends on the number of distinct cells
+rather than the number of rows.
+
+The cells carry the bucket start in the Age and Purchase Amount columns, so
+the regular FilterEngine indexes them directly. With the default bucket width
+of 1 the integer slider ranges select exactly the same transactions as a row
+scan; wider buckets trade that precision for fewer cells.
+
+Next to the cells the cube keeps moment cells (see correlation.py), from which
+the correlation heatmap is computed for any filter state, an item sketch
+(see item_sketch.py) for the Top-10 items, and a hierarchy index per
+drill-down hierarchy of the treemap and sunburst (see hierarchy_index.py).
+"""
+import threading
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+import derived
+from correlation import MomentCells, aggregate_moments, merge_moments
+from filter_engine import FilterEngine
+from hierarchy_index import HierarchyIndex
+from item_sketch import ItemSketch, aggregate_items, merge_items
+
+DIMENSIONS = ['Gender', 'Season', 'Category', 'Item Purchased', 'Payment Method', 'Shipping Type']
+AGE = 'Age'
+AMOUNT = 'Purchase Amount (USD)'
+ITEM = 'Item Purchased'
+MEASURES = ['count', 'amount_sum', 'amount_sumsq']
+
+
+def bucket(values, width):
+    return np.floor(values / width) * width
+
+
+def aggregate_cells(df, age_bucket=1, amount_bucket=1, dimensions=DIMENSIONS):
+    """Group raw rows into cube cells (dimensions + bucket starts + measures)."""
+    dimensions = list(dimensions)
+    amount = df[AMOUNT].astype(float)
+    keyed = pd.DataFrame({col: df[col] for col in dimensions})
+    keyed[AGE] = bucket(df[AGE].astype(float), age_bucket)
+    keyed[AMOUNT] = bucket(amount, amount_bucket)
+    keyed['amount_sum'] = amount
+    keyed['amount_sumsq'] = amount * amount
+
+    grouped = keyed.groupby(dimensions + [AGE, AMOUNT], observed=True)
+    cells = grouped[['amount_sum', 'amount_sumsq']].sum()
+    cells.insert(0, 'count', grouped.size())
+    return cells.reset_index()
+
+
+def merge_cells(partials, dimensions=DIMENSIONS):
+    """Combine cell frames built from disjoint sets of rows (e.g. CSV chunks)."""
+    dimensions = list(dimensions)
+    cells = pd.concat(partials, ignore_index=True)
+    for col in dimensions:
+        cells[col] = cells[col].astype(str)
+    cells = cells.groupby(dimensions + [AGE, AMOUNT], observed=True)[MEASURES].sum().reset_index()
+    for col in dimensions:
+        cells[col] = cells[col].astype('category')
+    return cells
+
+
+def hierarchy_dimensions(path):
+    """Dimensions of the cells indexing path when the cube does not keep all its levels."""
+    filtered = ['Gender', 'Season', 'Category', ITEM]
+    return filtered + [col for col in path if col not in filtered]
+
+
+class DataCube:
+    def __init__(self, df, age_bucket=1, amount_bucket=1, item_capacity=64):
+        self._set_cells(
+            aggregate_cells(df, age_bucket, amount_bucket),
+            aggregate_moments(df, age_bucket, amount_bucket),
+            aggregate_items(df, age_bucket, amount_bucket, item_capacity),
+            age_bucket, amount_bucket, item_capacity
+        )
+
+    @classmethod
+    def from_cells(cls, cells, moment_cells, item_counters, age_bucket=1, amount_bucket=1, item_capacity=64):
+        cube = cls.__new__(cls)
+        cube._set_cells(cells, moment_cells, item_counters, age_bucket, amount_bucket, item_capacity)
+        return cube
+
+    def _set_cells(self, cells, moment_cells, item_counters, age_bucket, amount_bucket, item_capacity):
+        self.age_bucket = age_bucket
+        self.amount_bucket = amount_bucket
+        self.cells = cells
+        self.cells['Age Group'] = derived.column(self.cells, 'Age Group')
+        self.engine = FilterEngine(self.cells)
+        self.moments = MomentCells(moment_cells)
+        self.items = ItemSketch(item_counters, item_capacity)
+        self._hierarchies = {}
+        # Cells of the hierarchies indexed from rows, by path
+        self._hierarchy_cells = {}
+        self._hierarchy_lock = threading.Lock()
+
+    def appended(self, df):
+        """A new cube with the rows of df rolled into the existing cells."""
+        cells = self.cells[DIMENSIONS + [AGE, AMOUNT] + MEASURES]
+        partial = aggregate_cells(df, self.age_bucket, self.amount_bucket)
+        moment_cells = self.moments.cells.drop(columns='Age Group')
+        partial_moments = aggregate_moments(df, self.age_bucket, self.amount_bucket)
+        capacity = self.items.capacity
+        partial_items = aggregate_items(df, self.age_bucket, self.amount_bucket, capacity)
+        cube = DataCube.from_cells(
+            merge_cells([cells, partial]), merge_moments([moment_cells, partial_moments]),
+            merge_items([self.items.counters, partial_items], capacity),
+            self.age_bucket, self.amount_bucket, capacity
+        )
+        # Carry the hierarchy indexes forward: hierarchies indexed from rows
+        # merge the cells of df into theirs instead of aggregating every row again
+        with self._hierarchy_lock:
+            hierarchies = list(self._hierarchies)
+            hierarchy_cells = dict(self._hierarchy_cells)
+        for path in hierarchies:
+            if path in hierarchy_cells:
+                dimensions = hierarchy_dimensions(path)
+                partial = aggregate_cells(df, self.age_bucket, self.amount_bucket, dimensions)
+                cells = cube._hierarchy_cells[path] = merge_cells([hierarchy_cells[path], partial], dimensions)
+            else:
+                cells = cube.cells
+            cube._hierarchies[path] = HierarchyIndex(cells, path)
+        return cube
+
+    @property
+    def n_cells(self):
+        return len(self.cells)
+
+    def matching_cells(self, state, scope='final'):
+        """Cells selected by state; scope is 'final' or 'base' (see FilterEngine.select)."""
+        engine = self.engine
+        bits = engine.sidebar_bits(state)
+        bits = engine.interactive_bits(state, bits, ('age_groups', 'categories'))
+        if scope == 'final':
+            bits = engine.interactive_bits(state, bits, ('items',))
+        return self.cells.iloc[engine.rows(bits)]
+
+    def count(self, state, scope='final'):
+        """Number of transactions selected by state."""
+        return int(self.matching_cells(state, scope)['count'].sum())
+
+    def rollup(self, state, by, scope='final'):
+        """Sum the measures of the matching cells grouped by the dimensions in by."""
+        cells = self.matching_cells(state, scope)
+        return cells.groupby(by, observed=True)[MEASURES].sum().reset_index()
+
+    def correlation(self, state, method='pearson', partial=False):
+        """Correlation matrix of the numeric columns over the selected transactions.
+
+        method is 'pearson' or 'spearman'; partial controls each pair for the
+        other columns (see correlation.py).
+        """
+        return self.moments.correlation(state, method, partial)
+
+    def top_item_totals(self, state, k=10):
+        """Purchase count per item (like rollup by Item Purchased over the 'base'
+        scope), exact for at least the k most purchased items.
+
+        Answered by the item sketch alone when it is exact for state, else
+        only the candidate items it leaves are rolled up (see item_sketch.py).
+        """
+        counts, candidates = self.items.candidates(state, k)
+        if counts is None and candidates is None:
+            return self.rollup(state, [ITEM], 'base')
+        if counts is None:
+            # A few items: count them without grouping on the whole catalog
+            cells = self.matching_cells(replace(state, items=candidates))
+            counts = cells.groupby(cells[ITEM].astype(str))['count'].sum()
+        totals = pd.DataFrame({ITEM: counts.index.astype(str), 'count': counts.to_numpy(dtype=np.int64)})
+        if isinstance(self.cells[ITEM].dtype, pd.CategoricalDtype):
+            # Same item order as rollup
+            totals[ITEM] = pd.Categorical(totals[ITEM], categories=self.cells[ITEM].cat.categories)
+        return totals.sort_values(ITEM, ignore_index=True)
+
+    def hierarchy(self, path, rows=None):
+        """HierarchyIndex over the columns of path, built on first use.
+
+        Columns the cube does not keep (e.g. Location) are aggregated from
+        rows, the table the cube was built from, into cells of their own.
+        appended() extends the indexes built so far.
+        """
+        path = tuple(path)
+        # One build per path, however many sessions ask for it at once
+        with self._hierarchy_lock:
+            index = self._hierarchies.get(path)
+            if index is None:
+                if set(path) <= set(self.cells.columns):
+                    cells = self.cells
+                elif rows is not None:
+                    cells = self._hierarchy_cells[path] = aggregate_cells(
+                        rows, self.age_bucket, self.amount_bucket, hierarchy_dimensions(path)
+                    )
+                else:
+                    raise ValueError(f'The cube has no column {sorted(set(path) - set(self.cells.columns))}; pass the rows')
+                index = self._hierarchies[path] = HierarchyIndex(cells, path)
+        return index
+
+    def hierarchy_slice(self, state, path, node=(), levels=3, top_n=12, rows=None):
+        """Nodes of path drawn below node for state (see hierarchy_index.py)."""
+        return self.hierarchy(path, rows).slice(state, node, levels, top_n)
@@ -0,0 +1,226 @@
+"""Typed columnar store for the shopping dataset.
+
+The raw CSV is parsed and cleaned once, then written to a compressed Parquet
+file with categorical dtypes for the dimension columns. Later loads read the
+Parquet file directly. A small manifest next to the store remembers the size,
+mtime and SHA-256 of the CSV it was built from, so the store is rebuilt
+automatically whenever the source file changes.
+
+Next to the Parquet file the store keeps an uncompressed Arrow IPC copy. With
+SHARED_TABLE on, the dashboard memory-maps that file instead of decoding the
+Parquet file: the numeric columns and the category codes are views onto the
+mapped pages, so every Streamlit process on the host shares one copy of the
+table through the page cache instead of holding its own.
+
+Run ``python data_store.py`` to build the store ahead of deployment.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+import config
+
+# Bump when the cleaning steps, the column schema or the store layout change
+SCHEMA_VERSION = 2
+
+CATEGORICAL_COLUMNS = [
+    'Gender', 'Item Purchased', 'Category', 'Location', 'Size', 'Color',
+    'Season', 'Subscription Status', 'Shipping Type', 'Discount Applied',
+    'Promo Code Used', 'Payment Method', 'Frequency of Purchases'
+]
+
+COERCED_NUMERIC_COLUMNS = ['Review Rating', 'Purchase Amount (USD)', 'Age']
+
+
+def clean_frame(df):
+    """Apply the dashboard's cleaning rules and column types to a raw frame."""
+    df = df.dropna()
+    df = df.drop_duplicates()
+    for col in COERCED_NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df.reset_index(drop=True)
+
+
+def read_csv(csv_path):
+    """Parse and clean the raw CSV (the slow path)."""
+    return clean_frame(pd.read_csv(csv_path))
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_paths(csv_path, store_dir=None):
+    store_dir = store_dir or config.STORE_DIR
+    if not os.path.isabs(store_dir):
+        store_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), store_dir)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return (os.path.join(store_dir, stem + '.parquet'),
+            os.path.join(store_dir, stem + '.manifest.json'))
+
+
+def mapped_table_path(csv_path, store_dir=None):
+    store_path, _ = store_paths(csv_path, store_dir)
+    return os.path.splitext(store_path)[0] + '.arrow'
+
+
+def write_mapped_table(df, path):
+    """Write df as a single-chunk, uncompressed Arrow IPC file that can be mapped."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+    os.replace(tmp_path, path)
+
+
+def _column_view(array):
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(array.type):
+        return pd.Categorical.from_codes(
+            array.indices.to_numpy(zero_copy_only=True), array.dictionary.to_pandas(),
+            ordered=array.type.ordered, validate=False
+        )
+    return array.to_numpy(zero_copy_only=True)
+
+
+def map_table(path):
+    """DataFrame over a memory-mapped Arrow file, without copying the columns.
+
+    Columns that cannot be viewed in place (nulls, strings) are converted
+    normally. The mapped arrays are read-only.
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        try:
+            if column.num_chunks != 1:
+                raise pa.ArrowInvalid('not a single chunk')
+            columns[name] = _column_view(column.chunk(0))
+        except pa.ArrowInvalid:
+            columns[name] = column.to_pandas()
+    return pd.DataFrame(columns, copy=False)
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_store_current(csv_path, store_dir=None):
+    """Return True when the store matches the current contents of csv_path.
+
+    The size/mtime pair is checked first. The file is only hashed when that
+    pair changed, so a touched-but-identical CSV does not trigger a rebuild.
+    """
+    store_path, manifest_path = store_paths(csv_path, store_dir)
+    manifest = _read_manifest(manifest_path)
+    if manifest is None or not os.path.exists(store_path):
+        return False
+    if not os.path.exists(mapped_table_path(csv_path, store_dir)):
+        return False
+    if manifest.get('schema_version') != SCHEMA_VERSION:
+        return False
+
+    stat = os.stat(csv_path)
+    if manifest.get('size') == stat.st_size and manifest.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if manifest.get('sha256') != file_sha256(csv_path):
+        return False
+
+    # Same bytes, new mtime: refresh the manifest so the next check is cheap
+    manifest.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    _write_json_atomic(manifest_path, manifest)
+    return True
+
+
+def build_store(csv_path, store_dir=None):
+    """Convert csv_path into the typed Parquet store and return the frame."""
+    store_path, manifest_path = store_paths(csv_path, store_dir)
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+
+    stat = os.stat(csv_path)
+    sha256 = file_sha256(csv_path)
+    df = read_csv(csv_path)
+
+    tmp_path = store_path + '.tmp'
+    df.to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+    os.replace(tmp_path, store_path)
+    write_mapped_table(df, mapped_table_path(csv_path, store_dir))
+    _write_json_atomic(manifest_path, {
+        'schema_version': SCHEMA_VERSION,
+        'source': os.path.abspath(csv_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256,
+        'rows': len(df),
+    })
+    return df
+
+
+def load_table(csv_path=None, store_dir=None, mapped=None):
+    """Load the cleaned dataset, building or refreshing the store if needed.
+
+    mapped (default config.SHARED_TABLE) returns a zero-copy view of the
+    memory-mapped Arrow copy instead of decoding the Parquet file. Raises
+    FileNotFoundError when the source CSV does not exist. Without pyarrow the
+    CSV is parsed directly, as before the store existed.
+    """
+    csv_path = csv_path or config.DATA_FILE
+    mapped = config.SHARED_TABLE if mapped is None else mapped
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return read_csv(csv_path)
+
+    if not is_store_current(csv_path, store_dir):
+        df = build_store(csv_path, store_dir)
+        if not mapped:
+            return df
+    elif not mapped:
+        store_path, _ = store_paths(csv_path, store_dir)
+        return pd.read_parquet(store_path, engine='pyarrow')
+    return map_table(mapped_table_path(csv_path, store_dir))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the typed columnar store for the dashboard dataset.')
+    parser.add_argument('csv', nargs='?', default=config.DATA_FILE, help='source CSV file')
+    parser.add_argument('--store-dir', default=None, help='output folder (default: %s)' % config.STORE_DIR)
+    parser.add_argument('--force', action='store_true', help='rebuild even if the store is current')
+    args = parser.parse_args()
+
+    if not args.force and is_store_current(args.csv, args.store_dir):
+        print('Store is up to date:', store_paths(args.csv, args.store_dir)[0])
+    else:
+        frame = build_store(args.csv, args.store_dir)
+        print(f'Wrote {len(frame):,} rows to', store_paths(args.csv, args.store_dir)[0])
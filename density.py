@@ -0,0 +1,103 @@
+"""Bounded, deterministic point sets for the 3D scatter and parallel coordinates.
+
+Two ways to keep the browser payload bounded however many rows match:
+
+- ``stratified_sample`` draws a fixed number of rows, allocated to strata
+  (e.g. Category) in proportion to their size. The random keys come from a
+  seed derived from the filter state, so a rerun with the same filters shows
+  the same points, and the rows holding the minimum and maximum of each
+  numeric column are always kept so tail outliers stay visible.
+- ``density_glyphs`` bins the numeric columns on a regular grid and returns
+  one glyph per non-empty bin, placed at the bin's centroid and carrying the
+  number of rows it stands for.
+"""
+import numpy as np
+import pandas as pd
+
+
+def state_seed(state_key):
+    """Stable 32-bit seed from a FilterState.key() hash."""
+    return int(state_key[:8], 16)
+
+
+def allocate(sizes, n):
+    """Split n draws across strata proportionally (largest remainder method)."""
+    exact = sizes * (n / sizes.sum())
+    quota = np.floor(exact).astype(int)
+    remainder = n - quota.sum()
+    if remainder > 0:
+        quota[np.argsort(quota - exact, kind='stable')[:remainder]] += 1
+    return np.minimum(quota, sizes)
+
+
+def stratified_sample(frame, n, stratum, seed, keep_extremes=()):
+    """At most n rows of frame, proportional per stratum and stable for a seed."""
+    if len(frame) <= n:
+        return frame
+    return frame.iloc[stratified_positions(frame, n, stratum, seed, keep_extremes)]
+
+
+def stratified_positions(frame, n, stratum, seed, keep_extremes=()):
+    """Positions (into frame) of the rows stratified_sample would keep.
+
+    frame only needs the stratum and keep_extremes columns, so the other
+    columns can be gathered for the chosen rows alone.
+    """
+    if len(frame) <= n:
+        return np.arange(len(frame))
+
+    keys = np.random.default_rng(seed).random(len(frame))
+    for col in keep_extremes:
+        values = frame[col].to_numpy(dtype=float)
+        if not np.isnan(values).all():
+            # Negative keys sort first within their stratum
+            keys[[np.nanargmin(values), np.nanargmax(values)]] = -1.0
+
+    codes, _ = pd.factorize(frame[stratum])
+    codes = np.where(codes < 0, codes.max() + 1, codes)
+    sizes = np.bincount(codes)
+    quota = allocate(sizes, n)
+
+    # The quota smallest keys of each stratum (a partial sort, not a full one)
+    chosen = []
+    for code, size in enumerate(quota):
+        if size:
+            members = np.flatnonzero(codes == code)
+            chosen.append(members[np.argpartition(keys[members], size - 1)[:size]])
+    return np.sort(np.concatenate(chosen))
+
+
+def density_glyphs(frame, columns, bins, max_glyphs=None):
+    """One row per non-empty grid bin: centroid of each column plus 'Count'.
+
+    With max_glyphs, the grid is coarsened (one bin fewer per column at a
+    time) until at most that many bins are occupied, so every row is still
+    counted by some glyph.
+    """
+    values = frame[columns].to_numpy(dtype=float)
+    values = values[~np.isnan(values).any(axis=1)]
+    if not len(values):
+        return pd.DataFrame(columns=list(columns) + ['Count'])
+
+    glyphs = grid_glyphs(values, columns, bins)
+    while max_glyphs is not None and len(glyphs) > max_glyphs and bins > 1:
+        bins -= 1
+        glyphs = grid_glyphs(values, columns, bins)
+    return glyphs
+
+
+def grid_glyphs(values, columns, bins):
+    low = values.min(axis=0)
+    width = (values.max(axis=0) - low) / bins
+    width[width == 0] = 1.0
+    cells = np.clip(((values - low) / width).astype(int), 0, bins - 1)
+    keys = np.ravel_multi_index(cells.T, (bins,) * len(columns))
+
+    counts = np.bincount(keys, minlength=bins ** len(columns))
+    occupied = np.flatnonzero(counts)
+    glyphs = {
+        col: np.bincount(keys, weights=values[:, j], minlength=len(counts))[occupied] / counts[occupied]
+        for j, col in enumerate(columns)
+    }
+    glyphs['Count'] = counts[occupied]
+    return pd.DataFrame(glyphs)
@@ -0,0 +1,78 @@
+"""Derived columns computed once when the dataset is loaded.
+
+Each entry of DERIVED_COLUMNS declares a categorical column computed from a
+source column (today: fixed bands over a numeric column). ``add_derived_columns``
+materializes all of them inside the cached load step, so reruns, the filter
+engine and the cube read compact category codes instead of binning again.
+Code that may receive a frame without them (the cube's cells, a streamed
+chunk) goes through ``column``, which derives a missing column on the fly.
+
+To add a derived column, append an entry to DERIVED_COLUMNS (or call
+``register``); it then also shows up as a Sankey stage.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+AGE_BINS = [0, 25, 35, 45, 55, 65, 100]
+AGE_LABELS = ['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
+
+PURCHASE_BINS = [0, 40, 60, 80, np.inf]
+PURCHASE_LABELS = ['Under $40', '$40-59', '$60-79', '$80+']
+
+
+@dataclass(frozen=True)
+class Bands:
+    """Ordered categorical of source binned at edges.
+
+    Bins are closed on the right like pd.cut ((0, 25] is '18-25'), or on the
+    left with right=False ([40, 60) is '$40-59'). Values outside the edges
+    are missing.
+    """
+    name: str
+    source: str
+    edges: tuple
+    labels: tuple
+    right: bool = True
+
+    def compute(self, df):
+        values = df[self.source].to_numpy(dtype=float)
+        codes = np.searchsorted(self.edges, values, side='left' if self.right else 'right') - 1
+        codes[(codes < 0) | (codes >= len(self.labels)) | np.isnan(values)] = -1
+        return pd.Categorical.from_codes(codes.astype(np.int8), categories=list(self.labels), ordered=True)
+
+
+DERIVED_COLUMNS = {}
+
+
+def register(derived):
+    DERIVED_COLUMNS[derived.name] = derived
+    return derived
+
+
+register(Bands('Age Group', 'Age', tuple(AGE_BINS), tuple(AGE_LABELS)))
+register(Bands('Purchase Band', 'Purchase Amount (USD)', tuple(PURCHASE_BINS), tuple(PURCHASE_LABELS), right=False))
+
+
+def names():
+    return list(DERIVED_COLUMNS)
+
+
+def column(df, name):
+    """df[name], computed from its source when df does not carry it."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(DERIVED_COLUMNS[name].compute(df), index=df.index, name=name)
+
+
+def add_derived_columns(df):
+    """Return df with every registered derived column whose source it has."""
+    missing = {
+        name: DERIVED_COLUMNS[name].compute(df)
+        for name in DERIVED_COLUMNS
+        if name not in df.columns and DERIVED_COLUMNS[name].source in df.columns
+    }
+    if not missing:
+        return df
+    return df.assign(**missing)
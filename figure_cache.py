@@ -0,0 +1,69 @@
+"""Reuse or patch chart figures instead of building them from scratch.
+
+With the aggregates cached, building the figure is often the most expensive
+step of a chart section: plotly express takes about 200 ms for the sunburst,
+whose data comes from the cache in a millisecond. FigureCache keeps
+
+- the finished figure for every chart and data key (the FilterState hash) in
+  the shared AggregateCache. A rerun whose data did not change reuses the
+  figure object, whose JSON is then byte-identical to the last run's, so
+  Streamlit sends the browser a reference to the message it already holds
+  instead of the spec (for messages above global.minCachedMessageSize);
+- a skeleton per chart: the last figure built for it. New data for a chart
+  with a patch function (see charts/figures.py) is drawn on a copy of the
+  skeleton with only the data arrays replaced, which skips plotly express.
+"""
+import json
+import threading
+
+import plotly.graph_objects as go
+
+
+class FigureCache:
+    def __init__(self, cache, figures):
+        self.cache = cache
+        self.figures = figures
+        self.counts = {'reused': 0, 'patched': 0, 'built': 0}
+        self._skeletons = {}
+        self._lock = threading.Lock()
+
+    def figure(self, chart, data_key, data, build=None, **options):
+        """Figure of chart for data, identified by data_key and the options.
+
+        build(data, **options) replaces the chart's build function from
+        figures (e.g. for a heatmap renderer chosen at run time); such charts
+        are never patched. Returned figures are shared: do not modify them.
+        """
+        key = data_key + json.dumps(options, sort_keys=True, default=str) if options else data_key
+        outcome = []
+
+        def make():
+            spec = self.figures.get(chart)
+            patch = spec.patch if spec is not None and build is None else None
+            skeleton = self._skeletons.get(chart) if patch is not None else None
+            if skeleton is not None:
+                # go.Figure copies the skeleton, so cached figures stay untouched
+                figure = go.Figure(skeleton)
+                patch(figure, data, **options)
+                outcome.append('patched')
+            else:
+                figure = (build or spec.build)(data, **options)
+                # A figure of empty data has no traces to patch
+                if patch is not None and figure.data:
+                    self._skeletons[chart] = figure
+                outcome.append('built')
+            return figure
+
+        # Single-flight like the aggregates: concurrent sessions drawing the
+        # same figure wait for one build
+        figure = self.cache.get_or_compute('figure:' + chart, key, make)
+        self._count(outcome[0] if outcome else 'reused')
+        return figure
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
@@ -0,0 +1,288 @@
+"""Bitmap index for the dashboard filters.
+
+The engine is built once per dataset. It keeps one packed bitset per value of
+every checkbox/multiselect dimension and a sorted positional index for the two
+range sliders, so evaluating a filter combination costs a handful of bitwise
+ANDs and two binary searches instead of a full scan per condition.
+"""
+import copy
+import hashlib
+import json
+import uuid
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+import derived
+
+
+def gather(df, positions, columns):
+    """The given columns of the rows at positions; nothing else is copied."""
+    return df[list(columns)].iloc[positions]
+
+
+@dataclass(frozen=True)
+class FilterState:
+    """Normalized snapshot of the sidebar and interactive filters.
+
+    Multi-value filters are stored as sorted tuples so two states that select
+    the same rows compare (and hash) equal regardless of click order.
+    data_version identifies the rows the filters apply to (it only changes
+    when a live feed appends rows), so cached results never outlive them.
+    """
+    gender: tuple
+    season: tuple
+    category: tuple
+    age_range: tuple
+    purchase_range: tuple
+    items: tuple = ()
+    age_groups: tuple = ()
+    categories: tuple = ()
+    data_version: int = 0
+
+    @classmethod
+    def create(cls, gender, season, category, age_range, purchase_range,
+               items=(), age_groups=(), categories=(), data_version=0):
+        def norm(values):
+            return tuple(sorted(str(v) for v in values))
+
+        return cls(
+            gender=norm(gender),
+            season=norm(season),
+            category=norm(category),
+            age_range=(int(age_range[0]), int(age_range[1])),
+            purchase_range=(int(purchase_range[0]), int(purchase_range[1])),
+            items=norm(items),
+            age_groups=norm(age_groups),
+            categories=norm(categories),
+            data_version=int(data_version),
+        )
+
+    def without_items(self):
+        """State used by the Top-10 bar chart, which ignores the item selection."""
+        return replace(self, items=())
+
+    def key(self):
+        payload = json.dumps([
+            self.gender, self.season, self.category, self.age_range,
+            self.purchase_range, self.items, self.age_groups, self.categories, self.data_version
+        ])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _extend_bits(bits, n_rows, member):
+    """Packed bitset of n_rows rows followed by the boolean array member."""
+    whole = n_rows // 8
+    partial = np.unpackbits(bits[whole:], count=n_rows - whole * 8)
+    return np.concatenate([bits[:whole], np.packbits(np.concatenate([partial, member.view(np.uint8)]))])
+
+
+class FilterEngine:
+    # FilterState field -> indexed column
+    VALUE_FILTERS = {
+        'gender': 'Gender',
+        'season': 'Season',
+        'category': 'Category',
+        'items': 'Item Purchased',
+        'age_groups': 'Age Group',
+        'categories': 'Category',
+    }
+    RANGE_FILTERS = {
+        'age_range': 'Age',
+        'purchase_range': 'Purchase Amount (USD)',
+    }
+    SIDEBAR_FIELDS = ('gender', 'season', 'category', 'age_range', 'purchase_range')
+    INTERACTIVE_FIELDS = ('age_groups', 'categories', 'items')
+
+    def __init__(self, df):
+        # Shared by every engine appended() from this one
+        self.lineage = uuid.uuid4().hex
+        self.n_rows = len(df)
+        self.all_bits = np.packbits(np.ones(self.n_rows, dtype=bool))
+        self.no_bits = np.zeros_like(self.all_bits)
+
+        self.bitsets = {}
+        self.fully_indexed = {}
+        self.codes = {}
+        self.value_counts = {}
+        for col, values in self._indexed_columns(df).items():
+            self.bitsets[col], self.codes[col] = self._build_bitsets(values)
+            self.fully_indexed[col] = bool((self.codes[col] >= 0).all())
+            counts = np.bincount(self.codes[col][self.codes[col] >= 0], minlength=len(self.bitsets[col]))
+            self.value_counts[col] = dict(zip(self.bitsets[col], counts.tolist()))
+
+        self.values = {}
+        self.sorted_values = {}
+        self.sorted_positions = {}
+        for col in self.RANGE_FILTERS.values():
+            values = df[col].to_numpy(dtype=float)
+            order = np.argsort(values, kind='stable')
+            self.values[col] = values
+            self.sorted_values[col] = values[order]
+            self.sorted_positions[col] = order
+
+    @staticmethod
+    def _indexed_columns(df):
+        # A table without one of the columns (e.g. cells summed over items)
+        # cannot be filtered on it
+        columns = {col: df[col] for col in ('Gender', 'Season', 'Category', 'Item Purchased') if col in df.columns}
+        columns['Age Group'] = derived.column(df, 'Age Group')
+        return columns
+
+    @staticmethod
+    def _build_bitsets(values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Already integer coded at load time; only observed values get a bitset
+            values = values.cat.remove_unused_categories()
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values, sort=True)
+        bitsets = {}
+        for code, value in enumerate(uniques):
+            bitsets[str(value)] = np.packbits(codes == code)
+        # Missing values keep code -1 and belong to no bitset
+        return bitsets, codes
+
+    def appended(self, df):
+        """A new engine over the indexed rows followed by the rows of df.
+
+        Only df is scanned: the bitsets, codes and sorted range indexes of the
+        existing rows are extended, not rebuilt. self is left as it was, so
+        reruns still reading it are unaffected.
+        """
+        engine = copy.copy(self)
+        n_old = self.n_rows
+        engine.n_rows = n_old + len(df)
+        engine.all_bits = np.packbits(np.ones(engine.n_rows, dtype=bool))
+        engine.no_bits = np.zeros_like(engine.all_bits)
+
+        engine.bitsets, engine.codes, engine.value_counts, engine.fully_indexed = {}, {}, {}, {}
+        for col, values in self._indexed_columns(df).items():
+            code_of = {value: code for code, value in enumerate(self.bitsets[col])}
+            new_codes, uniques = pd.factorize(values)
+            lookup = np.array([code_of.setdefault(str(value), len(code_of)) for value in uniques] + [-1])
+            new_codes = lookup[new_codes]
+
+            bitsets, counts = {}, dict(self.value_counts[col])
+            for value, code in code_of.items():
+                member = new_codes == code
+                old_bits = self.bitsets[col].get(value, self.no_bits)
+                bitsets[value] = _extend_bits(old_bits, n_old, member)
+                counts[value] = counts.get(value, 0) + int(member.sum())
+            engine.bitsets[col] = bitsets
+            engine.value_counts[col] = counts
+            engine.codes[col] = np.concatenate([self.codes[col], new_codes]).astype(
+                np.min_scalar_type(-len(code_of)), copy=False
+            )
+            engine.fully_indexed[col] = self.fully_indexed[col] and bool((new_codes >= 0).all())
+
+        engine.values, engine.sorted_values, engine.sorted_positions = {}, {}, {}
+        for col in self.RANGE_FILTERS.values():
+            values = df[col].to_numpy(dtype=float)
+            order = np.argsort(values, kind='stable')
+            # Inserting after equal values keeps ties in row order, like the stable sort
+            at = np.searchsorted(self.sorted_values[col], values[order], side='right')
+            engine.values[col] = np.concatenate([self.values[col], values])
+            engine.sorted_values[col] = np.insert(self.sorted_values[col], at, values[order])
+            engine.sorted_positions[col] = np.insert(self.sorted_positions[col], at, n_old + order)
+        return engine
+
+    def value_bits(self, column, values):
+        """Bitset of rows whose column is one of values."""
+        bitsets = self.bitsets[column]
+        if self.fully_indexed[column] and set(bitsets) <= set(values):
+            return self.all_bits
+        bits = self.no_bits.copy()
+        for value in values:
+            if value in bitsets:
+                np.bitwise_or(bits, bitsets[value], out=bits)
+        return bits
+
+    def range_bits(self, column, low, high):
+        """Bitset of rows with low <= column <= high."""
+        positions = self.range_positions(column, low, high)
+        if len(positions) == self.n_rows:
+            return self.all_bits
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def range_positions(self, column, low, high):
+        """Positions (unsorted) of rows with low <= column <= high."""
+        sorted_values = self.sorted_values[column]
+        start = np.searchsorted(sorted_values, low, side='left')
+        stop = np.searchsorted(sorted_values, high, side='right')
+        return self.sorted_positions[column][start:stop]
+
+    def matches(self, state, positions, fields):
+        """Evaluate the filters in fields row by row for the given positions.
+
+        Used to refine a small candidate set without touching the bitsets.
+        Empty interactive selections (items, age groups, categories) match
+        everything, like in select().
+        """
+        keep = np.ones(len(positions), dtype=bool)
+        for field in fields:
+            if field in self.RANGE_FILTERS:
+                column = self.RANGE_FILTERS[field]
+                low, high = getattr(state, field)
+                if low <= self.sorted_values[column][0] and high >= self.sorted_values[column][-1]:
+                    continue
+                values = self.values[column][positions]
+                keep &= (values >= low) & (values <= high)
+                continue
+            selection = getattr(state, field)
+            if field in self.INTERACTIVE_FIELDS and not selection:
+                continue
+            column = self.VALUE_FILTERS[field]
+            code_of = {value: code for code, value in enumerate(self.bitsets[column])}
+            if self.fully_indexed[column] and set(code_of) <= set(selection):
+                continue
+            # One extra slot so missing values (code -1) never match
+            allowed = np.zeros(len(code_of) + 1, dtype=bool)
+            for value in selection:
+                if value in code_of:
+                    allowed[code_of[value]] = True
+            keep &= allowed[self.codes[column][positions]]
+        return keep
+
+    def sidebar_bits(self, state):
+        bits = self.all_bits.copy()
+        for field in ('gender', 'season', 'category'):
+            np.bitwise_and(bits, self.value_bits(self.VALUE_FILTERS[field], getattr(state, field)), out=bits)
+        for field, column in self.RANGE_FILTERS.items():
+            low, high = getattr(state, field)
+            np.bitwise_and(bits, self.range_bits(column, low, high), out=bits)
+        return bits
+
+    def interactive_bits(self, state, bits, fields):
+        """AND the non-empty interactive selections in fields into bits."""
+        bits = bits.copy()
+        for field in fields:
+            selection = getattr(state, field)
+            if selection:
+                np.bitwise_and(bits, self.value_bits(self.VALUE_FILTERS[field], selection), out=bits)
+        return bits
+
+    def rows(self, bits):
+        return np.flatnonzero(self.mask(bits))
+
+    def mask(self, bits):
+        return np.unpackbits(bits, count=self.n_rows).view(bool)
+
+    def select_masks(self, state):
+        """Boolean row masks for the row sets returned by select()."""
+        base = self.interactive_bits(state, self.sidebar_bits(state), ('age_groups', 'categories'))
+        final = self.interactive_bits(state, base, ('items',))
+        return {'base': self.mask(base), 'final': self.mask(final)}
+
+    def select(self, state):
+        """Row positions for every row set the dashboard draws from.
+
+        - ``base``: sidebar filters + age group and category selections
+          (everything but the item selection; used by the Top-10 bar chart
+          and its checkboxes)
+        - ``final``: all filters, used by every other chart
+        """
+        return {scope: np.flatnonzero(mask) for scope, mask in self.select_masks(state).items()}
@@ -0,0 +1,94 @@
+"""Vectorized N-stage flow builder for the Sankey diagram.
+
+Each stage column is encoded as categorical codes and every node gets an
+offset per stage, so the same label in two stages stays two nodes and the
+diagram cannot form cycles. The rows (or pre-aggregated cells with a weight
+column) are reduced once to weighted paths over all stages; the link weights
+of every adjacent stage pair are then summed from that small path table with
+``np.bincount``.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Flow:
+    labels: list
+    source: np.ndarray
+    target: np.ndarray
+    value: np.ndarray
+
+
+# Above this many possible paths, distinct paths are found by sorting instead
+# of a dense bincount
+DENSE_PATH_LIMIT = 1 << 24
+
+
+def _encode(frame, stages):
+    codes, uniques = [], []
+    for stage in stages:
+        column = frame[stage]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Categorical columns are already encoded
+            stage_codes, stage_uniques = column.cat.codes.to_numpy(), column.cat.categories
+        else:
+            stage_codes, stage_uniques = pd.factorize(column, sort=True)
+        codes.append(stage_codes.astype(np.int64))
+        uniques.append(stage_uniques)
+    return np.vstack(codes), uniques
+
+
+def _path_weights(codes, sizes, weights):
+    """Collapse rows into distinct paths and their total weight."""
+    n_paths = np.prod(sizes, dtype=float)
+    if n_paths <= DENSE_PATH_LIMIT:
+        dense = np.bincount(np.ravel_multi_index(codes, sizes), weights=weights, minlength=int(n_paths))
+        path_keys = np.flatnonzero(dense)
+        return np.vstack(np.unravel_index(path_keys, sizes)), dense[path_keys]
+    if n_paths < 2 ** 62:
+        path_keys, inverse = np.unique(np.ravel_multi_index(codes, sizes), return_inverse=True)
+        path_codes = np.vstack(np.unravel_index(path_keys, sizes))
+    else:
+        path_codes, inverse = np.unique(codes, axis=1, return_inverse=True)
+    return path_codes, np.bincount(inverse.ravel(), weights=weights)
+
+
+def build_flow(frame, stages, weight=None):
+    """Node labels and links for a Sankey through the given stage columns.
+
+    frame can hold raw rows (weight=None counts rows) or aggregated cells
+    with their row count in the weight column.
+    """
+    stages = list(stages)
+    if len(stages) < 2 or frame.empty:
+        return Flow([], np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0))
+
+    weights = np.ones(len(frame)) if weight is None else frame[weight].to_numpy(dtype=float)
+    complete = frame[stages].notna().all(axis=1).to_numpy() & (weights > 0)
+    if not complete.all():
+        frame, weights = frame[complete], weights[complete]
+    codes, uniques = _encode(frame, stages)
+
+    sizes = [len(values) for values in uniques]
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    path_codes, path_weights = _path_weights(codes, sizes, weights)
+
+    sources, targets, values = [], [], []
+    for i in range(len(stages) - 1):
+        pair = path_codes[i] * sizes[i + 1] + path_codes[i + 1]
+        link_weights = np.bincount(pair, weights=path_weights, minlength=sizes[i] * sizes[i + 1])
+        links = np.flatnonzero(link_weights)
+        sources.append(offsets[i] + links // sizes[i + 1])
+        targets.append(offsets[i + 1] + links % sizes[i + 1])
+        values.append(link_weights[links])
+
+    source, target = np.concatenate(sources), np.concatenate(targets)
+
+    # Keep only nodes that carry a link (unobserved categories have none)
+    labels = np.array([str(label) for stage_uniques in uniques for label in stage_uniques], dtype=object)
+    used = np.unique(np.concatenate([source, target]))
+    node_index = np.full(len(labels), -1)
+    node_index[used] = np.arange(len(used))
+    return Flow(labels[used].tolist(), node_index[source], node_index[target], np.concatenate(values))
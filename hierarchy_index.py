@@ -0,0 +1,168 @@
+"""Drill-down slices of a hierarchy (e.g. Season → Category → Item) for the
+treemap and sunburst.
+
+Drawing the whole tree sends every leaf to the browser: one sector per
+season, category and item, whatever the size of the catalog. A slice draws a
+node (the top of the hierarchy, or the one drilled into) and at most
+``levels`` levels below it, keeping the ``top_n`` children of each node by
+purchase amount and summing the rest into one "Other" node. The payload is
+then bounded by what fits on screen, and deeper levels are only computed when
+a node is drilled into.
+
+HierarchyIndex sorts cube cells by the hierarchy's columns, so the cells of
+every node form one contiguous span, found by binary search. A slice filters
+the cells of that span only (see FilterEngine.matches) and sums each node's
+cells in one pass, so its cost depends on the size of the subtree rather
+than the cube. ``ranked_nodes`` turns the summed groups into the trace
+arrays; the SQL backend feeds it the GROUP BY of the subtree instead.
+"""
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine
+from incremental_filter import SCOPES
+
+AMOUNT = 'Purchase Amount (USD)'
+NODE_COLUMNS = ['id', 'parent', 'label', 'depth', 'expandable', AMOUNT, 'color']
+
+
+def node_ids(parent_ids, labels):
+    return np.array([parent + '/' + label if parent else label for parent, label in zip(parent_ids, labels)], dtype=object)
+
+
+def ranked_nodes(codes, labels, amounts, node=(), top_n=12):
+    """Nodes of the slice below node, from rows sorted by their codes.
+
+    codes holds one row of level codes per group of transactions, sorted
+    lexicographically and all within node; labels maps each level's codes to
+    its values and amounts are the groups' purchase amounts. Returns one row
+    per node (id, parent id, label, depth, whether it can be drilled into,
+    amount and colour), the node itself first. Like plotly express, leaves
+    are coloured by their amount and parents by the amount-weighted mean of
+    the leaves below them. An Other node is coloured by the mean amount of
+    the children it folds, so that one large sum does not stretch the
+    colour scale, and counts as a leaf of that colour for its parent.
+    """
+    start, depth = len(node), codes.shape[1]
+    if len(codes) == 0 or depth == start:
+        return pd.DataFrame(columns=NODE_COLUMNS)
+
+    # Top-down: the groups of each level, the ones shown and the Other nodes
+    levels = []
+    group_starts = np.array([0])
+    shown = np.array([True])
+    for level in range(start, depth):
+        changed = np.any(codes[1:, :level + 1] != codes[:-1, :level + 1], axis=1)
+        starts = np.flatnonzero(np.concatenate([[True], changed]))
+        totals = np.add.reduceat(amounts, starts)
+        parents = np.searchsorted(group_starts, starts, side='right') - 1
+        candidate = shown[parents]
+        # Rank the children of each parent by amount, largest first
+        order = np.lexsort((-totals, parents))
+        first_child = np.searchsorted(parents[order], parents[order], side='left')
+        rank = np.empty(len(starts), dtype=np.int64)
+        rank[order] = np.arange(len(starts)) - first_child
+        kept = candidate & (rank < top_n)
+        folded = candidate & ~kept
+        other_total = np.bincount(parents[folded], weights=totals[folded], minlength=len(group_starts))
+        other_count = np.bincount(parents[folded], minlength=len(group_starts))
+        levels.append({
+            'starts': starts, 'totals': totals, 'parents': parents, 'kept': kept,
+            'other_total': other_total, 'other_count': other_count,
+            # An Other leaf's amount times its colour
+            'other_weighted': other_total ** 2 / np.maximum(other_count, 1),
+        })
+        group_starts, shown = starts, kept
+
+    # Bottom-up: sum of squared leaf amounts below every group, for the colours
+    weighted = levels[-1]['totals'] ** 2
+    for upper, lower in zip(levels[-2::-1], levels[:0:-1]):
+        kept = lower['kept']
+        upper['weighted'] = np.bincount(lower['parents'][kept], weights=weighted[kept], minlength=len(upper['starts'])) \
+            + lower['other_weighted']
+        weighted = upper['weighted']
+    levels[-1]['weighted'] = levels[-1]['totals'] ** 2
+    top = levels[0]
+    root_weighted = weighted[top['kept']].sum() + top['other_weighted'][0]
+
+    frames = []
+    root_id = '/'.join(node)
+    if node:
+        total = top['totals'].sum()
+        frames.append(pd.DataFrame({
+            'id': [root_id], 'parent': [''], 'label': [node[-1]], 'depth': [start], 'expandable': [False],
+            AMOUNT: [total], 'color': [root_weighted / total if total else np.nan],
+        }))
+    parent_ids = np.array([root_id], dtype=object)
+    for offset, level in enumerate(levels):
+        kept = level['kept']
+        level_labels = labels[start + offset][codes[level['starts'][kept], start + offset]].astype(str)
+        ids = node_ids(parent_ids[level['parents'][kept]], level_labels)
+        totals = level['totals'][kept]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            colors = level['weighted'][kept] / totals
+        frames.append(pd.DataFrame({
+            'id': ids, 'parent': parent_ids[level['parents'][kept]], 'label': level_labels,
+            'depth': start + offset + 1, 'expandable': start + offset + 1 < len(labels),
+            AMOUNT: totals, 'color': colors,
+        }))
+        folded = np.flatnonzero(level['other_count'])
+        if len(folded):
+            other_labels = np.array([f'Other ({n})' for n in level['other_count'][folded]], dtype=object)
+            other_totals = level['other_total'][folded]
+            frames.append(pd.DataFrame({
+                'id': node_ids(parent_ids[folded], other_labels), 'parent': parent_ids[folded], 'label': other_labels,
+                'depth': start + offset + 1, 'expandable': False, AMOUNT: other_totals,
+                'color': other_totals / level['other_count'][folded],
+            }))
+        # The groups of the next level hang from this level's groups, shown or not
+        next_parent_ids = np.empty(len(level['starts']), dtype=object)
+        next_parent_ids[kept] = ids
+        parent_ids = next_parent_ids
+    return pd.concat(frames, ignore_index=True)
+
+
+class HierarchyIndex:
+    """Cube cells sorted by the columns of path, for slices of that hierarchy.
+
+    cells are DataCube-style cells (the filtered columns, Age and Purchase
+    Amount bucket starts, and amount_sum) with a column per level of path.
+    """
+    def __init__(self, cells, path):
+        self.path = list(path)
+        # Like groupby(observed=True), cells missing a level belong to no node
+        cells = cells.dropna(subset=self.path)
+        codes, self.labels = [], []
+        for col in self.path:
+            level_codes, values = pd.factorize(cells[col].astype(str), sort=True)
+            codes.append(level_codes)
+            self.labels.append(np.asarray(values, dtype=object))
+        order = np.lexsort(codes[::-1])
+        self.codes = np.column_stack(codes)[order]
+        self.amounts = cells['amount_sum'].to_numpy(dtype=float)[order]
+        self.engine = FilterEngine(cells.iloc[order].reset_index(drop=True))
+
+    @property
+    def n_cells(self):
+        return len(self.codes)
+
+    def span(self, node):
+        """First and last + 1 position of the cells below node."""
+        low, high = 0, len(self.codes)
+        for level, value in enumerate(node):
+            labels = self.labels[level]
+            code = np.searchsorted(labels, value)
+            if code == len(labels) or labels[code] != value:
+                return 0, 0
+            column = self.codes[low:high, level]
+            low, high = low + np.searchsorted(column, code, side='left'), low + np.searchsorted(column, code, side='right')
+        return low, high
+
+    def slice(self, state, node=(), levels=3, top_n=12):
+        """ranked_nodes for the cells below node selected by state, levels deep."""
+        node = tuple(node)
+        low, high = self.span(node)
+        positions = np.arange(low, high)
+        positions = positions[self.engine.matches(state, positions, SCOPES['final'])]
+        depth = min(len(node) + levels, len(self.path))
+        return ranked_nodes(self.codes[positions, :depth], self.labels, self.amounts[positions], node, top_n)
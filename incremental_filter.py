@@ -0,0 +1,156 @@
+"""Incremental evaluation of the dashboard filters across reruns.
+
+Streamlit reruns app.py from the top on every interaction, but most
+interactions move a single control a little: the Age slider narrows by a year,
+one more item checkbox is ticked. IncrementalFilter remembers the previous
+FilterState and its row masks (in ``st.session_state``) and patches them with
+the rows that changed instead of evaluating the whole predicate again:
+
+- rows leaving the result (the slice a range shrank by, the values removed
+  from a selection) are cleared without further checks;
+- rows that may enter it (the slice a range grew by, the values added to a
+  selection) are looked up through the engine's indexes and checked against
+  the full predicate.
+
+Both deltas come from the engine's sorted positional indexes and bitsets, so a
+one-step slider move touches only the rows in that step. When the deltas are a
+large share of the table (e.g. the first item checkbox), the bitmap engine is
+faster and the state is evaluated from scratch, unless the prefetcher has
+already left that state's masks in the aggregate cache.
+"""
+import numpy as np
+
+from filter_engine import FilterEngine
+
+SCOPES = {
+    'base': FilterEngine.SIDEBAR_FIELDS + ('age_groups', 'categories'),
+    'final': FilterEngine.SIDEBAR_FIELDS + FilterEngine.INTERACTIVE_FIELDS,
+}
+
+# Above this share of the table, patching the previous masks is not worth it
+FULL_EVALUATION_FRACTION = 0.05
+
+EMPTY_ROWS = np.empty(0, dtype=np.intp)
+
+
+def switches_selection(old_state, new_state):
+    """True when an interactive selection goes from empty to non-empty or back."""
+    return any(
+        bool(getattr(old_state, field)) != bool(getattr(new_state, field))
+        for field in FilterEngine.INTERACTIVE_FIELDS
+    )
+
+
+class IncrementalFilter:
+    def __init__(self, engine, cache=None):
+        self.engine = engine
+        self.cache = cache
+        self.state = None
+        self.masks = None
+        self.last_mode = None
+        self.mode_counts = {'full': 0, 'reuse': 0, 'incremental': 0, 'prefetched': 0}
+
+    def select(self, state):
+        """Same result as engine.select(state), reusing the previous rerun when possible."""
+        masks = self._patch_masks(state) if self.state is not None else None
+        if masks is None and self.cache is not None:
+            masks = self.cache.get('masks', state.key())
+            self.last_mode = 'prefetched'
+        if masks is None:
+            masks = self.engine.select_masks(state)
+            self.last_mode = 'full'
+        self.mode_counts[self.last_mode] += 1
+        self.state = state
+        self.masks = masks
+        # Positions are rebuilt on each rerun instead of being kept in the
+        # session, so a session holds one byte per row and scope between reruns
+        return {scope: np.flatnonzero(mask) for scope, mask in masks.items()}
+
+    def rebase(self, engine):
+        """Follow engine if it is this engine with rows appended (a live feed update).
+
+        Only the appended rows are checked against the previous state; the
+        masks of the existing rows carry over. Returns False for an unrelated
+        engine, which needs a new IncrementalFilter.
+        """
+        if engine.lineage != self.engine.lineage or engine.n_rows < self.engine.n_rows:
+            return False
+        if self.masks is not None and engine.n_rows > self.engine.n_rows:
+            appended = np.arange(self.engine.n_rows, engine.n_rows)
+            self.masks = {
+                scope: np.concatenate([mask, engine.matches(self.state, appended, SCOPES[scope])])
+                for scope, mask in self.masks.items()
+            }
+        self.engine = engine
+        return True
+
+    def _patch_masks(self, state):
+        changed = [field for field in SCOPES['final'] if getattr(state, field) != getattr(self.state, field)]
+        if not changed:
+            self.last_mode = 'reuse'
+            return self.masks
+
+        if switches_selection(self.state, state):
+            # Switching a selection on or off moves everything outside it
+            return None
+
+        leaving, entering = {}, {}
+        budget = self.engine.n_rows * FULL_EVALUATION_FRACTION
+        for field in changed:
+            old, new = getattr(self.state, field), getattr(state, field)
+            if field in self.engine.VALUE_FILTERS:
+                # Known from the per-value counts before any row is touched
+                counts = self.engine.value_counts[self.engine.VALUE_FILTERS[field]]
+                if sum(counts.get(value, 0) for value in set(old) ^ set(new)) > budget:
+                    return None
+            leaving[field] = self._delta_rows(field, new, old)
+            entering[field] = self._delta_rows(field, old, new)
+            budget -= len(leaving[field]) + len(entering[field])
+            if budget < 0:
+                return None
+
+        masks = {}
+        for scope, fields in SCOPES.items():
+            scope_changed = [field for field in changed if field in fields]
+            if not scope_changed:
+                masks[scope] = self.masks[scope]
+                continue
+
+            mask = self.masks[scope].copy()
+            for field in scope_changed:
+                mask[leaving[field]] = False
+            candidates = [entering[field] for field in scope_changed if len(entering[field])]
+            if candidates:
+                candidates = np.concatenate(candidates)
+                mask[candidates[self.engine.matches(state, candidates, fields)]] = True
+            masks[scope] = mask
+
+        self.last_mode = 'incremental'
+        return masks
+
+    def _delta_rows(self, field, old, new):
+        """Rows that satisfy the condition new on field but not the condition old."""
+        engine = self.engine
+        if field in engine.RANGE_FILTERS:
+            column = engine.RANGE_FILTERS[field]
+            sorted_values = engine.sorted_values[column]
+            order = engine.sorted_positions[column]
+            new_start, old_start = np.searchsorted(sorted_values, [new[0], old[0]], side='left')
+            new_stop, old_stop = np.searchsorted(sorted_values, [new[1], old[1]], side='right')
+            below = order[new_start:min(old_start, new_stop)]
+            above = order[max(old_stop, new_start):new_stop]
+            return np.concatenate([below, above])
+
+        column = engine.VALUE_FILTERS[field]
+        if field in engine.INTERACTIVE_FIELDS and not new:
+            # An empty interactive selection matches every row
+            if not old:
+                return EMPTY_ROWS
+            bits = np.bitwise_and(engine.all_bits, np.invert(engine.value_bits(column, old)))
+            return engine.rows(bits)
+        if field in engine.INTERACTIVE_FIELDS and not old:
+            return EMPTY_ROWS
+        added_values = set(new) - set(old)
+        if not added_values:
+            return EMPTY_ROWS
+        return engine.rows(engine.value_bits(column, added_values))
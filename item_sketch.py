@@ -0,0 +1,136 @@
+"""Top-K purchased items with error bounds, for catalogs of any size.
+
+The Top-10 bar and its checkbox panel ignore the item selection, so they only
+filter on Gender, Season, Category and the cube's Age / Purchase Amount
+buckets. The sketch groups the rows by those columns and keeps at most
+``capacity`` item counters per cell: the cell's most purchased items, each
+with a lower and an upper bound on its count, plus the cell's floor, an upper
+bound on the count of any item the cell does not list. Built from rows, the
+bounds are the exact count and the floor is the count of the most purchased
+item left out, so a cell with at most capacity items is exact.
+
+Counters merge like Space-Saving summaries ("Mergeable summaries", Agarwal et
+al.): an item's lower bounds add up, and its upper bound adds the upper
+bounds of the summaries listing it and the floors of those that do not. The
+same rule combines the cells matching a filter state (``item_bounds``) and
+merges the sketch of new rows into existing cells
+(``merge_items``, for the streaming and live ingest modes), after which only
+the top capacity counters of a cell are kept again.
+
+When no matching cell has dropped an item, the bounds are equal and are the
+exact counts. Otherwise they rule items out: only items whose upper bound
+reaches the k-th highest lower bound can be in the Top-K
+(``ItemSketch.candidates``), and the cube counts just those exactly. Either
+way the sketch costs one pass over the counters of the matching cells, at
+most capacity per cell, whatever the number of rows or items.
+"""
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine
+
+AGE = 'Age'
+AMOUNT = 'Purchase Amount (USD)'
+ITEM = 'Item Purchased'
+KEYS = ['Gender', 'Season', 'Category', AGE, AMOUNT]
+BOUNDS = ['lower', 'upper', 'floor']
+
+
+def _truncate(counters, capacity):
+    """Keep the capacity counters with the highest upper bound in each cell."""
+    counters = counters.sort_values(KEYS + ['upper', 'lower'], ascending=[True] * len(KEYS) + [False, False],
+                                    kind='stable', ignore_index=True)
+    rank = counters.groupby(KEYS, observed=True, sort=False).cumcount().to_numpy()
+    dropped = counters[rank >= capacity]
+    kept = counters[rank < capacity].reset_index(drop=True)
+    if len(dropped):
+        # A dropped item may still be purchased up to its upper bound
+        dropped_max = dropped.groupby(KEYS, observed=True)['upper'].max().rename('dropped')
+        kept = kept.join(dropped_max, on=KEYS)
+        kept['floor'] = np.fmax(kept['floor'], kept.pop('dropped'))
+    return kept
+
+
+def aggregate_items(df, age_bucket=1, amount_bucket=1, capacity=64):
+    """Group raw rows into item counters (cell keys, item, lower, upper, floor)."""
+    keyed = pd.DataFrame({col: df[col] for col in ['Gender', 'Season', 'Category', ITEM]})
+    # Same buckets as the cube, so the sliders select the same rows
+    keyed[AGE] = np.floor(df[AGE].to_numpy(dtype=float) / age_bucket) * age_bucket
+    keyed[AMOUNT] = np.floor(df[AMOUNT].to_numpy(dtype=float) / amount_bucket) * amount_bucket
+    counters = keyed.groupby(KEYS + [ITEM], observed=True).size().rename('upper').reset_index()
+    counters = counters[counters['upper'] > 0]
+    counters['upper'] = counters['upper'].astype(float)
+    counters['lower'] = counters['upper']
+    counters['floor'] = 0.0
+    return _truncate(counters, capacity)
+
+
+def merge_items(partials, capacity=64):
+    """Combine item counters built from disjoint sets of rows (chunks, appends)."""
+    parts = []
+    for part in partials:
+        part = part[KEYS + [ITEM] + BOUNDS].copy()
+        for col in ['Gender', 'Season', 'Category', ITEM]:
+            part[col] = part[col].astype(str)
+        parts.append(part)
+    counters = pd.concat(parts, ignore_index=True)
+
+    # Each part's floor applies to the items of the cell the part does not list
+    floors = pd.concat([part.drop_duplicates(KEYS)[KEYS + ['floor']] for part in parts], ignore_index=True)
+    floors = floors.groupby(KEYS)['floor'].sum().rename('total_floor')
+    counters = counters.groupby(KEYS + [ITEM])[BOUNDS].sum().reset_index().join(floors, on=KEYS)
+    counters['upper'] += counters['total_floor'] - counters['floor']
+    counters['floor'] = counters.pop('total_floor')
+    for col in ['Gender', 'Season', 'Category', ITEM]:
+        counters[col] = counters[col].astype('category')
+    return _truncate(counters, capacity)
+
+
+class ItemSketch:
+    def __init__(self, counters, capacity=64):
+        self.capacity = capacity
+        self.counters = counters
+        # The item selection is ignored, so no bitset per item
+        self.engine = FilterEngine(counters.drop(columns=ITEM))
+        self.cell_ids = counters.groupby(KEYS, observed=True, sort=False).ngroup().to_numpy()
+        self.item_codes, self.items = pd.factorize(counters[ITEM])
+        self.bounds = counters[BOUNDS].to_numpy(dtype=float)
+
+    @property
+    def n_counters(self):
+        return len(self.counters)
+
+    def item_bounds(self, state):
+        """Lower and upper bound of each listed item's count under state, ignoring
+        the item selection, and the bound on the count of any unlisted item."""
+        engine = self.engine
+        bits = engine.interactive_bits(state, engine.sidebar_bits(state), ('age_groups', 'categories'))
+        positions = engine.rows(bits)
+        cells, codes, bounds = self.cell_ids[positions], self.item_codes[positions], self.bounds[positions]
+
+        # Every matching cell contributes its floor to each item it does not list
+        _, first = np.unique(cells, return_index=True)
+        unlisted = bounds[first, 2].sum()
+        lower = np.bincount(codes, weights=bounds[:, 0], minlength=len(self.items))
+        upper = np.bincount(codes, weights=bounds[:, 1] - bounds[:, 2], minlength=len(self.items)) + unlisted
+        return lower, upper, unlisted
+
+    def candidates(self, state, k=10):
+        """Exact counts or candidates for the k most purchased items under state.
+
+        Returns (counts, None) with a Series of every item's count when no
+        matching cell dropped a counter, else (None, items) with the items
+        that may be among the top k, or (None, None) when an item no matching
+        cell lists may be (then every item has to be counted).
+        """
+        lower, upper, unlisted = self.item_bounds(state)
+        listed = lower > 0
+        if unlisted == 0:
+            return pd.Series(lower[listed], index=self.items[listed]), None
+        if listed.sum() < k:
+            return None, None
+        # The k-th highest lower bound: anything that cannot reach it is out
+        threshold = np.partition(lower[listed], -k)[-k]
+        if unlisted >= threshold:
+            return None, None
+        return None, tuple(sorted(str(item) for item in self.items[listed & (upper >= threshold)]))
@@ -0,0 +1,249 @@
+"""Tailing ingest for live transaction feeds.
+
+The source is either an append-only CSV file or a drop directory of CSV files
+(each of which may also grow). LiveFeed remembers how many bytes of every
+file it has consumed and, on each poll, parses only the complete lines added
+since. The new rows go through the same cleaning as the other ingest modes
+(incomplete rows dropped, duplicates dropped with row fingerprints, numeric
+columns coerced, derived columns added) and are then appended everywhere the
+dashboard reads from, without touching the history:
+
+- the base table grows in column buffers with spare capacity, so appending
+  k rows costs O(k) amortized and the frame handed to the app is a set of
+  views (see GrowingColumns);
+- the filter engine extends its bitsets and sorted range indexes
+  (FilterEngine.appended);
+- the cube rolls the new rows into its cells, moment cells, item counters
+  and the hierarchy indexes built so far (DataCube.appended);
+- OnlineStats merges the new rows' minimum and maximum for the sliders.
+
+Every poll that finds rows publishes a new immutable LiveSnapshot with a
+higher version; reruns in progress keep reading the snapshot they started
+with. A background thread polls every DASHBOARD_LIVE_POLL_SECONDS, and the
+app reruns open sessions when the version changes.
+"""
+import copy
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import derived
+from cube import DataCube
+from data_store import CATEGORICAL_COLUMNS, COERCED_NUMERIC_COLUMNS
+from filter_engine import FilterEngine
+from streaming_ingest import NUMERIC_COLS, OnlineStats, RowFingerprints, coerce_chunk
+
+# Buffer types of the columns that are not categorical. They are declared, not
+# inferred from the first batch: a batch of whole-number ratings would
+# otherwise make an integer buffer that truncates every later 3.7.
+NUMERIC_DTYPES = {'Customer ID': np.int64, **{col: np.float64 for col in COERCED_NUMERIC_COLUMNS + NUMERIC_COLS}}
+
+
+class SourceTail:
+    """New complete lines of an append-only CSV file or of the CSV files in a directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = {}
+        self.headers = {}
+
+    def files(self):
+        if os.path.isdir(self.path):
+            return sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith('.csv')
+            )
+        return [self.path] if os.path.exists(self.path) else []
+
+    def read_new(self):
+        """Frame of the rows added since the last call, or None when there are none."""
+        frames = []
+        for path in self.files():
+            size = os.path.getsize(path)
+            offset = self.offsets.get(path, 0)
+            if size < offset:
+                # Truncated or replaced: read it again, the fingerprints drop rows seen before
+                offset = 0
+                self.headers.pop(path, None)
+            if size == offset:
+                continue
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+            # A writer may be halfway through a line; leave it for the next poll
+            data = data[:data.rfind(b'\n') + 1]
+            if path not in self.headers:
+                header_end = data.find(b'\n') + 1
+                if not header_end:
+                    continue
+                self.headers[path] = data[:header_end]
+                self.offsets[path] = offset + header_end
+                offset, data = offset + header_end, data[header_end:]
+            self.offsets[path] = offset + len(data)
+            if data.strip():
+                frames.append(pd.read_csv(io.BytesIO(self.headers[path] + data)))
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+
+class GrowingColumns:
+    """Column buffers with spare capacity behind an append-only DataFrame.
+
+    Categorical columns are stored as integer codes plus a category list that
+    only ever grows, so the codes of existing rows never change. The other
+    columns are stored with their type in dtypes; a column in neither is
+    stored as categorical. ``frame()``
+    returns views onto the first n rows; later appends write past n (or into
+    a new, larger buffer), so a frame handed out earlier never changes.
+    """
+
+    def __init__(self, categorical, dtypes, categories=None):
+        self.categorical = set(categorical)
+        self.dtypes = dict(dtypes)
+        self.n_rows = 0
+        self.buffers = {}
+        # Known category orders (e.g. the labels of a derived column) are kept
+        self.categories = {col: list(values) for col, values in (categories or {}).items()}
+
+    def _reserve(self, n_rows):
+        for col, buffer in self.buffers.items():
+            if len(buffer) < n_rows:
+                grown = np.empty(max(n_rows, 2 * len(buffer)), dtype=buffer.dtype)
+                grown[:self.n_rows] = buffer[:self.n_rows]
+                self.buffers[col] = grown
+
+    def append(self, chunk):
+        if not self.buffers:
+            for col in chunk.columns:
+                if col in self.dtypes and col not in self.categorical:
+                    self.buffers[col] = np.empty(0, dtype=self.dtypes[col])
+                else:
+                    self.categorical.add(col)
+                    self.buffers[col] = np.empty(0, dtype=np.int8)
+                    self.categories.setdefault(col, [])
+
+        start, stop = self.n_rows, self.n_rows + len(chunk)
+        self._reserve(stop)
+        for col, buffer in self.buffers.items():
+            if col in self.categorical:
+                codes, uniques = pd.factorize(chunk[col])
+                categories = self.categories[col]
+                code_of = {value: code for code, value in enumerate(categories)}
+                for value in uniques:
+                    if str(value) not in code_of:
+                        code_of[str(value)] = len(categories)
+                        categories.append(str(value))
+                if len(categories) >= np.iinfo(buffer.dtype).max:
+                    # Widen once; pandas keeps codes in the smallest type that fits
+                    buffer = self.buffers[col] = buffer.astype(np.int16 if buffer.dtype == np.int8 else np.int32)
+                lookup = np.array([code_of[str(value)] for value in uniques] + [-1], dtype=buffer.dtype)
+                buffer[start:stop] = lookup[codes]
+            else:
+                buffer[start:stop] = chunk[col].to_numpy(dtype=buffer.dtype)
+        self.n_rows = stop
+
+    def frame(self):
+        columns = {}
+        for col, buffer in self.buffers.items():
+            view = buffer[:self.n_rows]
+            if col in self.categorical:
+                columns[col] = pd.Categorical.from_codes(view, categories=list(self.categories[col]), validate=False)
+            else:
+                columns[col] = view
+        return pd.DataFrame(columns, copy=False)
+
+
+@dataclass(frozen=True)
+class LiveSnapshot:
+    version: int
+    df: pd.DataFrame
+    engine: FilterEngine
+    cube: DataCube
+    stats: OnlineStats
+    rows_read: int
+    rows_duplicate: int
+
+
+class LiveFeed:
+    def __init__(self, source, age_bucket=1, amount_bucket=1, item_capacity=64):
+        self.tail = SourceTail(source)
+        self.age_bucket = age_bucket
+        self.amount_bucket = amount_bucket
+        self.item_capacity = item_capacity
+        self.fingerprints = RowFingerprints()
+        self.columns = GrowingColumns(
+            CATEGORICAL_COLUMNS + derived.names(), NUMERIC_DTYPES,
+            categories={name: column.labels for name, column in derived.DERIVED_COLUMNS.items()}
+        )
+        self.snapshot = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def poll(self):
+        """Append the rows added to the source since the last poll.
+
+        Returns True when a new snapshot was published.
+        """
+        with self._lock:
+            chunk = self.tail.read_new()
+            if chunk is None:
+                return False
+            rows_read = len(chunk)
+            chunk = chunk.dropna()
+            rows_complete = len(chunk)
+            chunk = chunk[self.fingerprints.first_occurrences(chunk)]
+            rows_duplicate = rows_complete - len(chunk)
+            # Values that do not parse as numbers would not fit the typed buffers
+            chunk = coerce_chunk(chunk).dropna(subset=COERCED_NUMERIC_COLUMNS)
+            previous = self.snapshot
+            if chunk.empty:
+                return False
+            chunk = derived.add_derived_columns(chunk.reset_index(drop=True))
+
+            if previous is None:
+                engine = FilterEngine(chunk)
+                cube = DataCube(chunk, self.age_bucket, self.amount_bucket, self.item_capacity)
+                stats = OnlineStats()
+            else:
+                engine = previous.engine.appended(chunk)
+                cube = previous.cube.appended(chunk)
+                stats = copy.deepcopy(previous.stats)
+            stats.update(chunk)
+
+            # Only once everything indexing the rows has them, so a failure
+            # above leaves the table, engine and cube of the last snapshot aligned
+            self.columns.append(chunk)
+            self.snapshot = LiveSnapshot(
+                version=previous.version + 1 if previous else 1,
+                df=self.columns.frame(),
+                engine=engine,
+                cube=cube,
+                stats=stats,
+                rows_read=rows_read + (previous.rows_read if previous else 0),
+                rows_duplicate=rows_duplicate + (previous.rows_duplicate if previous else 0),
+            )
+            return True
+
+    def start(self, interval):
+        """Poll in a daemon thread every interval seconds (once per feed)."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.poll()
+                    self.last_error = None
+                except Exception as error:
+                    # Keep tailing; the rows of a malformed batch are skipped
+                    self.last_error = error
+
+        self._thread = threading.Thread(target=run, name='live-feed', daemon=True)
+        self._thread.start()
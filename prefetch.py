@@ -0,0 +1,77 @@
+"""Background warming of the aggregate cache for the likely next click.
+
+While the user reads the charts the server is idle, and the next interaction
+is usually one checkbox in the category, age group or item panels, each of
+which calls ``st.rerun()``. After a rerun has rendered, the Prefetcher takes
+its FilterState, enumerates the states one toggle away and computes their
+aggregates on a small thread pool into the shared AggregateCache, so the
+rerun triggered by the checkbox finds them there.
+
+Work is bounded three ways: at most ``max_states`` neighbours per rerun,
+entries go in at the cold end of the cache's LRU (see aggregate_cache.py), and
+a newer schedule from the same session drops the older one's queued work.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+
+def neighbour_states(state, options):
+    """(field, state) pairs one toggle away; options maps an interactive field to its checkbox values."""
+    for field, values in options.items():
+        current = set(getattr(state, field))
+        for value in values:
+            yield field, replace(state, **{field: tuple(sorted(current ^ {str(value)}))})
+
+
+def state_key(state, scope):
+    return state.without_items().key() if scope == 'base' else state.key()
+
+
+class Prefetcher:
+    def __init__(self, cache, workers=1, max_states=32):
+        self.cache = cache
+        self.max_states = max_states
+        self.completed = 0
+        self.superseded = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._generations = {}
+
+    def schedule(self, owner, state, options, tasks):
+        """Queue the neighbours of state, replacing owner's previously queued ones.
+
+        tasks maps a chart name to (scope, compute): scope is 'final' or 'base'
+        (the key the chart uses in the cache) and compute(state) returns the
+        aggregate, or None when there is nothing worth caching.
+        """
+        with self._lock:
+            generation = self._generations.get(owner, 0) + 1
+            self._generations[owner] = generation
+
+        neighbours = [neighbour for _, neighbour in neighbour_states(state, options)]
+        for neighbour in neighbours[:self.max_states]:
+            self._executor.submit(self._warm, owner, generation, neighbour, tasks)
+        return min(len(neighbours), self.max_states)
+
+    def _warm(self, owner, generation, state, tasks):
+        for chart, (scope, compute) in tasks.items():
+            if self._generations.get(owner) != generation:
+                # The session has moved on; its next rerun schedules fresh work
+                with self._lock:
+                    self.superseded += 1
+                return
+            key = (chart, state_key(state, scope))
+            try:
+                # Skipped when cached, or already being computed by a rerun
+                self.cache.warm(key, lambda: compute(state))
+            except Exception:
+                # A failed guess only costs the prefetch; the rerun computes it again
+                with self._lock:
+                    self.failed += 1
+        with self._lock:
+            self.completed += 1
+
+    def stats(self):
+        return {'completed': self.completed, 'superseded': self.superseded, 'failed': self.failed}
@@ -0,0 +1,108 @@
+"""Per-section timing of a dashboard rerun.
+
+Each numbered visualization (and the load/filter steps) gets a SectionTimer.
+Calling ``lap(phase)`` attributes the time since the previous lap to that
+phase, which splits a section into aggregation, figure construction and
+rendering. When payload measurement is on, ``record_payload(figure)`` also
+stores the serialized size of the figure sent to the browser (Plotly JSON or
+the PNG produced for matplotlib figures).
+
+A finished rerun can be exported as JSON lines or CSV, and appended to the
+file named by DASHBOARD_PROFILE_LOG to track regressions across deployments.
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime, timezone
+
+PHASES = ['aggregate', 'figure', 'render']
+FIELDS = ['run_id', 'timestamp', 'section', 'total_ms'] + [f'{phase}_ms' for phase in PHASES] + ['payload_bytes']
+
+
+def figure_payload_bytes(figure):
+    """Size of the serialized figure as sent to the browser."""
+    if isinstance(figure, bytes):
+        # Already encoded, e.g. a rendered PNG
+        return len(figure)
+    if hasattr(figure, 'to_json'):
+        return len(figure.to_json().encode('utf-8'))
+    if hasattr(figure, 'savefig'):
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png')
+        return buffer.tell()
+    return None
+
+
+class SectionTimer:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+        self.started = self.last_lap = time.perf_counter()
+        self.phases = {}
+        self.payload_bytes = None
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self.last_lap)
+        self.last_lap = now
+
+    def record_payload(self, figure):
+        if self.profile.measure_payload:
+            # Serializing again is not free, so it is excluded from the timings
+            started = time.perf_counter()
+            self.payload_bytes = figure_payload_bytes(figure)
+            elapsed = time.perf_counter() - started
+            self.last_lap += elapsed
+            self.started += elapsed
+
+    def stop(self):
+        record = {
+            'run_id': self.profile.run_id,
+            'timestamp': self.profile.timestamp,
+            'section': self.name,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'payload_bytes': self.payload_bytes,
+        }
+        for phase in PHASES:
+            record[f'{phase}_ms'] = round(self.phases.get(phase, 0.0) * 1000, 3)
+        self.profile.records.append(record)
+        return record
+
+
+class RerunProfile:
+    def __init__(self, run_id, measure_payload=False):
+        self.run_id = run_id
+        self.timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.measure_payload = measure_payload
+        self.started = time.perf_counter()
+        self.records = []
+
+    def start(self, name):
+        return SectionTimer(self, name)
+
+    def total_record(self):
+        """Wall time of the whole rerun so far, as a record like the section ones."""
+        return {
+            'run_id': self.run_id,
+            'timestamp': self.timestamp,
+            'section': 'Rerun total',
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+        }
+
+
+def to_json_lines(records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+def to_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+
+def append_log(path, records):
+    with open(path, 'a') as f:
+        f.write(to_json_lines(records))
@@ -0,0 +1,223 @@
+"""Out-of-core query backend: the dashboard's filters and aggregates run in DuckDB.
+
+With DASHBOARD_INGEST=sql the table is never loaded into the Streamlit
+process. An embedded DuckDB database reads the Parquet files named by
+DASHBOARD_SQL_SOURCE (by default the typed store of DASHBOARD_DATA_FILE, see
+data_store.py), and every chart asks it for its small result only:
+
+- a FilterState becomes a parameterized WHERE clause (``filters_sql``);
+- ``rollup``, ``count`` and ``hierarchy_slice`` answer the same calls as
+  DataCube, so the functions in aggregations.py draw the pie, treemap,
+  sunburst, line, top-10 bar and Sankey charts from a SqlBackend unchanged,
+  each as one GROUP BY;
+- the correlation matrix is one pass of ``corr()`` aggregates (over window
+  ranks for Spearman), and the point charts get a bounded sample of the
+  matching rows keyed by the filter state.
+
+Derived columns (see derived.py) are CASE expressions in the view the queries
+read, so they filter and group like stored columns.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import derived
+from aggregations import NUMERIC_COLS
+from correlation import METHODS, partial_correlation
+from cube import MEASURES
+from filter_engine import FilterEngine
+from hierarchy_index import ranked_nodes
+from incremental_filter import SCOPES
+
+AMOUNT = 'Purchase Amount (USD)'
+
+
+def quote(name):
+    """SQL identifier for a column name (they contain spaces and parentheses)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def bands_sql(bands):
+    """CASE expression equivalent to derived.Bands.compute."""
+    source = quote(bands.source)
+    low_op, high_op = ('>', '<=') if bands.right else ('>=', '<')
+    cases = []
+    for low, high, label in zip(bands.edges[:-1], bands.edges[1:], bands.labels):
+        conditions = [f'{source} {low_op} {float(low)!r}' if np.isfinite(low) else f'{source} IS NOT NULL']
+        if np.isfinite(high):
+            conditions.append(f'{source} {high_op} {float(high)!r}')
+        cases.append(f"WHEN {' AND '.join(conditions)} THEN {literal(label)}")
+    return f"CASE {' '.join(cases)} END"
+
+
+def filters_sql(state, scope='final'):
+    """WHERE condition (with ? placeholders) and its parameters for state in scope.
+
+    Mirrors FilterEngine.select: an empty sidebar selection matches nothing,
+    an empty interactive selection matches everything.
+    """
+    conditions, params = [], []
+    for field in SCOPES[scope]:
+        selection = getattr(state, field)
+        if field in FilterEngine.RANGE_FILTERS:
+            conditions.append(f'{quote(FilterEngine.RANGE_FILTERS[field])} BETWEEN ? AND ?')
+            params.extend(selection)
+        elif not selection:
+            if field not in FilterEngine.INTERACTIVE_FIELDS:
+                conditions.append('FALSE')
+        else:
+            placeholders = ', '.join('?' * len(selection))
+            conditions.append(f'{quote(FilterEngine.VALUE_FILTERS[field])} IN ({placeholders})')
+            params.extend(selection)
+    return ' AND '.join(conditions) or 'TRUE', params
+
+
+class SqlBackend:
+    """Filtered aggregates over Parquet files, computed by an embedded DuckDB.
+
+    source is a Parquet file, a glob such as 'history/*.parquet' or a list of
+    files. Safe to share between sessions and threads: each thread queries
+    through its own cursor.
+    """
+
+    def __init__(self, source):
+        # Optional dependency, only needed for this backend
+        import duckdb
+
+        self.source = source
+        self._connection = duckdb.connect()
+        self._local = threading.local()
+
+        files = [source] if isinstance(source, str) else list(source)
+        scan = 'read_parquet([{}], file_row_number=true, filename=true)'.format(', '.join(map(literal, files)))
+        stored = self._query(f'DESCRIBE SELECT * FROM {scan}')['column_name'].tolist()
+        derived_columns = [
+            f'{bands_sql(column)} AS {quote(name)}'
+            for name, column in derived.DERIVED_COLUMNS.items()
+            if name not in stored and column.source in stored and isinstance(column, derived.Bands)
+        ]
+        self.columns = [col for col in stored if col not in ('filename', 'file_row_number')]
+        self.columns += [name for name in derived.DERIVED_COLUMNS if name not in self.columns]
+        # row_key orders the point-chart sample; it is stable for a given set of files
+        self._connection.execute(
+            'CREATE VIEW transactions AS SELECT * EXCLUDE (filename, file_row_number), '
+            'hash(filename, file_row_number) AS row_key'
+            + ''.join(', ' + column for column in derived_columns)
+            + f' FROM {scan}'
+        )
+
+        # The files do not change while the backend lives, so the slider bounds,
+        # sidebar options and row count are read once
+        ranges = ', '.join(
+            f'min({quote(col)}), max({quote(col)})' for col in FilterEngine.RANGE_FILTERS.values()
+        )
+        overview = self._query(f'SELECT count(*), {ranges} FROM transactions').iloc[0].tolist()
+        self.n_rows = int(overview[0])
+        self._bounds = {
+            col: (overview[1 + 2 * i], overview[2 + 2 * i])
+            for i, col in enumerate(FilterEngine.RANGE_FILTERS.values())
+        }
+        self.dimension_values = self._query(
+            'SELECT DISTINCT "Gender", "Season", "Category" FROM transactions ORDER BY ALL'
+        )
+
+    def _query(self, sql, params=()):
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self._connection.cursor()
+        return cursor.execute(sql, list(params)).df()
+
+    def bounds(self, column):
+        return self._bounds[column]
+
+    def count(self, state, scope='final'):
+        """Number of transactions selected by state."""
+        where, params = filters_sql(state, scope)
+        return int(self._query(f'SELECT count(*) FROM transactions WHERE {where}', params).iloc[0, 0])
+
+    def rollup(self, state, by, scope='final'):
+        """DataCube.rollup for any columns: the measures of the selected rows grouped by by."""
+        where, params = filters_sql(state, scope)
+        keys = ', '.join(quote(col) for col in by)
+        # Like groupby(observed=True), rows missing a key belong to no group
+        not_null = ''.join(f' AND {quote(col)} IS NOT NULL' for col in by)
+        amount = quote(AMOUNT)
+        sql = (
+            f'SELECT {keys}, count(*) AS count, sum({amount}) AS amount_sum, '
+            f'sum({amount} * {amount}) AS amount_sumsq '
+            f'FROM transactions WHERE {where}{not_null} GROUP BY ALL ORDER BY ALL'
+        )
+        totals = self._query(sql, params)
+        totals[MEASURES] = totals[MEASURES].astype({'count': np.int64, 'amount_sum': float, 'amount_sumsq': float})
+        derived_keys = [col for col in by if col in derived.DERIVED_COLUMNS]
+        if not derived_keys:
+            return totals
+        # Derived columns come back as text; restore their label order
+        for col in derived_keys:
+            totals[col] = pd.Categorical(totals[col], categories=list(derived.DERIVED_COLUMNS[col].labels), ordered=True)
+        return totals.sort_values(list(by), ignore_index=True)
+
+    def top_item_totals(self, state, k=10):
+        """DataCube.top_item_totals: here one GROUP BY over every item."""
+        return self.rollup(state, ['Item Purchased'], 'base')
+
+    def hierarchy_slice(self, state, path, node=(), levels=3, top_n=12, rows=None):
+        """DataCube.hierarchy_slice: one GROUP BY over the rows below node."""
+        node = tuple(node)
+        by = list(path[:min(len(node) + levels, len(path))])
+        where, params = filters_sql(state)
+        for col, value in zip(path, node):
+            where += f' AND CAST({quote(col)} AS VARCHAR) = ?'
+            params.append(value)
+        keys = ', '.join(f'CAST({quote(col)} AS VARCHAR)' for col in by)
+        not_null = ''.join(f' AND {quote(col)} IS NOT NULL' for col in by)
+        sql = (f'SELECT {keys}, sum({quote(AMOUNT)}) FROM transactions '
+               f'WHERE {where}{not_null} GROUP BY ALL')
+        groups = self._query(sql, params)
+        codes, labels = [], []
+        for i in range(len(by)):
+            level_codes, values = pd.factorize(groups.iloc[:, i], sort=True)
+            codes.append(level_codes)
+            labels.append(np.asarray(values, dtype=object))
+        # Codes of the levels not grouped on are never read
+        labels += [np.empty(0, dtype=object)] * (len(path) - len(by))
+        codes = np.column_stack(codes)
+        order = np.lexsort(codes.T[::-1])
+        return ranked_nodes(codes[order], labels, groups.iloc[:, -1].to_numpy(dtype=float)[order], node, top_n)
+
+    def correlation(self, state, method='pearson', partial=False, columns=NUMERIC_COLS):
+        """Correlation matrix of columns over the selected rows (like DataFrame.corr).
+
+        method is 'pearson' or 'spearman' (the Pearson correlation of mid ranks,
+        computed with window functions); partial controls each pair for the
+        other columns.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown correlation method {method!r}; choose from {METHODS}")
+        where, params = filters_sql(state)
+        source = f'(SELECT {", ".join(quote(col) for col in columns)} FROM transactions WHERE {where})'
+        if method == 'spearman':
+            ranks = ', '.join(
+                f'rank() OVER (ORDER BY {quote(col)}) + (count(*) OVER (PARTITION BY {quote(col)}) - 1) / 2 AS {quote(col)}'
+                for col in columns
+            )
+            source = f'(SELECT {ranks} FROM {source})'
+        pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i:]]
+        aggregates = ', '.join(f'corr({quote(b)}, {quote(a)})' for a, b in pairs)
+        values = self._query(f'SELECT {aggregates} FROM {source}', params).iloc[0].to_numpy(dtype=float)
+        matrix = pd.DataFrame(np.nan, index=list(columns), columns=list(columns))
+        for (a, b), value in zip(pairs, values):
+            matrix.loc[a, b] = matrix.loc[b, a] = value
+        return partial_correlation(matrix) if partial else matrix
+
+    def sample(self, state, columns, n, seed):
+        """Up to n selected rows, the same ones for the same seed (e.g. density.state_seed)."""
+        where, params = filters_sql(state)
+        selected = ', '.join(quote(col) for col in columns)
+        sql = f'SELECT {selected} FROM transactions WHERE {where} ORDER BY hash(row_key, ?) LIMIT ?'
+        return self._query(sql, params + [int(seed), int(n)])
@@ -0,0 +1,210 @@
+"""Chunked ingest for extracts that do not fit in memory.
+
+The CSV is read in fixed-size chunks and never materialized as one frame:
+
+- duplicate rows are dropped with a sorted set of 64-bit row fingerprints
+  (8 bytes per distinct row instead of a second copy of every column);
+- the numeric columns are coerced chunk by chunk;
+- OnlineStats keeps running min/max for the slider bounds, a Welford/Chan
+  co-moment matrix over all records and per-category totals;
+- each chunk is rolled into partial cube cells, moment cells and item
+  counters, which are merged into one DataCube at the end, so the charts,
+  the correlation heatmap and the Top-10 items follow the filters.
+
+The dashboard runs from the resulting StreamSummary when DASHBOARD_INGEST is
+set to ``streaming``.
+"""
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import config
+from correlation import aggregate_moments, merge_moments
+from cube import DataCube, aggregate_cells, merge_cells
+from item_sketch import aggregate_items, merge_items
+from data_store import CATEGORICAL_COLUMNS, COERCED_NUMERIC_COLUMNS
+
+NUMERIC_COLS = ['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases']
+
+
+def canonical_rows(chunk):
+    """chunk with one fixed dtype per column, so equal rows hash alike in any chunk.
+
+    read_csv infers each chunk's dtypes from that chunk alone: one missing Age
+    makes the chunk's ages float64, and 30.0 does not hash like 30. Like the
+    batch load's drop_duplicates, values compare as numbers in the numeric
+    columns (text that does not parse is kept alongside) and as text elsewhere.
+    """
+    canonical = {}
+    for col in chunk.columns:
+        if col in CATEGORICAL_COLUMNS:
+            canonical[col] = chunk[col].astype(str)
+        else:
+            numbers = pd.to_numeric(chunk[col], errors='coerce').astype('float64')
+            canonical[col] = numbers
+            unparsed = numbers.isna()
+            canonical[col + ' (text)'] = chunk[col].astype(str).where(unparsed, '') if unparsed.any() else ''
+    return pd.DataFrame(canonical, index=chunk.index)
+
+
+class RowFingerprints:
+    """Set of 64-bit row hashes used to drop duplicates across chunks.
+
+    Hashes are kept in sorted runs that are merged when a newer run grows as
+    large as the one before it, so inserting n rows costs O(n log n) overall
+    and each lookup is one binary search per run.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def first_occurrences(self, chunk):
+        """Boolean mask of rows in chunk that were not seen before."""
+        hashes = pd.util.hash_pandas_object(canonical_rows(chunk), index=False).to_numpy()
+        fresh = ~pd.Series(hashes).duplicated().to_numpy()
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            fresh &= run[positions] != hashes
+
+        run = np.sort(hashes[fresh])
+        if len(run):
+            while self.runs and len(self.runs[-1]) <= len(run):
+                run = np.sort(np.concatenate([self.runs.pop(), run]))
+            self.runs.append(run)
+        return fresh
+
+
+class OnlineStats:
+    """Running statistics over the numeric columns, mergeable chunk by chunk."""
+
+    def __init__(self, columns=NUMERIC_COLS):
+        k = len(columns)
+        self.columns = list(columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+        self.minimum = np.full(k, np.inf)
+        self.maximum = np.full(k, -np.inf)
+        self.category_totals = pd.DataFrame(columns=['count', 'amount_sum'], dtype=float)
+
+    def update(self, chunk):
+        values = chunk[self.columns].to_numpy(dtype=float)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values):
+            self.minimum = np.minimum(self.minimum, values.min(axis=0))
+            self.maximum = np.maximum(self.maximum, values.max(axis=0))
+
+            # Chan et al. pairwise merge of the chunk's mean and co-moment
+            n_b = len(values)
+            mean_b = values.mean(axis=0)
+            centered = values - mean_b
+            comoment_b = centered.T @ centered
+            n = self.n + n_b
+            delta = mean_b - self.mean
+            self.comoment += comoment_b + np.outer(delta, delta) * self.n * n_b / n
+            self.mean += delta * n_b / n
+            self.n = n
+
+        totals = chunk.groupby('Category', observed=True)['Purchase Amount (USD)'].agg(['size', 'sum'])
+        totals.columns = ['count', 'amount_sum']
+        self.category_totals = self.category_totals.add(totals, fill_value=0)
+
+    def bounds(self, column):
+        i = self.columns.index(column)
+        return self.minimum[i], self.maximum[i]
+
+    def covariance(self):
+        return pd.DataFrame(self.comoment / max(self.n - 1, 1), index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+@dataclass
+class StreamSummary:
+    stats: OnlineStats
+    cube: DataCube
+    rows_read: int
+    rows_kept: int
+    rows_incomplete: int
+    rows_duplicate: int
+
+
+def coerce_chunk(chunk):
+    for col in COERCED_NUMERIC_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+    return chunk
+
+
+def iter_clean_chunks(csv_path, chunksize, fingerprints=None):
+    """Yield (raw rows, incomplete rows, duplicate rows, cleaned chunk) per chunk."""
+    fingerprints = fingerprints if fingerprints is not None else RowFingerprints()
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        rows_read = len(chunk)
+        chunk = chunk.dropna()
+        rows_complete = len(chunk)
+        chunk = chunk[fingerprints.first_occurrences(chunk)]
+        yield rows_read, rows_read - rows_complete, rows_complete - len(chunk), coerce_chunk(chunk)
+
+
+def ingest(csv_path=None, chunksize=None, age_bucket=1, amount_bucket=1, item_capacity=None):
+    csv_path = csv_path or config.DATA_FILE
+    chunksize = chunksize or config.INGEST_CHUNK_ROWS
+    item_capacity = item_capacity or config.TOP_ITEMS_CAPACITY
+    stats = OnlineStats()
+    partials = []
+    moment_partials = []
+    item_partials = []
+    rows_read = rows_kept = rows_incomplete = rows_duplicate = 0
+
+    for chunk_read, chunk_incomplete, chunk_duplicate, chunk in iter_clean_chunks(csv_path, chunksize):
+        rows_read += chunk_read
+        rows_incomplete += chunk_incomplete
+        rows_duplicate += chunk_duplicate
+        rows_kept += len(chunk)
+        stats.update(chunk)
+        partials.append(aggregate_cells(chunk, age_bucket, amount_bucket))
+        moment_partials.append(aggregate_moments(chunk, age_bucket, amount_bucket))
+        item_partials.append(aggregate_items(chunk, age_bucket, amount_bucket, item_capacity))
+        # Keep the number of partial cell frames bounded on very long files
+        if len(partials) >= 16:
+            partials = [merge_cells(partials)]
+            moment_partials = [merge_moments(moment_partials)]
+            item_partials = [merge_items(item_partials, item_capacity)]
+
+    cube = DataCube.from_cells(
+        merge_cells(partials), merge_moments(moment_partials), merge_items(item_partials, item_capacity),
+        age_bucket, amount_bucket, item_capacity
+    )
+    return StreamSummary(
+        stats=stats,
+        cube=cube,
+        rows_read=rows_read,
+        rows_kept=rows_kept,
+        rows_incomplete=rows_incomplete,
+        rows_duplicate=rows_duplicate,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize a CSV extract without loading it into memory.')
+    parser.add_argument('csv', nargs='?', default=config.DATA_FILE)
+    parser.add_argument('--chunksize', type=int, default=config.INGEST_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    summary = ingest(args.csv, args.chunksize)
+    print(f'{summary.rows_read:,} rows read, {summary.rows_incomplete:,} incomplete, '
+          f'{summary.rows_duplicate:,} duplicates, {summary.rows_kept:,} kept, {summary.cube.n_cells:,} cube cells')
+    for col in summary.stats.columns:
+        low, high = summary.stats.bounds(col)
+        print(f'  {col}: {low:g} .. {high:g}')
+    print(summary.stats.correlation().round(3))
+    print(summary.stats.category_totals)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregations import NUMERIC_COLS  # noqa: E402
+from correlation import MomentCells, aggregate_moments, partial_correlation  # noqa: E402
+from filter_engine import FilterState  # noqa: E402
+
+
+def frame(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Gender': pd.Categorical(rng.choice(['Female', 'Male'], n)),
+        'Season': pd.Categorical(rng.choice(['Fall', 'Winter'], n)),
+        'Category': pd.Categorical(rng.choice(['Clothing', 'Footwear'], n)),
+        'Item Purchased': pd.Categorical(rng.choice(['Boots', 'Shirt', 'Socks'], n)),
+        # Constant, like the Age slider narrowed to a single year
+        'Age': np.full(n, 45),
+        'Purchase Amount (USD)': rng.integers(20, 100, n),
+        'Review Rating': np.round(rng.uniform(2.5, 5, n), 1),
+        'Previous Purchases': rng.integers(1, 50, n),
+    })
+
+
+def every_row(df):
+    return FilterState.create(
+        df['Gender'].unique(), df['Season'].unique(), df['Category'].unique(),
+        (df['Age'].min(), df['Age'].max()),
+        (df['Purchase Amount (USD)'].min(), df['Purchase Amount (USD)'].max()),
+    )
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_constant_column_matches_dataframe_corr(method):
+    df = frame()
+    result = MomentCells(aggregate_moments(df)).correlation(every_row(df), method)
+    expected = df[NUMERIC_COLS].astype(float).corr(method=method)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, atol=1e-9)
+    assert result.loc['Age'].isna().all() and result['Age'].isna().all()
+
+
+def test_partial_correlation_leaves_out_constant_column():
+    df = frame()
+    result = MomentCells(aggregate_moments(df)).correlation(every_row(df), 'pearson', partial=True)
+    others = [col for col in NUMERIC_COLS if col != 'Age']
+    expected = partial_correlation(df[NUMERIC_COLS].astype(float).corr().loc[others, others])
+    assert result.loc['Age'].isna().all() and result['Age'].isna().all()
+    pd.testing.assert_frame_equal(result.loc[others, others], expected, check_exact=False, atol=1e-9)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from density import density_glyphs  # noqa: E402
+
+COLUMNS = ['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases']
+
+
+def frame(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Age': rng.integers(18, 71, n),
+        'Purchase Amount (USD)': rng.integers(20, 101, n),
+        'Review Rating': rng.uniform(2.5, 5.0, n).round(1),
+        'Previous Purchases': rng.integers(1, 51, n),
+    })
+
+
+def test_max_glyphs_coarsens_the_grid_without_dropping_rows():
+    df = frame()
+    assert len(density_glyphs(df, COLUMNS, bins=8)) > 500
+
+    glyphs = density_glyphs(df, COLUMNS, bins=8, max_glyphs=500)
+    assert len(glyphs) <= 500
+    assert glyphs['Count'].sum() == len(df)
+    np.testing.assert_allclose((glyphs[COLUMNS].mul(glyphs['Count'], axis=0)).sum(), df[COLUMNS].sum())
+
+
+def test_rows_with_missing_values_are_not_counted():
+    df = frame(100)
+    df.loc[:9, 'Age'] = np.nan
+    assert density_glyphs(df, COLUMNS, bins=4, max_glyphs=10)['Count'].sum() == 90
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+import derived  # noqa: E402
+from filter_engine import FilterEngine, FilterState  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Shopping_behavior_updated.csv')
+AMOUNT = 'Purchase Amount (USD)'
+
+
+@pytest.fixture(scope='module')
+def df():
+    return data_store.read_csv(SAMPLE)
+
+
+def subset(rng, values, empty_ok):
+    values = sorted(values)
+    return list(rng.choice(values, rng.integers(0 if empty_ok else 1, len(values) + 1), replace=False))
+
+
+def random_states(df, n, seed=0):
+    """FilterStates over df's values, with ranges past the data and empty selections."""
+    rng = np.random.default_rng(seed)
+    values = {col: df[col].astype(str).unique() for col in ('Gender', 'Season', 'Category', 'Item Purchased')}
+    for _ in range(n):
+        age = np.sort(rng.integers(10, 75, 2))
+        amount = np.sort(rng.integers(10, 110, 2))
+        yield FilterState.create(
+            subset(rng, values['Gender'], False), subset(rng, values['Season'], False),
+            subset(rng, values['Category'], False), age, amount,
+            items=subset(rng, values['Item Purchased'], True) if rng.random() < 0.5 else (),
+            age_groups=subset(rng, derived.AGE_LABELS, True) if rng.random() < 0.5 else (),
+            categories=subset(rng, values['Category'], True) if rng.random() < 0.5 else (),
+        )
+
+
+def reference_masks(df, state):
+    """select_masks(state) as plain boolean masks over df."""
+    base = (
+        df['Gender'].astype(str).isin(state.gender) & df['Season'].astype(str).isin(state.season)
+        & df['Category'].astype(str).isin(state.category)
+        & df['Age'].between(*state.age_range) & df[AMOUNT].between(*state.purchase_range)
+    )
+    if state.age_groups:
+        base &= derived.column(df, 'Age Group').astype(str).isin(state.age_groups)
+    if state.categories:
+        base &= df['Category'].astype(str).isin(state.categories)
+    final = base & df['Item Purchased'].astype(str).isin(state.items) if state.items else base
+    return {'base': base.to_numpy(), 'final': final.to_numpy()}
+
+
+def test_select_matches_boolean_masks(df):
+    engine = FilterEngine(df)
+    for state in random_states(df, 200):
+        expected = reference_masks(df, state)
+        selected = engine.select(state)
+        for scope in ('base', 'final'):
+            np.testing.assert_array_equal(selected[scope], np.flatnonzero(expected[scope]))
+
+
+def test_matches_agrees_with_select(df):
+    engine = FilterEngine(df)
+    positions = np.random.default_rng(1).choice(len(df), 500, replace=False)
+    fields = FilterEngine.SIDEBAR_FIELDS + FilterEngine.INTERACTIVE_FIELDS
+    for state in random_states(df, 100, seed=1):
+        expected = reference_masks(df, state)['final'][positions]
+        np.testing.assert_array_equal(engine.matches(state, positions, fields), expected)
+
+
+def test_appended_engine_matches_one_built_at_once(df):
+    # 2003 rows end mid-byte, so appending has to extend a partial byte of each bitset
+    engine = FilterEngine(df.iloc[:2003]).appended(df.iloc[2003:3100]).appended(df.iloc[3100:])
+    whole = FilterEngine(df)
+    assert engine.value_counts == whole.value_counts
+    for state in random_states(df, 100, seed=2):
+        for scope, rows in whole.select(state).items():
+            np.testing.assert_array_equal(engine.select(state)[scope], rows)
@@ -0,0 +1,96 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+from cube import DataCube  # noqa: E402
+from filter_engine import FilterState  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Shopping_behavior_updated.csv')
+AMOUNT = 'Purchase Amount (USD)'
+PATHS = [('Season', 'Category', 'Item Purchased'), ('Location', 'Category', 'Item Purchased')]
+
+
+@pytest.fixture(scope='module')
+def df():
+    return data_store.read_csv(SAMPLE)
+
+
+@pytest.fixture(scope='module')
+def cube(df):
+    return DataCube(df)
+
+
+def subset(rng, values):
+    values = sorted(values)
+    return list(rng.choice(values, rng.integers(len(values) // 2 + 1, len(values) + 1), replace=False))
+
+
+def random_states(df, n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = {col: df[col].astype(str).unique() for col in ('Gender', 'Season', 'Category', 'Item Purchased')}
+    for _ in range(n):
+        yield FilterState.create(
+            subset(rng, values['Gender']), subset(rng, values['Season']), subset(rng, values['Category']),
+            (rng.integers(18, 30), rng.integers(50, 71)), (rng.integers(20, 40), rng.integers(70, 101)),
+            items=subset(rng, values['Item Purchased']) if rng.random() < 0.5 else (),
+        )
+
+
+def final_rows(df, state):
+    mask = (
+        df['Gender'].astype(str).isin(state.gender) & df['Season'].astype(str).isin(state.season)
+        & df['Category'].astype(str).isin(state.category)
+        & df['Age'].between(*state.age_range) & df[AMOUNT].between(*state.purchase_range)
+    )
+    if state.items:
+        mask &= df['Item Purchased'].astype(str).isin(state.items)
+    return df[mask]
+
+
+def assert_children_add_up(nodes, node, top_n):
+    """Each drawn node's children (at most top_n and one Other) sum to its amount."""
+    amounts = nodes.set_index('id')[AMOUNT]
+    children = nodes[nodes['parent'] != '']
+    for parent, group in children.groupby('parent'):
+        others = group['label'].str.startswith('Other (')
+        assert (~others).sum() <= top_n and others.sum() <= 1
+        if others.any():
+            # Other stands for the children that did not make the top_n
+            assert (~others).sum() == top_n
+            assert group.loc[~others, AMOUNT].min() >= group.loc[others, AMOUNT].iloc[0] / int(
+                group.loc[others, 'label'].iloc[0][len('Other ('):-1])
+        assert np.isclose(group[AMOUNT].sum(), amounts[parent])
+    top = nodes[nodes['depth'] == len(node) + 1]
+    return top[AMOUNT].sum()
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_slices_add_up_to_the_filtered_totals(df, cube, path):
+    for state in random_states(df, 30):
+        rows = final_rows(df, state)
+        nodes = cube.hierarchy_slice(state, path, (), levels=3, top_n=4, rows=df)
+        assert np.isclose(assert_children_add_up(nodes, (), 4), rows[AMOUNT].sum())
+
+        # Drilled into the largest top-level node, which is drawn as the root
+        top = nodes[(nodes['depth'] == 1) & nodes['expandable']].sort_values(AMOUNT).iloc[-1]
+        drilled = cube.hierarchy_slice(state, path, (top['label'],), levels=2, top_n=4, rows=df)
+        root = drilled[drilled['depth'] == 1]
+        assert len(root) == 1 and np.isclose(root[AMOUNT].iloc[0], top[AMOUNT])
+        subtree = rows[rows[path[0]].astype(str) == top['label']]
+        assert np.isclose(assert_children_add_up(drilled, (top['label'],), 4), subtree[AMOUNT].sum())
+
+
+def test_full_tree_leaves_match_groupby(df, cube):
+    path = PATHS[0]
+    for state in random_states(df, 10, seed=1):
+        nodes = cube.hierarchy_slice(state, path, (), levels=len(path), top_n=len(df))
+        leaves = nodes[nodes['depth'] == len(path)].set_index('id')[AMOUNT].sort_index()
+        expected = final_rows(df, state).groupby(list(path), observed=True)[AMOUNT].sum()
+        expected.index = ['/'.join(key) for key in expected.index]
+        np.testing.assert_allclose(leaves.to_numpy(), expected.sort_index().to_numpy())
+        assert list(leaves.index) == sorted(expected.index)
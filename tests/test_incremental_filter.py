@@ -0,0 +1,100 @@
+import os
+import sys
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+import derived  # noqa: E402
+from filter_engine import FilterEngine, FilterState  # noqa: E402
+from incremental_filter import IncrementalFilter  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Shopping_behavior_updated.csv')
+AMOUNT = 'Purchase Amount (USD)'
+
+
+@pytest.fixture(scope='module')
+def df():
+    return data_store.read_csv(SAMPLE)
+
+
+def everything(df):
+    return FilterState.create(
+        df['Gender'].unique(), df['Season'].unique(), df['Category'].unique(),
+        (df['Age'].min(), df['Age'].max()), (df[AMOUNT].min(), df[AMOUNT].max())
+    )
+
+
+def toggled(values, value):
+    return tuple(sorted(set(values) ^ {value}))
+
+
+def walk(df, state, n, seed=0):
+    """States one interaction apart: a slider step, or one checkbox toggled."""
+    rng = np.random.default_rng(seed)
+    options = {
+        'gender': df['Gender'].astype(str).unique(), 'season': df['Season'].astype(str).unique(),
+        'category': df['Category'].astype(str).unique(), 'items': df['Item Purchased'].astype(str).unique(),
+        'age_groups': derived.AGE_LABELS, 'categories': df['Category'].astype(str).unique(),
+    }
+    for _ in range(n):
+        field = rng.choice(['age_range', 'purchase_range'] + list(options))
+        if field in ('age_range', 'purchase_range'):
+            low, high = getattr(state, field)
+            step = int(rng.integers(-3, 4))
+            state = replace(state, **{field: (low + step, high) if rng.random() < 0.5 else (low, high + step)})
+        else:
+            values = toggled(getattr(state, field), str(rng.choice(options[field])))
+            # An empty sidebar selection matches nothing; the walk would end there
+            if values or field in FilterEngine.INTERACTIVE_FIELDS:
+                state = replace(state, **{field: values})
+        yield state
+
+
+def assert_same_rows(selected, expected):
+    for scope, rows in expected.items():
+        np.testing.assert_array_equal(selected[scope], rows)
+
+
+def test_patched_masks_match_a_full_select(df):
+    engine = FilterEngine(df)
+    incremental = IncrementalFilter(engine)
+    for state in [everything(df)] + list(walk(df, everything(df), 300)):
+        assert_same_rows(incremental.select(state), engine.select(state))
+    assert incremental.mode_counts['incremental'] > 0 and incremental.mode_counts['full'] > 1
+
+
+def test_large_changes_fall_back_to_a_full_evaluation(df):
+    engine = FilterEngine(df)
+    incremental = IncrementalFilter(engine)
+    state = everything(df)
+    incremental.select(state)
+
+    # One year of ages is under 5% of the table, a whole category is not
+    state = replace(state, age_range=(state.age_range[0] + 1, state.age_range[1]))
+    incremental.select(state)
+    assert incremental.last_mode == 'incremental'
+    state = replace(state, category=toggled(state.category, 'Clothing'))
+    assert_same_rows(incremental.select(state), engine.select(state))
+    assert incremental.last_mode == 'full'
+
+
+def test_rebase_onto_appended_rows(df):
+    engine = FilterEngine(df.iloc[:2500])
+    incremental = IncrementalFilter(engine)
+    states = list(walk(df, everything(df), 40, seed=1))
+    for state in states[:20]:
+        incremental.select(state)
+
+    appended = engine.appended(df.iloc[2500:])
+    assert incremental.rebase(appended)
+    expected = appended.select(states[19])
+    for scope, mask in incremental.masks.items():
+        np.testing.assert_array_equal(np.flatnonzero(mask), expected[scope])
+    for state in states[20:]:
+        assert_same_rows(incremental.select(state), appended.select(state))
+
+    assert not incremental.rebase(FilterEngine(df))
@@ -0,0 +1,90 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregations  # noqa: E402
+import data_store  # noqa: E402
+import derived  # noqa: E402
+from cube import DataCube  # noqa: E402
+from filter_engine import FilterState  # noqa: E402
+from item_sketch import ItemSketch, aggregate_items, merge_items  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Shopping_behavior_updated.csv')
+AMOUNT = 'Purchase Amount (USD)'
+ITEM = 'Item Purchased'
+
+
+@pytest.fixture(scope='module')
+def df():
+    return data_store.read_csv(SAMPLE)
+
+
+def subset(rng, values, low):
+    values = sorted(values)
+    return list(rng.choice(values, rng.integers(low, len(values) + 1), replace=False))
+
+
+def random_states(df, n, seed=0, ranges=True):
+    """States for the Top-10, which ignores the item selection; without ranges
+    the sliders and age groups are left open (they follow the cube's buckets)."""
+    rng = np.random.default_rng(seed)
+    values = {col: df[col].astype(str).unique() for col in ('Gender', 'Season', 'Category', ITEM)}
+    for _ in range(n):
+        yield FilterState.create(
+            subset(rng, values['Gender'], 1), subset(rng, values['Season'], 1), subset(rng, values['Category'], 1),
+            np.sort(rng.integers(15, 75, 2)) if ranges else (0, 100),
+            np.sort(rng.integers(15, 105, 2)) if ranges else (0, 200),
+            items=subset(rng, values[ITEM], 0),
+            age_groups=subset(rng, derived.AGE_LABELS, 0) if ranges and rng.random() < 0.5 else (),
+            categories=subset(rng, values['Category'], 0) if rng.random() < 0.5 else (),
+        )
+
+
+def base_rows(df, state):
+    mask = (
+        df['Gender'].astype(str).isin(state.gender) & df['Season'].astype(str).isin(state.season)
+        & df['Category'].astype(str).isin(state.category)
+        & df['Age'].between(*state.age_range) & df[AMOUNT].between(*state.purchase_range)
+    )
+    if state.age_groups:
+        mask &= derived.column(df, 'Age Group').astype(str).isin(state.age_groups)
+    if state.categories:
+        mask &= df['Category'].astype(str).isin(state.categories)
+    return df[mask]
+
+
+def reference_top(rows, k=10):
+    counts = rows[ITEM].astype(str).value_counts()
+    top = pd.DataFrame({'Item': counts.index, 'Count': counts.to_numpy()})
+    return top.sort_values(['Count', 'Item'], ascending=[False, True], kind='stable').head(k).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('capacity', [1, 3, 8])
+@pytest.mark.parametrize('buckets', [(1, 1), (10, 20)])
+def test_top_items_match_value_counts_below_capacity(df, capacity, buckets):
+    assert df[ITEM].nunique() > capacity
+    cube = DataCube(df, *buckets, item_capacity=capacity)
+    for state in random_states(df, 30, ranges=buckets == (1, 1)):
+        top = aggregations.top_items(cube, state)
+        expected = reference_top(base_rows(df, state))
+        pd.testing.assert_frame_equal(
+            top.astype({'Item': str, 'Count': int}), expected.astype({'Item': str, 'Count': int})
+        )
+
+
+def test_merged_bounds_hold_the_true_counts(df):
+    # Chunks of 500 rows merged like the streaming ingest, 2 counters per cell
+    partials = [aggregate_items(df.iloc[start:start + 500], 10, 20, capacity=2) for start in range(0, len(df), 500)]
+    sketch = ItemSketch(merge_items(partials, capacity=2), capacity=2)
+    for state in random_states(df, 40, seed=1, ranges=False):
+        lower, upper, unlisted = sketch.item_bounds(state)
+        true = base_rows(df, state)[ITEM].astype(str).value_counts()
+        listed = pd.Series(sketch.items.astype(str))
+        counts = true.reindex(listed, fill_value=0).to_numpy()
+        assert (lower <= counts).all() and (counts <= upper).all()
+        assert (true.drop(listed, errors='ignore') <= unlisted).all()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+from live_feed import LiveFeed  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Shopping_behavior_updated.csv')
+
+
+def batches():
+    df = pd.read_csv(SAMPLE, nrows=400)
+    df['Age'] = df['Age'].astype('Int64')
+    return df.iloc[:200].copy(), df.iloc[200:].copy()
+
+
+def append(path, batch):
+    batch.to_csv(path, mode='a', header=not path.exists(), index=False)
+
+
+def test_later_batches_keep_their_fractional_ratings(tmp_path):
+    path = tmp_path / 'feed.csv'
+    first, second = batches()
+    first['Review Rating'] = first['Review Rating'].round().astype(int)
+    append(path, first)
+    feed = LiveFeed(str(path))
+    assert feed.poll()
+
+    append(path, second)
+    assert feed.poll()
+    np.testing.assert_array_equal(
+        feed.snapshot.df['Review Rating'].to_numpy(), pd.concat([first, second])['Review Rating'].to_numpy(dtype=float)
+    )
+
+
+def test_duplicates_across_batches_are_dropped_like_the_batch_load(tmp_path):
+    path = tmp_path / 'feed.csv'
+    first, second = batches()
+    # The missing Age reads the first batch's ages as float64, the second's as int64
+    first.loc[10, 'Age'] = pd.NA
+    append(path, first)
+    feed = LiveFeed(str(path))
+    feed.poll()
+    append(path, pd.concat([second, first.iloc[[5]]]))
+    feed.poll()
+
+    assert feed.snapshot.rows_duplicate == 1
+    assert len(feed.snapshot.df) == len(data_store.read_csv(path)) == 399
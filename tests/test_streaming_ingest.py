@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_store  # noqa: E402
+from streaming_ingest import ingest, iter_clean_chunks  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Shopping_behavior_updated.csv')
+
+
+def extract(tmp_path):
+    """1000 rows, a missing Age in the first 600-row chunk and a copy of row 5 in the second."""
+    df = pd.read_csv(SAMPLE, nrows=1000)
+    # Written as whole numbers, so only the first chunk reads its ages as float64
+    df['Age'] = df['Age'].astype('Int64')
+    df.loc[10, 'Age'] = pd.NA
+    df = pd.concat([df, df.iloc[[5]]], ignore_index=True)
+    path = tmp_path / 'extract.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_duplicates_across_chunks_are_dropped_like_the_batch_load(tmp_path):
+    path = extract(tmp_path)
+    batch = data_store.read_csv(path)
+
+    chunks = list(iter_clean_chunks(path, chunksize=600))
+    streamed = pd.concat([chunk for *_, chunk in chunks], ignore_index=True)
+    assert sum(duplicate for _, _, duplicate, _ in chunks) == 1
+    assert len(streamed) == len(batch) == 999
+
+    key = ['Customer ID']
+    pd.testing.assert_frame_equal(
+        streamed.sort_values(key).reset_index(drop=True)[batch.columns].astype(str),
+        batch.sort_values(key).reset_index(drop=True).astype(str),
+    )
+
+
+def test_ingest_counts(tmp_path):
+    summary = ingest(extract(tmp_path), chunksize=600)
+    assert (summary.rows_read, summary.rows_incomplete, summary.rows_duplicate, summary.rows_kept) == (1001, 1, 1, 999)